@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+EXPORT_COLUMNS = [
+    "Дата операции",
+    "Дата платежа",
+    "Номер карты",
+    "Статус",
+    "Сумма операции",
+    "Валюта операции",
+    "Сумма платежа",
+    "Валюта платежа",
+    "Кэшбэк",
+    "Категория",
+    "MCC",
+    "Описание",
+    "Бонусы (включая кэшбэк)",
+    "Округление на инвесткопилку",
+    "Сумма операции с округлением",
+]
+
+# (категория, MCC, доля операций, средняя сумма, доля поступлений, описания)
+CATEGORY_PROFILES = [
+    ("Супермаркеты", 5411, 0.34, 450, 0.0, ["Колхоз", "Магнит", "Пятёрочка", "Перекрёсток", "Лента"]),
+    ("Фастфуд", 5814, 0.19, 250, 0.0, ["Mouse Tail", "ВкусВилл", "Теремок", "Шаурма у дома"]),
+    ("Транспорт", 4121, 0.06, 300, 0.0, ["Яндекс Такси", "Ситимобил", "Uber"]),
+    ("Переводы", None, 0.05, 5000, 0.35, ["Перевод на карту", "Перевод Кредитная карта. ТП 10.2 RUR"]),
+    ("Ж/д билеты", 4112, 0.04, 1200, 0.05, ["РЖД", "Метро Санкт-Петербург", "Московский метрополитен"]),
+    ("Различные товары", 5399, 0.03, 1500, 0.0, ["Ozon.ru", "WILDBERRIES", "AliExpress"]),
+    ("Связь", 4814, 0.03, 500, 0.0, ["МТС", "Билайн", "Ростелеком"]),
+    ("Пополнения", None, 0.03, 20000, 1.0, ["Перевод с карты", "Внесение наличных через банкомат Тинькофф"]),
+    ("Аптеки", 5912, 0.02, 600, 0.0, ["Аптека Вита", "Apteka 7", "Ригла"]),
+    ("Каршеринг", 7512, 0.02, 700, 0.03, ["Ситидрайв", "Делимобиль", "BelkaCar"]),
+    ("Рестораны", 5812, 0.02, 2500, 0.0, ["Pizza Hut", "Токио-Сити", "Теремок"]),
+    ("Бонусы", None, 0.015, 150, 1.0, ["Вознаграждение за операции покупок", "Проценты на остаток по счету"]),
+    ("Наличные", 6011, 0.015, 5000, 0.0, ["Снятие в банкомате Сбербанк", "Снятие в банкомате Тинькофф"]),
+    ("Дом и ремонт", 5200, 0.015, 3000, 0.0, ["Леруа Мерлен", "МаксидоМ", "Строитель"]),
+    ("Топливо", 5541, 0.01, 2000, 0.0, ["Лукойл", "Газпромнефть", "Shell"]),
+    ("Одежда и обувь", 5651, 0.01, 3500, 0.0, ["WILDBERRIES", "Детки", "Спортмастер"]),
+    ("ЖКХ", None, 0.008, 4500, 0.0, ["ЖКУ Квартира", "Электричество", "ЖКУ Дом"]),
+    ("Зарплата", None, 0.002, 60000, 1.0, ['Пополнение. ООО "ФОРТУНА". Зарплата']),
+]
+CARDS = ["*7197", "*4556", "*5091", "*5441", "*1112"]
+# Первый вариант - операция без номера карты (код -1 в категориях)
+CARD_WEIGHTS = np.array([0.09, 0.72, 0.17, 0.01, 0.005, 0.005])
+FAILED_SHARE = 0.006
+
+
+def _weights(values: list[float]) -> np.ndarray:
+    array = np.asarray(values, dtype=float)
+    return array / array.sum()
+
+
+def generate_operations(
+    rows: int, seed: int = 0, start: str = "2018-01-01", end: str = "2021-12-31", as_export: bool = False
+) -> pd.DataFrame:
+    """Генерирует выгрузку операций заданного размера. Результат зависит только от seed.
+    По умолчанию даты сразу в datetime64, а текстовые колонки - категории (как после normalize_operations,
+    но без сортировки). as_export=True возвращает даты строками в формате выгрузки банка"""
+    rng = np.random.default_rng(seed)
+    start_ns = pd.Timestamp(start).value
+    end_ns = pd.Timestamp(end).value
+    seconds = rng.integers(0, (end_ns - start_ns) // 10**9, size=rows)
+    operation_dates = pd.to_datetime(start_ns + np.sort(seconds)[::-1] * 10**9)
+    payment_dates = operation_dates.floor("D") + pd.to_timedelta(rng.choice(3, size=rows, p=[0.7, 0.2, 0.1]), "D")
+
+    category_codes = rng.choice(len(CATEGORY_PROFILES), size=rows, p=_weights([p[2] for p in CATEGORY_PROFILES]))
+    mean_amounts = np.array([p[3] for p in CATEGORY_PROFILES], dtype=float)[category_codes]
+    amounts = np.round(rng.lognormal(0, 0.8, size=rows) * mean_amounts, 2)
+    is_income = rng.random(rows) < np.array([p[4] for p in CATEGORY_PROFILES])[category_codes]
+    amounts = np.where(is_income, amounts, -amounts)
+
+    # Одно описание может встречаться в нескольких категориях, поэтому коды переводятся в общий словарь
+    descriptions = [description for profile in CATEGORY_PROFILES for description in profile[5]]
+    unique_descriptions, description_index = np.unique(np.array(descriptions), return_inverse=True)
+    first_description = np.cumsum([0] + [len(p[5]) for p in CATEGORY_PROFILES[:-1]])
+    description_count = np.array([len(p[5]) for p in CATEGORY_PROFILES])
+    description_codes = first_description[category_codes] + (
+        rng.integers(0, 1 << 30, size=rows) % description_count[category_codes]
+    )
+    mcc = np.array([np.nan if p[1] is None else p[1] for p in CATEGORY_PROFILES])[category_codes]
+    cashback = np.where(amounts < 0, np.floor(-amounts / 100), 0)
+
+    df = pd.DataFrame(
+        {
+            "Дата операции": operation_dates.to_numpy(),
+            "Дата платежа": payment_dates.to_numpy(),
+            "Номер карты": pd.Categorical.from_codes(
+                rng.choice(len(CARD_WEIGHTS), size=rows, p=CARD_WEIGHTS) - 1, categories=CARDS
+            ),
+            "Статус": pd.Categorical.from_codes(
+                (rng.random(rows) < FAILED_SHARE).astype(np.int8), categories=["OK", "FAILED"]
+            ),
+            "Сумма операции": amounts,
+            "Валюта операции": pd.Categorical.from_codes(np.zeros(rows, dtype=np.int8), categories=["RUB"]),
+            "Сумма платежа": amounts,
+            "Валюта платежа": pd.Categorical.from_codes(np.zeros(rows, dtype=np.int8), categories=["RUB"]),
+            "Кэшбэк": np.where(cashback > 0, cashback, np.nan),
+            "Категория": pd.Categorical.from_codes(category_codes, categories=[p[0] for p in CATEGORY_PROFILES]),
+            "MCC": mcc,
+            "Описание": pd.Categorical.from_codes(
+                description_index[description_codes], categories=unique_descriptions
+            ),
+            "Бонусы (включая кэшбэк)": cashback.astype(np.int64),
+            "Округление на инвесткопилку": np.zeros(rows, dtype=np.int64),
+            "Сумма операции с округлением": np.abs(amounts),
+        },
+        columns=EXPORT_COLUMNS,
+    )
+    if as_export:
+        df["Дата операции"] = df["Дата операции"].dt.strftime("%d.%m.%Y %H:%M:%S")
+        df["Дата платежа"] = df["Дата платежа"].dt.strftime("%d.%m.%Y")
+        for column in ["Номер карты", "Статус", "Категория", "Описание"]:
+            df[column] = df[column].astype(object)
+    return df
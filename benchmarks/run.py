@@ -0,0 +1,176 @@
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generator import generate_operations
+from src import views
+from src.main import build_widget, save_widget
+from src.reports import get_spending_by_category
+from src.services import get_cashback_matrix, get_high_cashback_categories, investment_bank
+from src.sharding import DEFAULT_SHARDS
+from src.utils import (
+    cash_and_transfers_count,
+    filter_data_by_range,
+    get_cards_info,
+    get_income_category,
+    get_top5_transaction_info,
+    most_spending_filter,
+    normalize_operations
+)
+from src.views import main_events, main_events_multi, main_web
+
+SIZES = {"10k": 10_000, "1M": 1_000_000, "10M": 10_000_000}
+RESULTS_DIR = Path(__file__).parent / "results"
+DEFAULT_THRESHOLD = 1.25
+# Конец периода сгенерированных данных
+BENCHMARK_DATE = "2021-12-31"
+
+
+def get_cases(raw: pd.DataFrame, df: pd.DataFrame, output_dir: Path) -> dict[str, Callable[[], Any]]:
+    """Возвращает замеряемые функции. raw - данные до нормализации, df - после"""
+    transactions = pd.DataFrame({"date": df["Дата операции"], "amount": df["Сумма платежа"]})
+
+    def run_main() -> None:
+        save_widget(build_widget(df, f"{BENCHMARK_DATE} 12:00:00", transactions), output_dir / "BankWidget.json")
+
+    return {
+        "normalize_operations": lambda: normalize_operations(raw),
+        "filter_data_by_range[M]": lambda: filter_data_by_range(df, BENCHMARK_DATE, "M"),
+        "filter_data_by_range[Y]": lambda: filter_data_by_range(df, BENCHMARK_DATE, "Y"),
+        "get_cards_info": lambda: get_cards_info(df),
+        "get_top5_transaction_info": lambda: get_top5_transaction_info(df),
+        "most_spending_filter": lambda: most_spending_filter(df),
+        "get_income_category": lambda: get_income_category(df),
+        "cash_and_transfers_count": lambda: cash_and_transfers_count(df),
+        "get_high_cashback_categories": lambda: get_high_cashback_categories(df, 2021, 11),
+        "get_cashback_matrix": lambda: get_cashback_matrix(df),
+        "get_cards_info[shards]": lambda: get_cards_info(df, shards=DEFAULT_SHARDS),
+        "most_spending_filter[shards]": lambda: most_spending_filter(df, shards=DEFAULT_SHARDS),
+        "get_income_category[shards]": lambda: get_income_category(df, shards=DEFAULT_SHARDS),
+        "get_cashback_matrix[shards]": lambda: get_cashback_matrix(df, shards=DEFAULT_SHARDS),
+        "get_spending_by_category": lambda: get_spending_by_category(df, "Супермаркеты", "31-12-2021"),
+        "investment_bank": lambda: investment_bank("2021-11", transactions, 50),
+        "main_web": lambda: main_web(BENCHMARK_DATE, df),
+        "main_events": lambda: main_events(BENCHMARK_DATE, df, "M"),
+        "main_events[W,M,Y,ALL]": lambda: [main_events(BENCHMARK_DATE, df, r) for r in ("W", "M", "Y", "ALL")],
+        "main_events_multi": lambda: main_events_multi(BENCHMARK_DATE, df),
+        "main": run_main,
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int) -> dict:
+    """Замеряет функцию repeat раз, затем ещё один раз под tracemalloc для пика памяти"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "wall_min": min(timings),
+        "wall_mean": float(np.mean(timings)),
+        "repeat": repeat,
+        "peak_memory": peak,
+    }
+
+
+def run_benchmarks(sizes: dict[str, int], repeat: int = 3, seed: int = 0, only: list[str] | None = None) -> dict:
+    """Прогоняет все функции на сгенерированных данных каждого размера и возвращает результаты"""
+    # Курсы не запрашиваются: сеть не должна влиять на замеры
+    views.set_market_data({"currency_rates": [], "stock_prices": []})
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for size_name, rows in sizes.items():
+            raw = generate_operations(rows, seed=seed)
+            df = normalize_operations(raw)
+            for name, func in get_cases(raw, df, Path(output_dir)).items():
+                if only and name not in only:
+                    continue
+                result = {"size": size_name, "rows": rows, "function": name, **measure(func, repeat)}
+                print(
+                    f"{size_name:>4} {name:<30} {result['wall_min'] * 1000:10.2f} мс"
+                    f" {result['peak_memory'] / 2**20:10.1f} МБ"
+                )
+                results.append(result)
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "seed": seed,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """Возвращает замеры, которые стали медленнее базовых больше чем в threshold раз"""
+    base = {(result["size"], result["function"]): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        previous = base.get((result["size"], result["function"]))
+        if previous is None or previous["wall_min"] <= 0:
+            continue
+        ratio = result["wall_min"] / previous["wall_min"]
+        if ratio > threshold:
+            regressions.append(
+                {
+                    "size": result["size"],
+                    "function": result["function"],
+                    "baseline": previous["wall_min"],
+                    "current": result["wall_min"],
+                    "ratio": ratio,
+                }
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Замеры функций виджета на сгенерированных операциях")
+    parser.add_argument("--sizes", nargs="+", default=["10k", "1M"], choices=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", help="замерять только указанные функции")
+    parser.add_argument("--output", type=Path, help="файл для результатов (по умолчанию benchmarks/results/)")
+    parser.add_argument("--compare", type=Path, help="файл с базовыми результатами")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks({name: SIZES[name] for name in args.sizes}, args.repeat, args.seed, args.only)
+    output = args.output or RESULTS_DIR / f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=4)
+    print(f"Результаты сохранены в {output}")
+
+    if args.compare is None:
+        return 0
+    with open(args.compare, "r", encoding="utf-8") as file:
+        regressions = compare_results(json.load(file), report, args.threshold)
+    for regression in regressions:
+        print(
+            f"Замедление: {regression['size']} {regression['function']} "
+            f"{regression['baseline'] * 1000:.2f} -> {regression['current'] * 1000:.2f} мс "
+            f"(x{regression['ratio']:.2f})"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
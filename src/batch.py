@@ -0,0 +1,95 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from src import views
+from src.logger import get_logger, prepare_worker_logging
+from src.main import build_widget, save_widget
+from src.rates import RateHistory, convert_operations_currency
+from src.store import read_operations_export
+from src.utils import normalize_operations
+
+logger = get_logger(__name__)
+
+OPERATIONS_SUFFIXES = {".xlsx", ".csv"}
+# История курсов, переданная процессу пула при запуске (см. run_batch)
+_rates: RateHistory | None = None
+
+
+def read_batch_tasks(source: Path) -> list[tuple[str, Path]]:
+    """Возвращает список (id пользователя, файл с операциями).
+    source - папка с файлами операций (id = имя файла) или JSON-манифест {"id": "путь к файлу"}"""
+    if source.is_dir():
+        files = sorted(path for path in source.iterdir() if path.suffix.lower() in OPERATIONS_SUFFIXES)
+        return [(path.stem, path) for path in files]
+    with open(source, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    return [(str(user_id), source.parent / file_name) for user_id, file_name in manifest.items()]
+
+
+def get_investment_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """Возвращает транзакции для investment_bank (date, amount) из DF с операциями"""
+    amount_column = "Сумма операции" if "Сумма операции" in df.columns else "Сумма платежа"
+    return pd.DataFrame({"date": df["Дата операции"], "amount": df[amount_column]})
+
+
+def _init_worker(market_data: dict, rates: RateHistory | None = None) -> None:
+    global _rates
+    prepare_worker_logging()
+    views.set_market_data(market_data)
+    _rates = rates
+
+
+def build_user_widget(task: tuple[str, Path, Path, str]) -> tuple[str, str | None]:
+    """Строит виджет одного пользователя и сохраняет его. Возвращает (id, текст ошибки или None)"""
+    user_id, file_path, output_dir, current_date = task
+    try:
+        df = normalize_operations(read_operations_export(file_path))
+        if _rates is not None:
+            # Переводим до выборки транзакций, чтобы инвесткопилка тоже считалась в рублях
+            df = convert_operations_currency(df, _rates)
+        result = build_widget(df, current_date, get_investment_transactions(df))
+        save_widget(result, output_dir / f"{user_id}.json")
+    except Exception as ex:
+        logger.error("Ошибка обработки пользователя %s: %s", user_id, ex)
+        return user_id, str(ex)
+    return user_id, None
+
+
+def run_batch(
+    source: Path,
+    output_dir: Path,
+    current_date: str | None = None,
+    workers: int | None = None,
+    chunksize: int | None = None,
+    market_data: dict | None = None,
+    rates_dir: Path | None = None,
+) -> dict[str, str | None]:
+    """Строит виджеты для всех пользователей из папки или манифеста в пуле процессов.
+    Курсы валют и акций запрашиваются один раз и передаются всем процессам.
+    rates_dir - папка с историей курсов ЦБ: она читается один раз, и суммы в других валютах переводятся в рубли.
+    Возвращает словарь {id пользователя: текст ошибки или None}"""
+    logger.info("Функция run_batch начинает работу")
+    tasks = read_batch_tasks(Path(source))
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if current_date is None:
+        current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if market_data is None:
+        market_data = views.get_market_data()
+    rates = RateHistory.from_cbr_archive(rates_dir) if rates_dir is not None else None
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        # Несколько порций на процесс выравнивают нагрузку, если файлы разного размера
+        chunksize = max(1, len(tasks) // (workers * 4))
+
+    logger.info("Обрабатываем %s пользователей в %s процессах, порция %s", len(tasks), workers, chunksize)
+    jobs = [(user_id, file_path, output_dir, current_date) for user_id, file_path in tasks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(market_data, rates)) as executor:
+        result = dict(executor.map(build_user_widget, jobs, chunksize=chunksize))
+    logger.info("Функция run_batch завершает работу")
+    return result
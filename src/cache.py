@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_SUFFIX = ".cache"
+CACHE_VERSION = 1
+META_FILE = "meta.json"
+
+
+def get_cache_dir(file_path: Path) -> Path:
+    """Возвращает путь к папке со снимком, лежащей рядом с исходным файлом"""
+    return file_path.with_name(file_path.name + CACHE_SUFFIX)
+
+
+def get_file_hash(file_path: Path) -> str:
+    """Считает sha256 файла, читая его блоками"""
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def get_frame_fingerprint(data: pd.DataFrame | pd.Series) -> str:
+    """Считает отпечаток содержимого DF (или Series) по хэшам строк pandas и именам колонок.
+    Одинаковые значения в категориях и в обычных колонках дают один и тот же отпечаток"""
+    sha = hashlib.sha256()
+    if isinstance(data, pd.DataFrame):
+        sha.update(json.dumps([str(column) for column in data.columns], ensure_ascii=False).encode())
+    sha.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return sha.hexdigest()
+
+
+def write_column_bundle(df: pd.DataFrame, bundle_dir: Path, source: dict | None = None) -> None:
+    """Сохраняет DF в папку в виде набора .npy файлов, по одному (или по два) на колонку.
+    Строковые колонки хранятся как коды + словарь значений, что позволяет читать их через mmap"""
+    logger.info("Сохраняем снимок в %s", bundle_dir)
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+    meta_path = bundle_dir / META_FILE
+    if meta_path.exists():
+        meta_path.unlink()
+
+    columns = []
+    for number, name in enumerate(df.columns):
+        series = df[name]
+        kind = series.dtype.kind
+        if kind in "iufb":
+            np.save(bundle_dir / f"col_{number}.npy", series.to_numpy())
+            columns.append({"name": name, "kind": "numeric"})
+        elif kind == "M":
+            np.save(bundle_dir / f"col_{number}.npy", series.to_numpy().view("i8"))
+            columns.append({"name": name, "kind": "datetime", "dtype": str(series.dtype)})
+        else:
+            codes, categories = pd.factorize(series, use_na_sentinel=True)
+            if not all(isinstance(value, str) for value in categories):
+                raise TypeError(f"Колонку {name} нельзя сохранить в снимок: значения не являются строками")
+            np.save(bundle_dir / f"col_{number}.npy", codes.astype(np.int32))
+            np.save(bundle_dir / f"col_{number}_values.npy", np.array(categories, dtype=str))
+            columns.append({"name": name, "kind": "text"})
+
+    meta = {"version": CACHE_VERSION, "rows": len(df), "columns": columns, "source": source or {}}
+    tmp_path = bundle_dir / (META_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(meta, file, ensure_ascii=False)
+    os.replace(tmp_path, meta_path)
+
+
+def read_bundle_meta(bundle_dir: Path) -> dict | None:
+    """Возвращает описание снимка или None, если снимка нет или он другой версии"""
+    try:
+        with open(bundle_dir / META_FILE, "r", encoding="utf-8") as file:
+            meta = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if meta.get("version") != CACHE_VERSION:
+        return None
+    return dict(meta)
+
+
+def read_column_bundle(bundle_dir: Path, meta: dict | None = None) -> pd.DataFrame:
+    """Читает снимок, сохранённый write_column_bundle, отображая файлы в память"""
+    logger.info("Читаем снимок %s", bundle_dir)
+    if meta is None:
+        meta = read_bundle_meta(bundle_dir)
+        if meta is None:
+            raise FileNotFoundError(f"Снимок не найден: {bundle_dir}")
+
+    data = {}
+    for number, column in enumerate(meta["columns"]):
+        values = np.load(bundle_dir / f"col_{number}.npy", mmap_mode="r")
+        if column["kind"] == "numeric":
+            data[column["name"]] = values
+        elif column["kind"] == "datetime":
+            data[column["name"]] = np.asarray(values).view(column["dtype"])
+        else:
+            categories = np.load(bundle_dir / f"col_{number}_values.npy").astype(object)
+            text = np.empty(len(values), dtype=object)
+            known = values >= 0
+            text[known] = categories[values[known]]
+            text[~known] = np.nan
+            data[column["name"]] = text
+
+    return pd.DataFrame(data, columns=[column["name"] for column in meta["columns"]])
+
+
+def read_excel_cached(file_path: Path, rebuild: bool = False) -> pd.DataFrame:
+    """Читает XLSX-файл через снимок рядом с ним. Снимок пересобирается, если изменился размер
+    или содержимое исходного файла, либо если передан rebuild=True"""
+    stat = os.stat(file_path)
+    bundle_dir = get_cache_dir(file_path)
+
+    meta = None if rebuild else read_bundle_meta(bundle_dir)
+    if meta is not None and meta["source"].get("size") == stat.st_size:
+        if meta["source"].get("mtime_ns") == stat.st_mtime_ns:
+            return read_column_bundle(bundle_dir, meta)
+        if meta["source"].get("sha256") == get_file_hash(file_path):
+            logger.info("Время изменения файла другое, но содержимое совпадает")
+            meta["source"]["mtime_ns"] = stat.st_mtime_ns
+            tmp_path = bundle_dir / (META_FILE + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(meta, file, ensure_ascii=False)
+            os.replace(tmp_path, bundle_dir / META_FILE)
+            return read_column_bundle(bundle_dir, meta)
+
+    logger.info("Снимок устарел или отсутствует, читаем %s", file_path)
+    df = pd.read_excel(file_path, engine="openpyxl")
+    source = {
+        "name": file_path.name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": get_file_hash(file_path),
+    }
+    try:
+        write_column_bundle(df, bundle_dir, source)
+    except (OSError, TypeError) as ex:
+        logger.warning("Не удалось сохранить снимок: %s", ex)
+        shutil.rmtree(bundle_dir, ignore_errors=True)
+    return df
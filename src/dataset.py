@@ -0,0 +1,120 @@
+from datetime import datetime
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from src.cache import get_frame_fingerprint
+
+PAYMENT_DATE = "Дата платежа"
+NAT_I8 = np.iinfo(np.int64).min
+
+
+def get_window_bounds(dates_i8: np.ndarray, start: datetime | None, end: datetime) -> tuple[int, int]:
+    """Возвращает границы [lo, hi) окна дат в отсортированном массиве дат int64 (NaT идут в начале).
+    Если start не указан, окно начинается с первой непустой даты"""
+    if start is None:
+        lo = np.searchsorted(dates_i8, NAT_I8, side="right")
+    else:
+        lo = np.searchsorted(dates_i8, pd.Timestamp(start).value, side="left")
+    hi = np.searchsorted(dates_i8, pd.Timestamp(end).value, side="right")
+    return int(lo), int(max(lo, hi))
+
+
+def is_sorted_i8(dates_i8: np.ndarray) -> bool:
+    """Отсортирован ли массив дат int64 по возрастанию. NaT в int64 - минимальное число, поэтому пустые даты
+    в начале (как после index_by_payment_date) порядок не нарушают"""
+    return len(dates_i8) < 2 or bool(np.all(dates_i8[1:] >= dates_i8[:-1]))
+
+
+def index_by_payment_date(df: pd.DataFrame) -> pd.DataFrame:
+    """Сортирует операции по дате платежа (пустые даты в начале) и ставит её в индекс DatetimeIndex.
+    Сортировка устойчивая: операции с одной датой платежа остаются в порядке выгрузки"""
+    result = df.sort_values(PAYMENT_DATE, kind="stable", na_position="first")
+    result.index = pd.DatetimeIndex(result[PAYMENT_DATE])
+    result.index.name = None
+    return result
+
+
+class OperationsDataset:
+    """Набор операций, для которого маски расходов и поступлений вычисляются один раз
+    и переиспользуются всеми функциями views/services/reports"""
+
+    def __init__(
+        self, df: pd.DataFrame, spending: pd.DataFrame | None = None, income: pd.DataFrame | None = None
+    ) -> None:
+        self.df = df
+        # Уже отфильтрованные части можно передать сразу, тогда они не будут вычисляться повторно
+        if spending is not None:
+            self.__dict__["spending"] = spending
+        if income is not None:
+            self.__dict__["income"] = income
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def reset_cache(self) -> None:
+        """Сбрасывает вычисленные маски и срезы, например после замены self.df"""
+        for klass in type(self).__mro__:
+            for name, value in vars(klass).items():
+                if isinstance(value, cached_property):
+                    self.__dict__.pop(name, None)
+
+    @cached_property
+    def fingerprint(self) -> str:
+        """Отпечаток содержимого операций. Считается один раз, сбрасывается вместе с остальным кэшем"""
+        return get_frame_fingerprint(self.df)
+
+    @cached_property
+    def _ok_mask(self) -> np.ndarray:
+        return np.asarray((self.df["Статус"] == "OK").to_numpy(dtype=bool))
+
+    @cached_property
+    def spending_mask(self) -> np.ndarray:
+        """Выполненные операции с расходами"""
+        return np.asarray((self.df["Сумма платежа"] < 0).to_numpy(dtype=bool) & self._ok_mask)
+
+    @cached_property
+    def income_mask(self) -> np.ndarray:
+        """Выполненные операции с поступлениями"""
+        return np.asarray((self.df["Сумма платежа"] > 0).to_numpy(dtype=bool) & self._ok_mask)
+
+    @cached_property
+    def payment_dates(self) -> pd.Series:
+        """Колонка с датой платежа в формате datetime64"""
+        if pd.api.types.is_datetime64_any_dtype(self.df[PAYMENT_DATE]):
+            return self.df[PAYMENT_DATE]
+        return pd.to_datetime(self.df[PAYMENT_DATE])
+
+    @cached_property
+    def _payment_date_order(self) -> tuple[np.ndarray, np.ndarray | None]:
+        dates_i8 = self.payment_dates.to_numpy(dtype="datetime64[ns]").view("i8")
+        if is_sorted_i8(dates_i8):
+            return dates_i8, None
+        order = np.argsort(dates_i8, kind="stable")
+        return dates_i8[order], order
+
+    def slice_by_payment_date(self, start: datetime | None, end: datetime) -> pd.DataFrame:
+        """Возвращает операции с датой платежа в промежутке [start, end] бинарным поиском.
+        Для отсортированных данных результат - срез без копирования"""
+        dates_i8, order = self._payment_date_order
+        lo, hi = get_window_bounds(dates_i8, start, end)
+        if order is None:
+            result = self.df.iloc[lo:hi]
+            dates = self.payment_dates.iloc[lo:hi]
+        else:
+            # Сохраняем исходный порядок строк
+            positions = np.sort(order[lo:hi])
+            result = self.df.iloc[positions]
+            dates = self.payment_dates.iloc[positions]
+        if result[PAYMENT_DATE].dtype != dates.dtype:
+            result = result.assign(**{PAYMENT_DATE: dates})
+        return result
+
+    @cached_property
+    def spending(self) -> pd.DataFrame:
+        return self.df[self.spending_mask]
+
+    @cached_property
+    def income(self) -> pd.DataFrame:
+        return self.df[self.income_mask]
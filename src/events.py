@@ -0,0 +1,228 @@
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import OperationsDataset
+from src.logger import get_logger
+from src.profiling import profiled, stage
+from src.utils import get_datetime_column, get_range_start
+
+logger = get_logger(__name__)
+
+DATA_RANGES = ("W", "M", "Y", "ALL")
+TOP_CATEGORIES = 7
+CASH_AND_TRANSFERS = ("Наличные", "Переводы")
+DAY_NS = 24 * 60 * 60 * 10**9
+SERIES_KINDS = ("spending", "income")
+# Шаг ряда -> период pandas. Недели начинаются с понедельника, как период W в main_events
+SERIES_FREQUENCIES = {"D": "D", "W": "W-SUN", "M": "M", "Y": "Y"}
+
+
+class EventsWindows:
+    """Расходы и поступления по категориям, накопленные по датам платежа, для main_events за любые периоды.
+    Окна W, M, Y и ALL, заканчивающиеся одной датой, вложены друг в друга, и каждое - разность двух строк
+    накопленных сумм, поэтому все вкладки строятся по одному проходу по данным.
+    Каждый день делится на два отрезка: ровно полночь и остаток дня, - так границы периода совпадают
+    с filter_data_by_range и для дат платежа со временем"""
+
+    def __init__(
+        self,
+        first_day: np.datetime64,
+        categories: pd.Index,
+        spending: np.ndarray,
+        income: np.ndarray,
+        totals: np.ndarray,
+    ) -> None:
+        self.first_day = first_day
+        self.categories = categories
+        # Строка i - суммы (в копейках) и число операций за отрезки раньше i-го, формы (отрезки + 1, категории, 2)
+        self.spending = spending
+        self.income = income
+        # Общие суммы расходов и поступлений, включая операции без категории, формы (отрезки + 1, 2)
+        self.totals = totals
+
+    def _bounds(self, start: datetime | None, end: datetime) -> tuple[int, int]:
+        last = len(self.totals) - 1
+        lo = 0 if start is None else 2 * int((np.datetime64(start, "D") - self.first_day).astype(np.int64))
+        # Отрезок полуночи дня end входит в окно, остаток дня - нет
+        hi = 2 * int((np.datetime64(end, "D") - self.first_day).astype(np.int64)) + 1
+        lo = min(max(lo, 0), last)
+        return lo, min(max(hi, lo), last)
+
+    @staticmethod
+    def _present(categories: pd.Index, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Категории, у которых в окне есть операции, по убыванию суммы"""
+        has_operations = values[:, 1] > 0
+        amounts = values[has_operations, 0]
+        order = np.argsort(-amounts, kind="stable")
+        return categories[has_operations][order], amounts[order]
+
+    def summary(self, date: str, data_range: str = "M") -> dict:
+        """Расходы и поступления за период в формате main_events (без курсов валют и акций)"""
+        current_date = datetime.strptime(date, "%Y-%m-%d")
+        lo, hi = self._bounds(get_range_start(current_date, data_range), current_date)
+        spending = self.spending[hi] - self.spending[lo]
+        income = self.income[hi] - self.income[lo]
+        spent_total, income_total = self.totals[hi] - self.totals[lo]
+
+        categories, amounts = self._present(self.categories, spending)
+        main_spending = [
+            {"category": category, "amount": amount / 100}
+            for category, amount in zip(categories[:TOP_CATEGORIES], amounts[:TOP_CATEGORIES].tolist())
+        ]
+        if len(amounts) > TOP_CATEGORIES:
+            main_spending.append({"category": "Остальное", "amount": int(amounts[TOP_CATEGORIES:].sum()) / 100})
+
+        positions = self.categories.get_indexer(list(CASH_AND_TRANSFERS))
+        transfers_and_cash = [
+            {"category": category, "amount": round(int(spending[position, 0]) / 100) if position >= 0 else 0}
+            for category, position in zip(CASH_AND_TRANSFERS, positions)
+        ]
+        income_categories, income_amounts = self._present(self.categories, income)
+        return {
+            "expenses": {
+                "total_amount": str(int(spent_total) // 100),
+                "main": main_spending,
+                "transfers_and_cash": transfers_and_cash,
+            },
+            "income": {
+                "total_amount": str(int(income_total) // 100),
+                "main": [
+                    {"category": category, "amount": amount / 100}
+                    for category, amount in zip(income_categories, income_amounts.tolist())
+                ],
+            },
+        }
+
+    def series(
+        self,
+        freq: str = "M",
+        kind: str = "spending",
+        start: datetime | str | None = None,
+        end: datetime | str | None = None,
+        categories: list[str] | None = None,
+        cumulative: bool = False,
+        moving_average: int | None = None,
+    ) -> pd.DataFrame:
+        """Расходы или поступления (kind) по категориям за каждый день, неделю, месяц или год (freq).
+        Периоды, в которые попадают даты с start по end, берутся целиком. Строки - начала периодов,
+        колонки - категории (по умолчанию - все, у которых в этих периодах есть операции).
+        Каждое значение - разность двух строк накопленных сумм.
+        cumulative=True - нарастающий итог с начала ряда, moving_average=n - среднее за n периодов
+        (в начале ряда - за доступные периоды)"""
+        if kind not in SERIES_KINDS:
+            raise ValueError(f"Неизвестный вид ряда {kind}, допустимые значения: {', '.join(SERIES_KINDS)}")
+        if freq not in SERIES_FREQUENCIES:
+            raise ValueError(f"Неизвестный шаг ряда {freq}, допустимые значения: {', '.join(SERIES_FREQUENCIES)}")
+        if cumulative and moving_average:
+            raise ValueError("Нарастающий итог и скользящее среднее не применяются вместе")
+        if moving_average is not None and moving_average < 1:
+            raise ValueError("Окно скользящего среднего должно быть не меньше 1")
+
+        last_day = self.first_day + np.timedelta64(max(len(self.totals) - 2, 0) // 2, "D")
+        periods = pd.period_range(
+            pd.Timestamp(self.first_day if start is None else start),
+            pd.Timestamp(last_day if end is None else end),
+            freq=SERIES_FREQUENCIES[freq],
+        )
+        # Границы периодов - полночь: в период входят оба отрезка каждого его дня
+        edges = np.append(
+            periods.start_time.to_numpy(dtype="datetime64[D]"),
+            (periods[-1:] + 1).start_time.to_numpy(dtype="datetime64[D]"),
+        )
+        slots = np.clip(2 * (edges - self.first_day).astype(np.int64), 0, len(self.totals) - 1)
+        values = self.spending if kind == "spending" else self.income
+        buckets = np.diff(values[slots], axis=0)
+
+        if categories is None:
+            columns = np.flatnonzero(buckets[:, :, 1].sum(axis=0) > 0)
+            names = self.categories[columns]
+        else:
+            columns = self.categories.get_indexer(categories)
+            names = pd.Index(categories)
+        # Категории, которых нет в данных, - нулевые ряды
+        amounts = np.where(columns >= 0, buckets[:, columns, 0], 0)
+
+        if moving_average:
+            running = _cumulate(amounts)
+            positions = np.arange(1, len(amounts) + 1)
+            window_starts = np.maximum(positions - moving_average, 0)
+            result = (running[positions] - running[window_starts]) / 100 / (positions - window_starts)[:, np.newaxis]
+        else:
+            result = (np.cumsum(amounts, axis=0) if cumulative else amounts) / 100
+        return pd.DataFrame(result, index=pd.DatetimeIndex(periods.start_time, name="date"), columns=names)
+
+
+def _cumulate(values: np.ndarray) -> np.ndarray:
+    """Накопленные по первой оси суммы с нулевой строкой в начале"""
+    result = np.zeros((len(values) + 1, *values.shape[1:]), dtype=np.int64)
+    np.cumsum(values, axis=0, out=result[1:])
+    return result
+
+
+@profiled()
+def get_events_windows(data: pd.DataFrame | OperationsDataset) -> EventsWindows:
+    """Одним проходом раскладывает расходы и поступления по отрезкам дат платежа и категориям"""
+    logger.info("Функция get_events_windows начинает работу")
+    with stage("filter", rows=len(data)):
+        if isinstance(data, OperationsDataset):
+            df, payment_dates = data.df, data.payment_dates
+        else:
+            df, payment_dates = data, get_datetime_column(data, "Дата платежа")
+        nanoseconds = payment_dates.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        amounts = np.rint(df["Сумма платежа"].to_numpy(dtype=float) * 100)
+        # Сравнение через pandas: для категорий сравниваются коды, а не строки
+        ok = (df["Статус"] == "OK").to_numpy()
+        not_failed = (df["Статус"] != "FAILED").to_numpy()
+        # Вид операции, как в main_events: 0 - расход OK, 1 - поступление OK,
+        # 2 - поступление с другим статусом (кроме FAILED), входит только в общую сумму поступлений
+        kinds = np.where(amounts < 0, np.where(ok, 0, -1), np.where(ok, 1, np.where(not_failed, 2, -1)))
+        rows = (nanoseconds != np.iinfo(np.int64).min) & (amounts != 0) & (kinds >= 0)
+
+    with stage("groupby", rows=int(rows.sum())):
+        categorical = pd.Categorical(df["Категория"])
+        categories = pd.Index(categorical.categories.astype(object))
+        # Операции без категории - в отдельной последней колонке: они входят только в общие суммы
+        codes = np.where(categorical.codes >= 0, categorical.codes, len(categories))[rows]
+        nanoseconds, amounts, kinds = nanoseconds[rows], amounts[rows], kinds[rows]
+
+        day_numbers = nanoseconds // DAY_NS
+        first_day_number = int(day_numbers.min()) if len(day_numbers) else 0
+        slots = 2 * (day_numbers - first_day_number) + (nanoseconds % DAY_NS != 0)
+        shape = (int(slots.max()) + 1 if len(slots) else 0, len(categories) + 1, 3)
+        cells = (slots * shape[1] + codes) * shape[2] + kinds
+        size = shape[0] * shape[1] * shape[2]
+        sums = np.bincount(cells, weights=np.abs(amounts), minlength=size).round().astype(np.int64).reshape(shape)
+        counts = np.bincount(cells, minlength=size).reshape(shape)
+
+        cumulative = _cumulate(np.stack([sums, counts], axis=-1))
+        spending = np.ascontiguousarray(cumulative[:, :-1, 0])
+        income = np.ascontiguousarray(cumulative[:, :-1, 1])
+        totals = np.stack(
+            [cumulative[:, :, 0, 0].sum(axis=1), cumulative[:, :, 1:, 0].sum(axis=(1, 2))],
+            axis=1,
+        )
+    logger.info("Функция get_events_windows завершает работу")
+    return EventsWindows(np.datetime64(first_day_number, "D"), categories, spending, income, totals)
+
+
+def get_operations_series(
+    data: pd.DataFrame | OperationsDataset | EventsWindows,
+    freq: str = "M",
+    kind: str = "spending",
+    **options: Any,
+) -> pd.DataFrame:
+    """Ряды расходов или поступлений по категориям (см. EventsWindows.series). Данные - DF, OperationsDataset,
+    свёртка хранилища операций (OperationsStore.rollup) или уже построенный EventsWindows"""
+    windows = data if isinstance(data, EventsWindows) else get_events_windows(data)
+    return windows.series(freq, kind, **options)
+
+
+def series_payload(series: pd.DataFrame) -> dict:
+    """Ряды в виде, удобном для графиков: {"dates": [...], "series": {категория: [...]}}"""
+    return {
+        "dates": series.index.strftime("%Y-%m-%d").tolist(),
+        "series": {str(category): series[category].round(2).tolist() for category in series.columns},
+    }
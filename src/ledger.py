@@ -0,0 +1,144 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import OperationsDataset
+from src.logger import get_logger
+from src.utils import filter_transaction, get_datetime_column, get_range_start
+
+logger = get_logger(__name__)
+
+# Значения, накапливаемые по (день платежа, карта): траты и кэшбэк в копейках, число операций
+LEDGER_VALUES = ("spent", "cashback", "count")
+
+
+def _to_day(date: datetime | str) -> np.datetime64:
+    return np.datetime64(pd.Timestamp(date).to_datetime64(), "D")
+
+
+class CardLedger:
+    """Траты и кэшбэк по картам, накопленные по дням платежа с начала данных.
+    Итог по карте за любой период - разность двух строк накопленных сумм, поэтому ответ не проходит
+    по операциям. Новые операции добавляются через append без повторного прохода по старым.
+    Границы периода включаются, как в filter_data_by_range. Операции без даты платежа
+    входят только в итог за всё время (start и end не заданы)"""
+
+    def __init__(self) -> None:
+        self.cards = pd.Index([], dtype=object)
+        self.first_day: np.datetime64 = np.datetime64("1970-01-01", "D")
+        # daily[i, j] - значения LEDGER_VALUES за день first_day + i по карте cards[j]
+        self.daily: np.ndarray = np.zeros((0, 0, len(LEDGER_VALUES)), dtype=np.int64)
+        # cumulative[i] - сумма daily за дни раньше first_day + i
+        self.cumulative: np.ndarray = np.zeros((1, 0, len(LEDGER_VALUES)), dtype=np.int64)
+        self.undated: np.ndarray = np.zeros((0, len(LEDGER_VALUES)), dtype=np.int64)
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame | OperationsDataset) -> "CardLedger":
+        ledger = cls()
+        ledger.append(data)
+        return ledger
+
+    @property
+    def last_day(self) -> np.datetime64:
+        return self.first_day + np.timedelta64(len(self.daily) - 1, "D")
+
+    def append(self, data: pd.DataFrame | OperationsDataset) -> None:
+        """Добавляет операции: раскладывает по дням только их и обновляет накопленные суммы"""
+        spending = filter_transaction(data)
+        logger.info("Добавляем в журнал карт %s операций с расходами", len(spending))
+        if spending.empty:
+            return
+        card_values = spending["Номер карты"].to_numpy(dtype=object)
+        has_card = ~pd.isna(card_values)
+        days = get_datetime_column(spending, "Дата платежа").to_numpy(dtype="datetime64[D]")
+        values = np.zeros((len(spending), len(LEDGER_VALUES)), dtype=np.int64)
+        values[:, 0] = np.rint(-spending["Сумма платежа"].to_numpy(dtype=float) * 100)
+        if "Кэшбэк" in spending.columns:
+            values[:, 1] = np.rint(np.nan_to_num(spending["Кэшбэк"].to_numpy(dtype=float)) * 100)
+        values[:, 2] = 1
+
+        card_values, days, values = card_values[has_card], days[has_card], values[has_card]
+        self._add_cards(pd.Index(card_values).unique())
+        card_positions = self.cards.get_indexer(card_values)
+
+        dated = ~np.isnat(days)
+        if (~dated).any():
+            np.add.at(self.undated, card_positions[~dated], values[~dated])
+        if dated.any():
+            self._add_days(days[dated].min(), days[dated].max())
+            offsets = (days[dated] - self.first_day).astype(np.int64)
+            cells = offsets * len(self.cards) + card_positions[dated]
+            flat = self.daily.reshape(-1, len(LEDGER_VALUES))
+            for position in range(len(LEDGER_VALUES)):
+                flat[:, position] += np.bincount(
+                    cells, weights=values[dated, position], minlength=len(flat)
+                ).round().astype(np.int64)
+        self.cumulative = np.zeros((len(self.daily) + 1, len(self.cards), len(LEDGER_VALUES)), dtype=np.int64)
+        np.cumsum(self.daily, axis=0, out=self.cumulative[1:])
+
+    def _add_cards(self, cards: pd.Index) -> None:
+        new_cards = cards.difference(self.cards)
+        if new_cards.empty:
+            return
+        all_cards = self.cards.append(new_cards).astype(str).sort_values()
+        positions = all_cards.get_indexer(self.cards)
+        daily = np.zeros((len(self.daily), len(all_cards), len(LEDGER_VALUES)), dtype=np.int64)
+        daily[:, positions] = self.daily
+        undated = np.zeros((len(all_cards), len(LEDGER_VALUES)), dtype=np.int64)
+        undated[positions] = self.undated
+        self.cards, self.daily, self.undated = all_cards, daily, undated
+
+    def _add_days(self, first_day: np.datetime64, last_day: np.datetime64) -> None:
+        if len(self.daily) == 0:
+            self.first_day = first_day
+            self.daily = np.zeros((int((last_day - first_day).astype(np.int64)) + 1, *self.daily.shape[1:]), np.int64)
+            return
+        before = max(int((self.first_day - first_day).astype(np.int64)), 0)
+        after = max(int((last_day - self.last_day).astype(np.int64)), 0)
+        if before or after:
+            self.daily = np.pad(self.daily, ((before, after), (0, 0), (0, 0)))
+            self.first_day = self.first_day - np.timedelta64(before, "D")
+
+    def _values(self, start: datetime | str | None, end: datetime | str | None) -> tuple[np.ndarray, np.ndarray]:
+        """Возвращает (номера карт с расходами в периоде, их значения LEDGER_VALUES)"""
+        if start is None and end is None:
+            values = self.cumulative[-1] + self.undated
+        else:
+            last = len(self.daily)
+            start_position = 0 if start is None else int((_to_day(start) - self.first_day).astype(np.int64))
+            end_position = last if end is None else int((_to_day(end) - self.first_day).astype(np.int64)) + 1
+            start_position = min(max(start_position, 0), last)
+            end_position = min(max(end_position, start_position), last)
+            values = self.cumulative[end_position] - self.cumulative[start_position]
+        positions = np.flatnonzero(values[:, 2] > 0)
+        return positions, values[positions]
+
+    def totals(self, start: datetime | str | None = None, end: datetime | str | None = None) -> pd.DataFrame:
+        """Траты и кэшбэк (в рублях) и число операций по картам за дни платежа [start, end].
+        Только карты, у которых в периоде есть расходы"""
+        positions, values = self._values(start, end)
+        return pd.DataFrame(
+            {"spent": values[:, 0] / 100, "cashback": values[:, 1] / 100, "count": values[:, 2]},
+            index=pd.Index(self.cards[positions], name="card"),
+        )
+
+    def cards_info(self, start: datetime | str | None = None, end: datetime | str | None = None) -> list[dict]:
+        """Карты за период в формате get_cards_info (кэшбэк - 1% от трат)"""
+        positions, values = self._values(start, end)
+        spent = values[:, 0] / 100
+        return [
+            {"last_digits": str(card)[-4:], "total_spent": total_spent, "cashback": cashback}
+            for card, total_spent, cashback in zip(
+                self.cards[positions], spent.tolist(), np.round(spent / 100, 2).tolist()
+            )
+        ]
+
+    def cards_info_for_range(self, date: str, data_range: str = "M") -> list[dict]:
+        """Карты за период, заканчивающийся датой date ('YYYY-MM-DD'): W-неделя, M-месяц, Y-год, ALL-всё время
+        (без операций, у которых нет даты платежа, как в filter_data_by_range)"""
+        current_date = datetime.strptime(date, "%Y-%m-%d")
+        start_date = get_range_start(current_date, data_range)
+        if start_date is None:
+            start_date = pd.Timestamp(self.first_day).to_pydatetime()
+        return self.cards_info(start_date, current_date)
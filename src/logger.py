@@ -0,0 +1,46 @@
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+
+LOGS_DIR = Path("./logs")
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s %(funcName)s %(lineno)d: %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+LOG_LEVEL_ENV = "BANK_WIDGET_LOG_LEVEL"
+
+_handlers: dict[str, logging.Handler] = {}
+
+
+def _get_file_mode() -> str:
+    # Главный процесс начинает файлы заново, а процессы пула (batch.run_batch) дописывают в них
+    return "w" if multiprocessing.parent_process() is None else "a"
+
+
+def _get_file_handler(file_name: str) -> logging.Handler:
+    # Несколько логгеров одного модуля пишут в файл через общий обработчик
+    if file_name not in _handlers:
+        LOGS_DIR.mkdir(exist_ok=True)
+        handler = logging.FileHandler(LOGS_DIR / file_name, mode=_get_file_mode(), encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+        _handlers[file_name] = handler
+    return _handlers[file_name]
+
+
+def get_logger(name: str, file_name: str | None = None) -> logging.Logger:
+    """Возвращает логгер модуля, который пишет в свой файл logs/<file_name> (по умолчанию - <модуль>.log).
+    Корневой логгер не настраивается, поэтому модули не перехватывают логирование друг у друга.
+    Уровень задаётся переменной окружения BANK_WIDGET_LOG_LEVEL (по умолчанию DEBUG)"""
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        logger.addHandler(_get_file_handler(file_name or f"{name.rsplit('.', 1)[-1]}.log"))
+        logger.setLevel(os.getenv(LOG_LEVEL_ENV, "DEBUG").upper())
+        logger.propagate = False
+    return logger
+
+
+def prepare_worker_logging() -> None:
+    """Вызывается в начале процесса пула. Обработчики, унаследованные от родителя при fork и ещё не открывшие
+    файл, открывают его на дозапись: иначе процессы стирали бы логи друг друга и родителя"""
+    for handler in _handlers.values():
+        if isinstance(handler, logging.FileHandler) and handler.stream is None:
+            handler.mode = "a"
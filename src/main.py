@@ -1,63 +1,102 @@
-import json
-import logging
 from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
 
+from src.dataset import OperationsDataset
+from src.logger import get_logger
+from src.profiling import PROFILER, dump_profile, profiled, stage
+from src.rates import RATES_DIR, RateHistory, convert_operations_currency
 from src.reports import get_spending_by_category
+from src.rollup import OperationsRollup
+from src.serialization import dump_json
 from src.services import get_high_cashback_categories, investment_bank
-from src.utils import get_df_data_from_file
-from src.views import main_events, main_web
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    filename="./logs/main.log",
-    encoding="utf-8",
-    filemode="w",
-    format="%(asctime)s %(levelname)s %(funcName)s %(lineno)d: %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
-logger = logging.getLogger()
-
-
-def main(df: pd.DataFrame, current_date: str, transactions: list[dict]) -> None:
-    """Главная функция, сохраняет в BankWidget.json"""
-    logger.info("Функция main начинает работу")
+from src.utils import get_df_data_from_file, normalize_operations
+from src.views import main_events, main_web, prefetch_market_data
+
+logger = get_logger(__name__, "main.log")
+
+# Даты отчётов запуска `python -m src.main`: выгрузка operations.xlsx покрывает 2018-2021 годы,
+# а примеры транзакций для инвесткопилки - май 2025 года
+MAIN_REPORT_DATES = {"events": "2021-12-31", "cashback": "2018-02", "investment": "2025-05", "spending": "19-11-2021"}
+
+
+@profiled()
+def build_widget(
+    df: pd.DataFrame,
+    current_date: str,
+    transactions: list[dict] | pd.DataFrame,
+    rates: RateHistory | None = None,
+    report_dates: dict[str, str] | None = None,
+) -> dict:
+    """Собирает данные виджета для одного набора операций на дату current_date ('YYYY-MM-DD HH:MM:SS'):
+    события - за её месяц, кэшбэк и инвесткопилка - за её месяц, траты по категории - за три месяца до неё.
+    report_dates задаёт даты отдельных отчётов вместо current_date: events ('YYYY-MM-DD'),
+    cashback и investment ('YYYY-MM'), spending ('DD-MM-YYYY').
+    С историей курсов rates суммы в других валютах сначала переводятся в рубли"""
+    logger.info("Функция build_widget начинает работу")
+    day = datetime.strptime(current_date[:10], "%Y-%m-%d")
+    dates = {
+        "events": f"{day:%Y-%m-%d}",
+        "cashback": f"{day:%Y-%m}",
+        "investment": f"{day:%Y-%m}",
+        "spending": f"{day:%d-%m-%Y}",
+        **(report_dates or {}),
+    }
+    cashback_year, cashback_month = map(int, dates["cashback"].split("-"))
+    with stage("prepare", rows=len(df)):
+        if rates is not None:
+            df = convert_operations_currency(df, rates)
+        # Маски расходов и поступлений считаются один раз для всех функций ниже
+        operations = OperationsDataset(df)
+        # Агрегирующие функции отвечают по свёртке, а не по исходным строкам
+        rollup = OperationsRollup.from_frame(df)
 
     # Главная функция для веб-интерфейса.
     logger.info("Получаем информацию из main_web")
-    main_web_data = main_web(current_date, df)
+    main_web_data = main_web(current_date, operations)
 
     # Главная функция для событий с возможностью фильтрации по периоду
     logger.info("Получаем информацию из main_events")
-    main_events_data = main_events("2021-12-31", df, "M")
+    main_events_data = main_events(dates["events"], rollup, "M")
 
     # Наиболее выгодные для кэшбэка категории
     logger.info("Получаем информацию из high_cashback_categories")
-    high_cashback_categories = get_high_cashback_categories(data=df, year=2018, month=2)
+    high_cashback_categories = get_high_cashback_categories(data=rollup, year=cashback_year, month=cashback_month)
 
     # Возвращает сумму, которую удалось бы отложить в «Инвесткопилку» -> int
     logger.info("Получаем информацию из investment_bank")
-    cashback = investment_bank("2025-05", transactions=transactions, limit=20)
+    cashback = investment_bank(dates["investment"], transactions=transactions, limit=20)
 
     # Возвращает траты по заданной категории за последние три месяца (от переданной даты)
     logger.info("Получаем информацию из get_spending_by_category")
-    spending_by_category = get_spending_by_category(df, "Супермаркеты", "19-11-2021")
+    spending_by_category = get_spending_by_category(operations, "Супермаркеты", dates["spending"])
 
     result = {
         "web_pages": {"main_web_data": main_web_data, "main_events_data": main_events_data},
         "services": {"high_cashback_categories": high_cashback_categories, "investment_bank": cashback},
         "reports": {"spending_by_category": spending_by_category},
     }
+    logger.info("Функция build_widget завершает работу")
+    return result
+
+
+def save_widget(result: dict, path_to_file: Path, compact: bool = False) -> None:
+    """Сохраняет данные виджета в JSON-файл (compact=True - без отступов)"""
+    logger.info("Сохраняем результат в файл %s", path_to_file)
+    with stage("serialize"):
+        dump_json(result, path_to_file, compact=compact, atomic=True)
+
+
+@profiled()
+def main(df: pd.DataFrame, current_date: str, transactions: list[dict], rates: RateHistory | None = None) -> None:
+    """Главная функция, сохраняет в BankWidget.json"""
+    logger.info("Функция main начинает работу")
+    result = build_widget(df, current_date, transactions, rates, MAIN_REPORT_DATES)
 
     filename = Path("./BankWidget.json")
     data_dir = Path("./data")
-    path_to_file = data_dir / filename
-
-    logger.info(f"Сохраняем результат в файл {path_to_file}")
-    with open(path_to_file, "w", encoding="utf-8") as file:
-        json.dump(result, file, ensure_ascii=False, indent=4)
+    save_widget(result, data_dir / filename)
     logger.info("Функция main завершает работу")
 
 
@@ -69,6 +108,15 @@ if __name__ == "__main__":
         {"date": "2025-03-22", "amount": 4400},
     ]
     date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    data = get_df_data_from_file("operations.xlsx")
-
-    main(data, date, transactions_list)
+    # Курсы запрашиваются в фоне, пока читается файл с операциями
+    prefetch_market_data()
+    with stage("load") as load_stage:
+        data = normalize_operations(get_df_data_from_file("operations.xlsx"))
+        load_stage.rows = len(data)
+    # Если рядом с данными есть история курсов ЦБ, суммы в других валютах переводятся в рубли
+    history = RateHistory.from_cbr_archive(RATES_DIR) if RATES_DIR.is_dir() else None
+
+    main(data, date, transactions_list, history)
+    # Замеры этапов сохраняются, если задана переменная окружения BANK_WIDGET_PROFILE
+    if PROFILER.enabled:
+        dump_profile()
@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.logger import get_logger
+from src.utils import AV_API_URL, CBR_EXCHANGE_URL, DATA_DIR, SETTINGS_PATH
+
+logger = get_logger(__name__)
+
+MARKET_CACHE_PATH = DATA_DIR / "market_cache.json"
+DEFAULT_TTL = 60 * 60
+
+
+class MarketDataClient:
+    """Получает курсы валют и цены акций параллельно через одну сессию с пулом соединений.
+    Ответы кэшируются в памяти и на диске на ttl секунд, неудачные запросы повторяются с паузой"""
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        settings_path: Path = SETTINGS_PATH,
+        cache_path: Path | None = MARKET_CACHE_PATH,
+        ttl: float = DEFAULT_TTL,
+        max_workers: int = 8,
+        timeout: float = 10,
+        retries: int = 3,
+        backoff: float = 0.5,
+        cbr_url: str = CBR_EXCHANGE_URL,
+        av_url: str = AV_API_URL,
+    ) -> None:
+        self.api_key = api_key if api_key is not None else os.getenv("AV_API_KEY")
+        self.settings_path = settings_path
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cbr_url = cbr_url
+        self.av_url = av_url
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+        )
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._cache: dict[str, dict] = self._load_disk_cache()
+
+    def _load_disk_cache(self) -> dict[str, dict]:
+        if self.cache_path is None:
+            return {}
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as file:
+                return dict(json.load(file))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_disk_cache(self) -> None:
+        if self.cache_path is None:
+            return
+        # Курсы и акции запрашиваются параллельно и сохраняют кэш одновременно: запись идёт по очереди
+        # (иначе более старый снимок мог бы заменить новый), а временный файл у каждого процесса и потока свой
+        with self._save_lock:
+            with self._lock:
+                data = dict(self._cache)
+            tmp_path = self.cache_path.with_name(
+                f".{self.cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+            )
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as file:
+                    json.dump(data, file, ensure_ascii=False)
+                os.replace(tmp_path, self.cache_path)
+            except OSError as ex:
+                logger.warning("Не удалось сохранить кэш курсов: %s", ex)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+    def _cached(self, key: str) -> Any:
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None and time.time() - entry["time"] < self.ttl:
+            return entry["value"]
+        return None
+
+    def _store(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._cache[key] = {"time": time.time(), "value": value}
+
+    def _get_json(self, url: str, params: dict | None = None) -> Any:
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _read_settings(self) -> dict:
+        logger.info("Открываем файл %s", self.settings_path)
+        with open(self.settings_path, "r") as file:
+            return dict(json.load(file))
+
+    def get_exchange_rates(self, currencies: list[str] | None = None) -> list[dict]:
+        """Возвращает список словарей с курсами валют (по умолчанию из user_settings.json)"""
+        logger.info("Получаем курсы валют")
+        try:
+            if currencies is None:
+                currencies = self._read_settings()["user_currencies"]
+            response = self._cached("cbr")
+            if response is None:
+                response = self._get_json(self.cbr_url)
+                self._store("cbr", response)
+                self._save_disk_cache()
+            return [{"currency": value, "rate": response["Valute"][value]["Value"]} for value in currencies]
+        except Exception as e:
+            logger.error("Ошибка получения курсов валют: %s", e)
+            return []
+
+    def _get_stock_price(self, stock: str) -> dict | None:
+        key = f"stock:{stock}"
+        price = self._cached(key)
+        if price is not None:
+            return {"stock": stock, "price": price}
+        params = {"function": "TIME_SERIES_DAILY", "symbol": stock, "apikey": self.api_key}
+        try:
+            logger.info("Отправляем API запрос для %s", stock)
+            series = self._get_json(self.av_url, params)["Time Series (Daily)"]
+            price = float(series[max(series)]["4. close"])
+        except requests.exceptions.RequestException as e:
+            logger.error("Ошибка: %s", e)
+            return None
+        except (KeyError, ValueError) as e:
+            logger.error("Ключ не найден: %s", e)
+            return None
+        self._store(key, price)
+        return {"stock": stock, "price": price}
+
+    def get_stock_prices(self, stocks: list[str] | None = None) -> list[dict]:
+        """Возвращает список словарей с ценами акций (по умолчанию из user_settings.json).
+        Запросы по всем тикерам выполняются параллельно"""
+        logger.info("Получаем цены акций")
+        if not self.api_key:
+            logger.error("API ключ не найден")
+            raise ValueError("API ключ не найден")
+        if stocks is None:
+            try:
+                stocks = self._read_settings()["user_stocks"]
+            except (FileNotFoundError, KeyError) as ex:
+                logger.error("Ошибка чтения настроек: %s", ex)
+                return []
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(len(stocks), 1))) as executor:
+            prices = list(executor.map(self._get_stock_price, stocks))
+        self._save_disk_cache()
+        return [price for price in prices if price is not None]
+
+    def get_market_data(self) -> dict:
+        """Возвращает курсы валют и цены акций, запрашивая их одновременно"""
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            rates = executor.submit(self.get_exchange_rates)
+            stocks = executor.submit(self.get_stock_prices)
+            result = {"currency_rates": rates.result()}
+            try:
+                result["stock_prices"] = stocks.result()
+            except ValueError:
+                result["stock_prices"] = []
+        return result
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable
+
+from src.logger import LOGS_DIR, get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_ENV = "BANK_WIDGET_PROFILE"
+
+
+class _NullStage:
+    """Этап, который ничего не измеряет. Возвращается, когда профилирование выключено"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        return None
+
+    @property
+    def rows(self) -> None:
+        return None
+
+    @rows.setter
+    def rows(self, value: int) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Stage:
+    """Замер одного этапа: время по часам, процессорное время потока и число строк.
+    Вложенные этапы записываются с путём родителя: build_widget/main_web/groupby"""
+
+    __slots__ = ("profiler", "name", "rows", "_path", "_wall", "_cpu")
+
+    def __init__(self, profiler: "Profiler", name: str, rows: int | None = None) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self) -> "Stage":
+        stack = self.profiler._stack()
+        stack.append(self.name)
+        self._path = "/".join(stack)
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        self.profiler._stack().pop()
+        self.profiler._record(self._path, wall, cpu, self.rows)
+
+
+class Profiler:
+    """Собирает замеры этапов конвейера виджета. Выключенный профилировщик возвращает пустой этап,
+    поэтому замеры в горячих функциях почти ничего не стоят"""
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages: dict[str, dict] = {}
+            self.started = datetime.now()
+            self._started_wall = time.perf_counter()
+
+    def _stack(self) -> list[str]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        stack: list[str] = self._local.stack
+        return stack
+
+    def _record(self, path: str, wall: float, cpu: float, rows: int | None) -> None:
+        with self._lock:
+            stats = self._stages.setdefault(path, {"stage": path, "calls": 0, "wall": 0.0, "cpu": 0.0, "rows": None})
+            stats["calls"] += 1
+            stats["wall"] += wall
+            stats["cpu"] += cpu
+            if rows is not None:
+                stats["rows"] = (stats["rows"] or 0) + rows
+        logger.debug("Этап %s: %.6f с, CPU %.6f с, строк %s", path, wall, cpu, rows)
+
+    def stage(self, name: str, rows: int | None = None) -> Stage | _NullStage:
+        """Контекстный менеджер для замера этапа. Число строк можно передать сразу или задать через .rows"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return Stage(self, name, rows)
+
+    def report(self) -> dict:
+        """Возвращает замеры в виде словаря, пригодного для JSON"""
+        with self._lock:
+            stages = [dict(stats) for stats in self._stages.values()]
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "total_wall": time.perf_counter() - self._started_wall,
+            "stages": stages,
+        }
+
+    def dump(self, path: Path | None = None) -> Path:
+        """Сохраняет замеры в JSON-файл (по умолчанию logs/profile_<дата>_<время>_<pid>.json) и возвращает путь"""
+        if path is None:
+            path = LOGS_DIR / f"profile_{self.started:%Y%m%d_%H%M%S}_{os.getpid()}.json"
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.report(), file, ensure_ascii=False, indent=4)
+        logger.info("Профиль сохранён в %s", path)
+        return path
+
+
+PROFILER = Profiler(enabled=bool(os.getenv(PROFILE_ENV)))
+
+
+def stage(name: str, rows: int | None = None) -> Stage | _NullStage:
+    """Замер этапа общим профилировщиком: with stage("groupby", rows=len(df)): ..."""
+    return PROFILER.stage(name, rows)
+
+
+def profiled(name: str | None = None) -> Callable:
+    """(Декоратор) Замеряет каждый вызов функции как отдельный этап. Пока профилирование выключено,
+    функция вызывается напрямую"""
+
+    def decorator(func: Callable) -> Callable:
+        stage_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            with PROFILER.stage(stage_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def enable_profiling(reset: bool = True) -> None:
+    """Включает профилирование (также включается переменной окружения BANK_WIDGET_PROFILE)"""
+    if reset:
+        PROFILER.reset()
+    PROFILER.enabled = True
+
+
+def disable_profiling() -> None:
+    PROFILER.enabled = False
+
+
+def get_profile() -> dict:
+    return PROFILER.report()
+
+
+def dump_profile(path: Path | None = None) -> Path:
+    return PROFILER.dump(path)
@@ -0,0 +1,247 @@
+import json
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+import requests
+
+from src.logger import get_logger
+from src.utils import DATA_DIR, get_datetime_column
+
+logger = get_logger(__name__)
+
+BASE_CURRENCY = "RUB"
+RATES_DIR = DATA_DIR / "rates"
+CBR_FILE_NAME = "daily_json.js"
+# Архив ЦБ хранит ответы daily_json.js по дням: archive/гггг/мм/дд/daily_json.js
+CBR_ARCHIVE_URL = "https://www.cbr-xml-daily.ru/archive/{date:%Y/%m/%d}/" + CBR_FILE_NAME
+RATE_COLUMNS = ("date", "currency", "rate")
+# Колонка суммы -> колонка её валюты в выгрузке банка
+AMOUNT_CURRENCY_COLUMNS = {"Сумма операции": "Валюта операции", "Сумма платежа": "Валюта платежа"}
+DAY_NS = 24 * 60 * 60 * 10**9
+
+
+def parse_cbr_daily(response: dict) -> pd.DataFrame:
+    """Курсы из ответа ЦБ в формате daily_json.js: дата, валюта и рублей за единицу валюты (Value / Nominal)"""
+    day = pd.Timestamp(str(response["Date"])[:10])
+    valutes = response.get("Valute", {})
+    return pd.DataFrame(
+        {
+            "date": [day] * len(valutes),
+            "currency": list(valutes),
+            "rate": [valute["Value"] / valute.get("Nominal", 1) for valute in valutes.values()],
+        }
+    )
+
+
+def get_archive_path(directory: Path, day: date | datetime) -> Path:
+    """Путь к ответу ЦБ за день в папке с той же раскладкой, что и архив ЦБ"""
+    return directory / f"{day:%Y}" / f"{day:%m}" / f"{day:%d}" / CBR_FILE_NAME
+
+
+class RateHistory:
+    """История курсов валют к рублю по дням. Курс на дату - последний известный не позже этой даты
+    (ЦБ не устанавливает курсы на выходные и праздники). Курс каждой пары (валюта, день) ищется
+    в истории один раз и дальше берётся из кэша, поэтому пересчёт сумм не проходит по операциям
+    поштучно и не обращается к сети"""
+
+    def __init__(self, rates: pd.DataFrame | None = None) -> None:
+        self.rates = pd.DataFrame(
+            {
+                "date": pd.Series(dtype="datetime64[ns]"),
+                "currency": pd.Series(dtype=object),
+                "rate": pd.Series(dtype=float),
+            }
+        )
+        self._cache: dict[tuple[str, int], float] = {}
+        self._hits = 0
+        self._misses = 0
+        if rates is not None:
+            self.add(rates)
+
+    @classmethod
+    def from_cbr_responses(cls, responses: Iterable[dict]) -> "RateHistory":
+        history = cls()
+        history.add(pd.concat([parse_cbr_daily(response) for response in responses] or [history.rates]))
+        return history
+
+    @classmethod
+    def from_cbr_archive(cls, directory: Path = RATES_DIR) -> "RateHistory":
+        """Читает все ответы ЦБ из папки с раскладкой архива ЦБ (гггг/мм/дд/daily_json.js)"""
+        logger.info("Читаем историю курсов из %s", directory)
+        responses = []
+        for path in sorted(Path(directory).glob(f"*/*/*/{CBR_FILE_NAME}")):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    responses.append(json.load(file))
+            except (OSError, json.JSONDecodeError) as ex:
+                logger.warning("Пропускаем файл курсов %s: %s", path, ex)
+        return cls.from_cbr_responses(responses)
+
+    @classmethod
+    def load(cls, path: Path) -> "RateHistory":
+        """Читает историю, сохранённую save (CSV с колонками date, currency, rate)"""
+        logger.info("Читаем историю курсов из %s", path)
+        return cls(pd.read_csv(path, parse_dates=["date"]))
+
+    def save(self, path: Path) -> None:
+        logger.info("Сохраняем историю курсов в %s", path)
+        self.rates.to_csv(path, index=False, date_format="%Y-%m-%d")
+
+    def add(self, rates: pd.DataFrame) -> None:
+        """Добавляет курсы (колонки date, currency, rate). Курс за уже известный день заменяет прежний"""
+        missing = [column for column in RATE_COLUMNS if column not in rates.columns]
+        if missing:
+            raise ValueError(f"В таблице курсов нет колонок: {', '.join(missing)}")
+        rates = pd.DataFrame(
+            {
+                "date": pd.to_datetime(rates["date"]).dt.normalize().astype("datetime64[ns]"),
+                "currency": rates["currency"].astype(str).str.upper().to_numpy(dtype=object),
+                "rate": rates["rate"].to_numpy(dtype=float),
+            }
+        )
+        combined = pd.concat([self.rates, rates], ignore_index=True) if len(self.rates) else rates
+        self.rates = (
+            combined.drop_duplicates(["date", "currency"], keep="last")
+            .sort_values(["date", "currency"], kind="stable")
+            .reset_index(drop=True)
+        )
+        self._cache.clear()
+
+    def add_cbr_response(self, response: dict) -> None:
+        self.add(parse_cbr_daily(response))
+
+    @property
+    def currencies(self) -> list[str]:
+        return sorted(self.rates["currency"].unique())
+
+    def __len__(self) -> int:
+        return len(self.rates)
+
+    def cache_info(self) -> dict:
+        """Число пар (валюта, день) в кэше и число попаданий и промахов, как у functools.lru_cache"""
+        return {"pairs": len(self._cache), "hits": self._hits, "misses": self._misses}
+
+    def get_rates(self, currencies: Any, dates: Any) -> np.ndarray:
+        """Курс (рублей за единицу валюты) для каждой пары валюта-дата. Время даты не учитывается.
+        Рубль - 1; валюта без курса на эту дату или раньше, пустая валюта или дата - NaN"""
+        currency_codes, currency_names = pd.factorize(pd.Series(currencies, dtype=object).str.upper())
+        day_numbers = pd.DatetimeIndex(dates).to_numpy(dtype="datetime64[ns]").view(np.int64)
+        valid = (currency_codes >= 0) & (day_numbers != np.iinfo(np.int64).min)
+        day_numbers = np.where(valid, day_numbers // DAY_NS, 0)
+        result = np.full(len(currency_codes), np.nan)
+        if not valid.any():
+            return result
+
+        # Каждая пара (валюта, день) ищется один раз, сколько бы операций на неё ни приходилось
+        width = len(currency_names)
+        keys, inverse = np.unique(day_numbers[valid] * width + currency_codes[valid], return_inverse=True)
+        pairs = [(currency_names[key % width], key // width) for key in keys.tolist()]
+        values = np.array([self._cache.get(pair, np.nan) for pair in pairs])
+        missing = [position for position, pair in enumerate(pairs) if pair not in self._cache]
+        self._hits += len(pairs) - len(missing)
+        self._misses += len(missing)
+        if missing:
+            values[missing] = self._lookup([pairs[position] for position in missing])
+            self._cache.update(zip((pairs[position] for position in missing), values[missing].tolist()))
+        result[valid] = values[inverse.reshape(-1)]
+        return result
+
+    def _lookup(self, pairs: list[tuple[str, int]]) -> np.ndarray:
+        """Ищет курсы пар (валюта, номер дня) в истории слиянием as-of"""
+        requested = pd.DataFrame(
+            {
+                "currency": [currency for currency, _ in pairs],
+                "date": np.array([day for _, day in pairs], dtype="datetime64[D]").astype("datetime64[ns]"),
+                "position": np.arange(len(pairs)),
+            }
+        ).sort_values("date", kind="stable")
+        merged = pd.merge_asof(requested, self.rates, on="date", by="currency", direction="backward")
+        values = np.empty(len(pairs))
+        values[merged["position"].to_numpy()] = merged["rate"].to_numpy(dtype=float)
+        values[np.array([currency == BASE_CURRENCY for currency, _ in pairs])] = 1.0
+        return values
+
+    def convert(self, amounts: Any, currencies: Any, dates: Any, base: str = BASE_CURRENCY) -> np.ndarray:
+        """Переводит суммы в валютах currencies в валюту base по курсам на даты dates. Нет курса - NaN"""
+        rates = self.get_rates(currencies, dates)
+        if base != BASE_CURRENCY:
+            rates = rates / self.get_rates(np.full(len(rates), base, dtype=object), dates)
+        converted: np.ndarray = np.asarray(amounts, dtype=float) * rates
+        return converted
+
+
+def convert_operations_currency(
+    df: pd.DataFrame,
+    history: RateHistory,
+    base: str = BASE_CURRENCY,
+    date_column: str = "Дата операции",
+) -> pd.DataFrame:
+    """Переводит суммы операций и платежей (AMOUNT_CURRENCY_COLUMNS) в валюту base по курсам на дату операции
+    и записывает base в колонки валют. После этого суммы по картам с платежами в разных валютах складываются
+    верно. Суммы, для которых в истории нет курса, остаются в своей валюте (с предупреждением в логе)"""
+    logger.info("Функция convert_operations_currency начинает работу")
+    result = df.copy(deep=False)
+    dates = get_datetime_column(df, date_column, dayfirst=True)
+    for amount_column, currency_column in AMOUNT_CURRENCY_COLUMNS.items():
+        if amount_column not in df.columns or currency_column not in df.columns:
+            continue
+        currencies = df[currency_column].astype(object).to_numpy()
+        foreign = pd.notna(currencies) & (currencies != base)
+        if not foreign.any():
+            continue
+        converted = history.convert(
+            df[amount_column].to_numpy(dtype=float)[foreign], currencies[foreign], dates.to_numpy()[foreign], base
+        )
+        known = ~np.isnan(converted)
+        if not known.all():
+            logger.warning(
+                "Нет курсов для %s сумм в колонке %s (валюты: %s)",
+                int((~known).sum()),
+                amount_column,
+                ", ".join(sorted(map(str, set(currencies[foreign][~known])))),
+            )
+        positions = np.flatnonzero(foreign)[known]
+        amounts = df[amount_column].to_numpy(dtype=float, copy=True)
+        amounts[positions] = converted[known]
+        currencies = currencies.copy()
+        currencies[positions] = base
+        result[amount_column] = amounts
+        result[currency_column] = currencies
+    logger.info("Функция convert_operations_currency завершает работу")
+    return result
+
+
+def fetch_cbr_archive(
+    days: Iterable[date | datetime],
+    directory: Path = RATES_DIR,
+    url: str = CBR_ARCHIVE_URL,
+    session: requests.Session | None = None,
+    timeout: float = 10,
+) -> int:
+    """Скачивает ответы ЦБ за дни, которых ещё нет в папке, и сохраняет их с раскладкой архива ЦБ.
+    Дни без курсов (архив отвечает 404) пропускаются. Возвращает число сохранённых дней"""
+    session = session or requests.Session()
+    saved = 0
+    for day in days:
+        path = get_archive_path(Path(directory), day)
+        if path.exists():
+            continue
+        try:
+            response = session.get(url.format(date=day), timeout=timeout)
+            if response.status_code == 404:
+                logger.info("Нет курсов ЦБ за %s", f"{day:%Y-%m-%d}")
+                continue
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as ex:
+            logger.error("Не удалось получить курсы ЦБ за %s: %s", f"{day:%Y-%m-%d}", ex)
+            continue
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False)
+        saved += 1
+    logger.info("Сохранено курсов ЦБ за %s дней", saved)
+    return saved
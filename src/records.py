@@ -0,0 +1,178 @@
+from datetime import datetime
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Поле записи -> колонка выгрузки банка
+OPERATION_FIELDS = {
+    "operation_date": "Дата операции",
+    "payment_date": "Дата платежа",
+    "card": "Номер карты",
+    "status": "Статус",
+    "operation_amount": "Сумма операции",
+    "operation_currency": "Валюта операции",
+    "amount": "Сумма платежа",
+    "payment_currency": "Валюта платежа",
+    "cashback": "Кэшбэк",
+    "category": "Категория",
+    "mcc": "MCC",
+    "description": "Описание",
+    "bonuses": "Бонусы (включая кэшбэк)",
+    "investment_round_up": "Округление на инвесткопилку",
+    "rounded_amount": "Сумма операции с округлением",
+}
+OPERATION_DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
+
+
+class OperationRecord:
+    """Одна операция из выгрузки банка. В отличие от словаря не хранит ключи и хэш-таблицу в каждой записи:
+    значения лежат в слотах, поэтому запись занимает в несколько раз меньше памяти"""
+
+    __slots__ = tuple(OPERATION_FIELDS)
+    # Слоты по полям OPERATION_FIELDS; аннотации - для проверки типов
+    operation_date: Any
+    payment_date: Any
+    card: Any
+    status: Any
+    operation_amount: Any
+    operation_currency: Any
+    amount: Any
+    payment_currency: Any
+    cashback: Any
+    category: Any
+    mcc: Any
+    description: Any
+    bonuses: Any
+    investment_round_up: Any
+    rounded_amount: Any
+
+    def __init__(self, *values: Any, **fields: Any) -> None:
+        if len(values) > len(self.__slots__):
+            raise TypeError(f"Ожидается не больше {len(self.__slots__)} значений, получено {len(values)}")
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+        for name in self.__slots__[len(values):]:
+            setattr(self, name, fields.pop(name, None))
+        if fields:
+            raise TypeError(f"Неизвестные поля операции: {', '.join(fields)}")
+
+    @classmethod
+    def from_dict(cls, row: dict) -> "OperationRecord":
+        """Создаёт запись из словаря с колонками выгрузки (как в get_data_from_excel). Нет колонки - None"""
+        return cls(*(row.get(column) for column in OPERATION_FIELDS.values()))
+
+    def to_dict(self) -> dict:
+        """Возвращает словарь с колонками выгрузки"""
+        return {column: getattr(self, name) for name, column in OPERATION_FIELDS.items()}
+
+    def __iter__(self) -> Iterator[Any]:
+        return (getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, OperationRecord):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+def records_from_frame(df: pd.DataFrame) -> list[OperationRecord]:
+    """Переводит DF с колонками выгрузки в список записей. Отсутствующие колонки заполняются None"""
+    missing = [None] * len(df)
+    columns = [df[column].tolist() if column in df.columns else missing for column in OPERATION_FIELDS.values()]
+    return [OperationRecord(*values) for values in zip(*columns)]
+
+
+def records_from_dicts(rows: Iterable[dict]) -> list[OperationRecord]:
+    return [OperationRecord.from_dict(row) for row in rows]
+
+
+def records_to_dicts(records: Iterable[OperationRecord]) -> list[dict]:
+    return [record.to_dict() for record in records]
+
+
+def records_to_frame(records: Iterable[OperationRecord]) -> pd.DataFrame:
+    """Переводит записи обратно в DF с колонками выгрузки"""
+    return pd.DataFrame.from_records([tuple(record) for record in records], columns=list(OPERATION_FIELDS.values()))
+
+
+def _to_datetime64(dates: Iterable[Any]) -> np.ndarray:
+    """Даты строками в формате выгрузки ('дд.мм.гггг чч:мм:сс'), datetime или Timestamp -> datetime64[ns]"""
+    series = pd.Series(list(dates), dtype=object)
+    try:
+        parsed = pd.to_datetime(series, format=OPERATION_DATE_FORMAT)
+    except ValueError:
+        # Другой формат строк, например 'гггг-мм-дд' из примеров investment_bank
+        parsed = pd.to_datetime(series)
+    return np.asarray(parsed.to_numpy(dtype="datetime64[ns]"))
+
+
+class TransactionArray:
+    """Транзакции для investment_bank в виде двух массивов NumPy (даты и суммы) вместо списка словарей
+    {"date": ..., "amount": ...}: 16 байт на транзакцию, месяцы считаются без DataFrame"""
+
+    __slots__ = ("dates", "amounts")
+
+    def __init__(self, dates: np.ndarray, amounts: np.ndarray) -> None:
+        if len(dates) != len(amounts):
+            raise ValueError(f"Разная длина массивов дат ({len(dates)}) и сумм ({len(amounts)})")
+        self.dates = np.asarray(dates, dtype="datetime64[ns]")
+        self.amounts = np.asarray(amounts, dtype=float)
+
+    @classmethod
+    def from_dicts(cls, transactions: Iterable[dict]) -> "TransactionArray":
+        """Из списка словарей {"date": ..., "amount": ...} (формат investment_bank)"""
+        transactions = list(transactions)
+        dates = _to_datetime64(transaction["date"] for transaction in transactions)
+        return cls(dates, np.asarray([transaction["amount"] for transaction in transactions], dtype=float))
+
+    @classmethod
+    def from_records(cls, records: Iterable[OperationRecord]) -> "TransactionArray":
+        """Из записей операций: дата операции и сумма операции"""
+        records = list(records)
+        dates = _to_datetime64(record.operation_date for record in records)
+        return cls(dates, np.asarray([record.operation_amount for record in records], dtype=float))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "TransactionArray":
+        """Из DF с колонками date/amount или с колонками выгрузки банка"""
+        if "date" in df.columns:
+            dates, amounts = df["date"], df["amount"]
+        else:
+            amount_column = "Сумма операции" if "Сумма операции" in df.columns else "Сумма платежа"
+            dates, amounts = df["Дата операции"], df[amount_column]
+        if pd.api.types.is_datetime64_any_dtype(dates):
+            dates = dates.to_numpy(dtype="datetime64[ns]")
+        else:
+            dates = _to_datetime64(dates)
+        return cls(dates, amounts.to_numpy(dtype=float))
+
+    @property
+    def months(self) -> np.ndarray:
+        return self.dates.astype("datetime64[M]")
+
+    @property
+    def nbytes(self) -> int:
+        return self.dates.nbytes + self.amounts.nbytes
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def __getitem__(self, key: Any) -> "TransactionArray":
+        """Срез, маска или номер транзакции - всегда TransactionArray"""
+        return TransactionArray(np.atleast_1d(self.dates[key]), np.atleast_1d(self.amounts[key]))
+
+    def to_dicts(self) -> list[dict]:
+        """Обратно в список словарей {"date": datetime, "amount": float}"""
+        dates: list[datetime] = pd.DatetimeIndex(self.dates).to_pydatetime().tolist()
+        return [{"date": date, "amount": amount} for date, amount in zip(dates, self.amounts.tolist())]
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({"date": self.dates, "amount": self.amounts})
@@ -1,24 +1,30 @@
+import copy
+import hashlib
+import inspect
 import json
-import logging
 import os
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
+from pathlib import Path
 from typing import Any, Callable, Optional
 
+import numpy as np
 import pandas as pd
 
-from src.utils import filter_transaction
+from src.cache import get_frame_fingerprint
+from src.dataset import OperationsDataset
+from src.logger import get_logger
+from src.profiling import profiled, stage
+from src.serialization import dump_json
+from src.utils import filter_transaction, get_datetime_column
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    filename="./logs/reports.log",
-    encoding="utf-8",
-    filemode="w",
-    format="%(asctime)s %(levelname)s %(funcName)s %(lineno)d: %(message)s",
-    datefmt="%Y-%m-%d -%H:%M:%S",
-)
+logger = get_logger(__name__)
 
-logger = logging.getLogger()
+SPENDING_WINDOW_KEYS = ["Категория", "Описание"]
+REPORTS_DIR = Path("reports")
+FINGERPRINT_SUFFIX = ".fingerprint"
 
 
 def report_to_selected_file(filename: str = "report_file.txt") -> Any:
@@ -30,13 +36,13 @@ def report_to_selected_file(filename: str = "report_file.txt") -> Any:
     def decorator(func: Callable) -> Any:
         @wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> Any:
-            logger.info(f"Запускаем функцию {func}")
+            logger.info("Запускаем функцию %s", func)
             result = func(*args, **kwargs)
             filepath = os.path.join("reports", filename)
 
-            logger.info(f"Записываем отчёт в файл {filename}")
-            with open(filepath, "w", encoding="utf-8") as file:
-                json.dump(result, file, indent=4, ensure_ascii=False)
+            logger.info("Записываем отчёт в файл %s", filename)
+            with stage("serialize"):
+                dump_json(result, filepath)
             logger.info("Завершаем работу декоратора")
             return result
 
@@ -45,9 +51,229 @@ def report_to_selected_file(filename: str = "report_file.txt") -> Any:
     return decorator
 
 
-def get_spending_by_category(transactions: pd.DataFrame, category: str, date: Optional[str] = None) -> Any:
+def _fingerprint_value(value: Any) -> Any:
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return ["frame", get_frame_fingerprint(value)]
+    if isinstance(value, OperationsDataset):
+        return ["dataset", value.fingerprint]
+    if isinstance(value, np.ndarray):
+        digest = hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()
+        return ["array", str(value.dtype), value.shape, digest]
+    if isinstance(value, (list, tuple)):
+        return [_fingerprint_value(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _fingerprint_value(item) for key, item in value.items()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    # Для прочих объектов repr; если он содержит адрес объекта, отчёт просто не найдётся в кэше
+    return repr(value)
+
+
+def get_arguments_fingerprint(func: Callable, arguments: dict) -> str:
+    """Отпечаток вызова функции: имя функции и значения аргументов. DF хэшируются по содержимому,
+    для OperationsDataset берётся уже посчитанный отпечаток"""
+    key = [func.__module__, func.__qualname__, _fingerprint_value(arguments)]
+    return hashlib.sha256(json.dumps(key, ensure_ascii=False, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def cached_report(
+    filename: str = "report_file.txt",
+    maxsize: int = 32,
+    reports_dir: Path = REPORTS_DIR,
+    time_arguments: tuple[str, ...] = ("date",),
+) -> Callable:
+    """(Декоратор) Записывает отчёт в файл, как report_to_selected_file, но не пересчитывает его
+    при тех же аргументах. Последние maxsize результатов хранятся в памяти, а рядом с файлом отчёта
+    лежит отпечаток аргументов, по которому отчёт берётся с диска. Файл пишется атомарно.
+    Отчёт, прочитанный с диска, проходит через JSON (ключи словарей - строки).
+    time_arguments - аргументы, вместо которых при None функция берёт текущее время: такой отчёт
+    зависит от момента вызова, поэтому всегда считается заново и в кэш не попадает"""
+
+    def decorator(func: Callable) -> Any:
+        signature = inspect.signature(func)
+        results: OrderedDict[str, Any] = OrderedDict()
+        lock = threading.Lock()
+        report_path = Path(reports_dir) / filename
+        fingerprint_path = report_path.with_name(report_path.name + FINGERPRINT_SUFFIX)
+
+        def read_from_disk(key: str) -> tuple[bool, Any]:
+            try:
+                with open(fingerprint_path, "r", encoding="utf-8") as file:
+                    if json.load(file)["fingerprint"] != key:
+                        return False, None
+                with open(report_path, "r", encoding="utf-8") as file:
+                    return True, json.load(file)
+            except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+                return False, None
+
+        def write_to_disk(key: str | None, result: Any) -> None:
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            # Старый отпечаток удаляется до замены отчёта, чтобы он не указал на чужой отчёт
+            fingerprint_path.unlink(missing_ok=True)
+            with stage("serialize"):
+                dump_json(result, report_path, atomic=True)
+            if key is not None:
+                dump_json({"function": func.__qualname__, "fingerprint": key}, fingerprint_path, atomic=True)
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if any(name in bound.arguments and bound.arguments[name] is None for name in time_arguments):
+                logger.info("Отчёт %s зависит от текущего времени, запускаем функцию %s", filename, func.__qualname__)
+                result = func(*args, **kwargs)
+                write_to_disk(None, result)
+                return result
+            key = get_arguments_fingerprint(func, bound.arguments)
+            with lock:
+                if key in results:
+                    results.move_to_end(key)
+                    logger.info("Отчёт %s взят из памяти", filename)
+                    return copy.deepcopy(results[key])
+
+            found, result = read_from_disk(key)
+            if found:
+                logger.info("Отчёт %s взят из файла", filename)
+            else:
+                logger.info("Запускаем функцию %s", func.__qualname__)
+                result = func(*args, **kwargs)
+                logger.info("Записываем отчёт в файл %s", report_path)
+                write_to_disk(key, result)
+
+            with lock:
+                results[key] = copy.deepcopy(result)
+                while len(results) > maxsize:
+                    results.popitem(last=False)
+            return result
+
+        wrapper.cache_clear = results.clear  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
+
+
+class SpendingWindows:
+    """Траты по дням для каждой группы операций (по умолчанию - категория и описание), накопленные с начала данных.
+    Сумма за окно [конец - days, конец] - разность двух строк накопленных сумм, поэтому запрос за одну дату
+    не проходит по операциям, а окна на каждый день года считаются одной операцией над массивами.
+    Границы окна, как и в get_spending_by_category, - начало дня: операции за сам день конца окна
+    не входят, кроме совершённых ровно в 00:00:00"""
+
+    def __init__(
+        self,
+        first_day: np.datetime64,
+        groups: pd.Index,
+        cumulative: np.ndarray,
+        counts: np.ndarray,
+        midnight: tuple[np.ndarray, np.ndarray, np.ndarray],
+    ) -> None:
+        self.first_day = first_day
+        self.groups = groups
+        # Строка i - траты (в копейках) и число операций за дни раньше first_day + i
+        self.cumulative = cumulative
+        self.counts = counts
+        # Операции ровно в 00:00:00 (номер дня, номер группы, сумма в копейках), отсортированы по дню
+        self.midnight = midnight
+
+    @property
+    def by(self) -> list[str]:
+        return list(self.groups.names)
+
+    def _windows(self, ends: np.ndarray, days: int) -> tuple[np.ndarray, np.ndarray]:
+        end_offsets = (ends - self.first_day).astype(np.int64)
+        last = len(self.cumulative) - 1
+        end_positions = np.clip(end_offsets, 0, last)
+        start_positions = np.clip(end_offsets - days, 0, last)
+        amounts = self.cumulative[end_positions] - self.cumulative[start_positions]
+        counts = self.counts[end_positions] - self.counts[start_positions]
+
+        # Операции в 00:00:00 самого дня конца окна тоже входят в окно
+        midnight_days, midnight_groups, midnight_amounts = self.midnight
+        lo = np.searchsorted(midnight_days, end_offsets, side="left")
+        hi = np.searchsorted(midnight_days, end_offsets, side="right")
+        lengths = hi - lo
+        if lengths.any():
+            rows = np.repeat(np.arange(len(ends)), lengths)
+            positions = np.repeat(lo - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            np.add.at(amounts, (rows, midnight_groups[positions]), midnight_amounts[positions])
+            np.add.at(counts, (rows, midnight_groups[positions]), 1)
+        return amounts, counts
+
+    def window(self, end: datetime | str, days: int = 90) -> pd.Series:
+        """Траты (со знаком минус) за days дней до даты end по группам, у которых в окне были операции"""
+        ends = np.array([pd.Timestamp(end).normalize().to_datetime64()], dtype="datetime64[D]")
+        amounts, counts = self._windows(ends, days)
+        has_operations = counts[0] > 0
+        return pd.Series(amounts[0][has_operations] / 100, index=self.groups[has_operations])
+
+    def trend(
+        self,
+        days: int = 90,
+        freq: str = "D",
+        start: datetime | str | None = None,
+        end: datetime | str | None = None,
+    ) -> pd.DataFrame:
+        """Траты за скользящее окно в days дней, заканчивающееся каждым днём (freq="D")
+        или последним днём каждого месяца (freq="M"). Строки - даты конца окна, колонки - группы"""
+        if start is None:
+            start = pd.Timestamp(self.first_day)
+        if end is None:
+            end = pd.Timestamp(self.first_day + np.timedelta64(len(self.cumulative) - 1, "D"))
+        dates = pd.date_range(
+            pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq="ME" if freq == "M" else freq
+        )
+        amounts, _ = self._windows(dates.to_numpy().astype("datetime64[D]"), days)
+        return pd.DataFrame(amounts / 100, index=dates, columns=self.groups)
+
+
+@profiled()
+def get_spending_windows(
+    data: pd.DataFrame | OperationsDataset, by: str | list[str] = SPENDING_WINDOW_KEYS
+) -> SpendingWindows:
+    """Строит накопленные по дням траты для каждой группы одним проходом по данным"""
+    logger.info("Функция get_spending_windows начинает работу")
+    keys = [by] if isinstance(by, str) else list(by)
+    with stage("filter", rows=len(data)):
+        spending = filter_transaction(data)
+        dates = get_datetime_column(spending, "Дата операции", dayfirst=True).to_numpy(dtype="datetime64[ns]")
+
+    with stage("groupby", rows=len(spending)):
+        grouped = spending.groupby(keys, observed=True, sort=True)
+        groups = grouped.size().index
+        codes = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+        known = (codes >= 0) & ~np.isnat(dates)
+        codes, dates = codes[known], dates[known]
+        # Суммы в копейках складываются без накопления ошибки округления
+        amounts = np.rint(spending["Сумма платежа"].to_numpy(dtype=float)[known] * 100).astype(np.int64)
+
+        operation_days = dates.astype("datetime64[D]")
+        first_day = operation_days.min() if len(operation_days) else np.datetime64("1970-01-01", "D")
+        day_offsets = (operation_days - first_day).astype(np.int64)
+        days_count = int(day_offsets.max()) + 1 if len(day_offsets) else 0
+        cells = day_offsets * len(groups) + codes
+        shape = (days_count, len(groups))
+        daily = np.bincount(cells, weights=amounts, minlength=shape[0] * shape[1]).round().astype(np.int64)
+        daily_counts = np.bincount(cells, minlength=shape[0] * shape[1]).astype(np.int32)
+
+        cumulative = np.zeros((days_count + 1, len(groups)), dtype=np.int64)
+        counts = np.zeros((days_count + 1, len(groups)), dtype=np.int32)
+        np.cumsum(daily.reshape(shape), axis=0, out=cumulative[1:])
+        np.cumsum(daily_counts.reshape(shape), axis=0, out=counts[1:])
+
+        is_midnight = dates == operation_days.astype("datetime64[ns]")
+        order = np.argsort(day_offsets[is_midnight], kind="stable")
+        midnight = tuple(array[is_midnight][order] for array in (day_offsets, codes, amounts))
+    logger.info("Функция get_spending_windows завершает работу")
+    return SpendingWindows(first_day, groups, cumulative, counts, midnight)
+
+
+@profiled()
+def get_spending_by_category(
+    transactions: pd.DataFrame | OperationsDataset | SpendingWindows, category: str, date: Optional[str] = None
+) -> Any:
     """Функция возвращает траты по заданной категории за последние три месяца (от переданной даты).
-    Если дата не передана, то берется текущая дата."""
+    Если дата не передана, то берется текущая дата.
+    Для SpendingWindows (по категории и описанию) ответ берётся из накопленных сумм без прохода по операциям"""
     logger.info("Запускаем функцию get_spending_by_category")
     if date is None:
         logger.info("Дата не указана, берём текущее время")
@@ -58,21 +284,26 @@ def get_spending_by_category(transactions: pd.DataFrame, category: str, date: Op
 
     start_date = end_date - timedelta(days=90)
 
-    logger.info("Фильтруем DF по расходам")
-    filtered_df = filter_transaction(transactions)
-    filtered_df = filtered_df.copy()
+    if isinstance(transactions, SpendingWindows):
+        if transactions.by != SPENDING_WINDOW_KEYS:
+            raise ValueError(f"Нужны траты по колонкам {SPENDING_WINDOW_KEYS}, получены {transactions.by}")
+        totals = transactions.window(end_date, days=90)
+        category_totals = totals[totals.index.get_level_values(0) == category].droplevel(0)
+        logger.info("Функция get_spending_by_category завершает работу")
+        return category_totals.sort_values().abs().round(2).to_dict()
 
-    logger.info('Переводим "Дату операции" в DF в формат DateTime')
-    filtered_df["Дата операции"] = pd.to_datetime(filtered_df["Дата операции"], dayfirst=True)
+    with stage("filter", rows=len(transactions)):
+        logger.info("Фильтруем DF по расходам")
+        filtered_df = filter_transaction(transactions)
+        operation_dates = get_datetime_column(filtered_df, "Дата операции", dayfirst=True)
 
-    logger.info("Фильтруем DF по категории и дате")
-    category_df = filtered_df[
-        (filtered_df["Категория"] == category)
-        & (filtered_df["Дата операции"] >= start_date)
-        & (filtered_df["Дата операции"] <= end_date)
-    ]
+        logger.info("Фильтруем DF по категории и дате")
+        category_df = filtered_df[
+            (filtered_df["Категория"] == category) & (operation_dates >= start_date) & (operation_dates <= end_date)
+        ]
 
-    grouped_df = category_df.groupby("Описание")["Сумма платежа"].sum()
+    with stage("groupby", rows=len(category_df)):
+        grouped_df = category_df.groupby("Описание", observed=True)["Сумма платежа"].sum()
     result_df = grouped_df.sort_values().abs().round(2)
     logger.info("Функция get_spending_by_category завершает работу")
     return result_df.to_dict()
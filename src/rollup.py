@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+from src.dataset import OperationsDataset, index_by_payment_date
+from src.logger import get_logger
+from src.utils import normalize_operations
+
+logger = get_logger(__name__)
+
+ROLLUP_KEYS = ["Дата операции", "Дата платежа", "Номер карты", "Категория", "Знак", "Статус"]
+COUNT_COLUMN = "Количество операций"
+SOURCE_COLUMNS = ["Дата операции", "Дата платежа", "Номер карты", "Категория", "Статус", "Сумма платежа"]
+
+
+def build_rollup_cells(df: pd.DataFrame) -> pd.DataFrame:
+    """Сворачивает операции в ячейки (день операции, дата платежа, карта, категория, знак, статус)
+    с суммой и количеством операций"""
+    logger.info("Функция build_rollup_cells начинает работу")
+    columns = [column for column in SOURCE_COLUMNS if column in df.columns]
+    operations = normalize_operations(df[columns])
+    for column in SOURCE_COLUMNS:
+        if column not in operations.columns:
+            operations[column] = pd.NaT if column.startswith("Дата") else np.nan
+
+    keys = pd.DataFrame(
+        {
+            "Дата операции": operations["Дата операции"].dt.floor("D"),
+            "Дата платежа": operations["Дата платежа"],
+            "Номер карты": operations["Номер карты"],
+            "Категория": operations["Категория"],
+            "Знак": np.sign(operations["Сумма платежа"]),
+            "Статус": operations["Статус"],
+        }
+    )
+    grouped = operations["Сумма платежа"].groupby([keys[key] for key in ROLLUP_KEYS], dropna=False, observed=True)
+    cells = pd.DataFrame({"Сумма платежа": grouped.sum(), COUNT_COLUMN: grouped.size()}).reset_index()
+    logger.info("Функция build_rollup_cells завершает работу: %s операций -> %s ячеек", len(df), len(cells))
+    return cells
+
+
+def merge_rollup_cells(*parts: pd.DataFrame) -> pd.DataFrame:
+    """Объединяет несколько наборов ячеек, складывая суммы и количества в совпадающих ячейках"""
+    non_empty = [part for part in parts if not part.empty]
+    if not non_empty:
+        return parts[0]
+    combined = pd.concat(non_empty, ignore_index=True)
+    for column in ["Номер карты", "Категория", "Статус"]:
+        combined[column] = combined[column].astype(object)
+    grouped = combined.groupby(ROLLUP_KEYS, dropna=False, sort=False)[["Сумма платежа", COUNT_COLUMN]].sum()
+    return grouped.reset_index()
+
+
+class OperationsRollup(OperationsDataset):
+    """Предварительно агрегированные операции. Вместо строк хранит ячейки с суммой и количеством операций,
+    поэтому может передаваться в get_cards_info, most_spending_filter, get_income_category,
+    cash_and_transfers_count, main_events и get_high_cashback_categories вместо исходного DF"""
+
+    def __init__(self, cells: pd.DataFrame | None = None) -> None:
+        if cells is None:
+            cells = build_rollup_cells(pd.DataFrame(columns=SOURCE_COLUMNS))
+        super().__init__(self._prepare(cells))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "OperationsRollup":
+        """Строит свёртку по DF с операциями"""
+        return cls(build_rollup_cells(df))
+
+    @staticmethod
+    def _prepare(cells: pd.DataFrame) -> pd.DataFrame:
+        cells = cells.copy()
+        for column in ["Номер карты", "Категория", "Статус"]:
+            cells[column] = cells[column].astype("category")
+        cells[COUNT_COLUMN] = cells[COUNT_COLUMN].astype(np.int64)
+        return index_by_payment_date(cells)
+
+    @property
+    def cells(self) -> pd.DataFrame:
+        return self.df
+
+    @property
+    def operations_count(self) -> int:
+        return int(self.df[COUNT_COLUMN].sum())
+
+    def append(self, df: pd.DataFrame) -> None:
+        """Добавляет новые операции: сворачиваются только они, затем сливаются с уже готовыми ячейками"""
+        logger.info("Добавляем в свёртку %s операций", len(df))
+        if df.empty:
+            return
+        self.append_cells(build_rollup_cells(df))
+
+    def append_cells(self, cells: pd.DataFrame) -> None:
+        """Добавляет уже свёрнутые ячейки"""
+        self.df = self._prepare(merge_rollup_cells(self.df.reset_index(drop=True), cells))
+        self.reset_cache()
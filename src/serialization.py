@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.logger import get_logger
+
+try:
+    import orjson
+except ImportError:  # orjson - необязательная зависимость
+    orjson = None  # type: ignore[assignment]
+
+logger = get_logger(__name__)
+
+JSON_INDENT = 4
+
+
+def json_default(value: Any) -> Any:
+    """Переводит в JSON типы, которые не понимает стандартный json: скаляры и массивы NumPy, даты, NaT,
+    Series (в словарь) и DataFrame (в список записей)"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.datetime64):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, pd.Series):
+        return value.to_dict()
+    if isinstance(value, pd.DataFrame):
+        return value.to_dict(orient="records")
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def dumps(data: Any, compact: bool = False, use_orjson: bool | None = None) -> bytes:
+    """Сериализует данные в JSON (UTF-8, кириллица без экранирования). compact=True - без отступов.
+    Файлы с отступами всегда пишет стандартный json (отступ JSON_INDENT), поэтому они не зависят от того,
+    установлен ли orjson. Компактный JSON (ответы сервиса) пишет orjson, если он установлен;
+    в отличие от стандартного json он записывает NaN и бесконечности как null"""
+    if use_orjson is None:
+        use_orjson = orjson is not None
+    if use_orjson and compact:
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        return bytes(orjson.dumps(data, default=json_default, option=options))
+    if compact:
+        # Без отступов json использует кодировщик на C
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=json_default)
+    else:
+        text = json.dumps(data, ensure_ascii=False, indent=JSON_INDENT, default=json_default)
+    return text.encode("utf-8")
+
+
+def dump_json(data: Any, path: Path | str, compact: bool = False, atomic: bool = False) -> None:
+    """Записывает данные в JSON-файл одной операцией записи.
+    atomic=True - через временный файл и os.replace, читатели никогда не увидят наполовину записанный файл"""
+    payload = dumps(data, compact=compact)
+    path = Path(path)
+    if atomic:
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "wb") as file:
+                file.write(payload)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+    else:
+        with open(path, "wb") as file:
+            file.write(payload)
+    logger.debug("Записан файл %s (%s байт)", path, len(payload))
@@ -0,0 +1,303 @@
+import argparse
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Callable
+from urllib.parse import parse_qsl, urlsplit
+
+import pandas as pd
+
+from src.dataset import OperationsDataset
+from src.events import DATA_RANGES, get_events_windows, series_payload
+from src.ledger import CardLedger
+from src.logger import get_logger
+from src.rates import RateHistory, convert_operations_currency
+from src.records import TransactionArray
+from src.reports import get_spending_by_category, get_spending_windows
+from src.rollup import OperationsRollup
+from src.serialization import dumps
+from src.services import get_cashback_matrix, get_high_cashback_categories, investment_bank
+from src.utils import get_df_data_from_file, normalize_operations
+from src.views import main_events, main_events_multi, main_web, prefetch_market_data
+
+logger = get_logger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+# Ограничения на размер запроса: сервис принимает только GET без тела
+MAX_REQUEST_LINE = 8 * 1024
+MAX_HEADERS = 100
+KEEP_ALIVE_TIMEOUT = 15.0
+
+
+class WidgetService:
+    """Операции, загруженные один раз, и заранее построенные по ним структуры.
+    Каждый метод отвечает на один запрос сервиса и не перечитывает исходные данные"""
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        logger.info("Подготавливаем данные сервиса: %s операций", len(df))
+        self.df = df
+        self.operations = OperationsDataset(df)
+        # Маски расходов и поступлений считаются до первого запроса
+        self.operations.spending, self.operations.income
+        self.rollup = OperationsRollup.from_frame(df)
+        self.card_ledger = CardLedger.from_frame(self.operations)
+        self.events_windows = get_events_windows(self.operations)
+        self.cashback_matrix = get_cashback_matrix(self.operations)
+        self.spending_windows = get_spending_windows(self.operations)
+        # Даты и суммы для investment_bank в массивах: запрос не разбирает даты заново
+        self.transactions = TransactionArray.from_frame(df)
+        self.loaded = datetime.now()
+
+    @classmethod
+    def from_file(cls, file_name: str = "operations.xlsx", rates: RateHistory | None = None) -> "WidgetService":
+        """Читает файл с операциями из папки data/ (через снимок колонок) и подготавливает данные.
+        С историей курсов rates суммы в других валютах переводятся в рубли"""
+        df = normalize_operations(get_df_data_from_file(file_name))
+        if rates is not None:
+            df = convert_operations_currency(df, rates)
+        return cls(df)
+
+    def health(self) -> dict:
+        return {"status": "ok", "operations": len(self.operations), "loaded": self.loaded}
+
+    def main_web(self, date: str | None = None) -> dict:
+        return dict(main_web(date or datetime.now().strftime("%Y-%m-%d %H:%M:%S"), self.operations))
+
+    def main_events(self, date: str, range: str = "M") -> dict:
+        """range - период: W-неделя, M-месяц, Y-год, ALL-всё время"""
+        if range not in DATA_RANGES:
+            raise ValueError(f"Неизвестный период {range}, допустимые значения: {', '.join(DATA_RANGES)}")
+        datetime.strptime(date, "%Y-%m-%d")
+        return dict(main_events(date, self.rollup, range))
+
+    def main_events_multi(self, date: str, ranges: str = ",".join(DATA_RANGES)) -> dict:
+        """Несколько периодов и дат через запятую: ?date=2021-11-30,2021-12-31&ranges=W,M"""
+        data_ranges = ranges.split(",")
+        unknown = [data_range for data_range in data_ranges if data_range not in DATA_RANGES]
+        if unknown:
+            raise ValueError(
+                f"Неизвестные периоды {', '.join(unknown)}, допустимые значения: {', '.join(DATA_RANGES)}"
+            )
+        dates = date.split(",")
+        for day in dates:
+            datetime.strptime(day, "%Y-%m-%d")
+        return dict(main_events_multi(dates if len(dates) > 1 else dates[0], self.events_windows, data_ranges))
+
+    def series(
+        self,
+        kind: str = "spending",
+        freq: str = "M",
+        start: str | None = None,
+        end: str | None = None,
+        categories: str | None = None,
+        cumulative: str = "0",
+        moving_average: str | None = None,
+    ) -> dict:
+        """Ряды для графиков: ?kind=income&freq=W&start=2021-01-01&categories=Фастфуд,Такси&moving_average=4"""
+        series = self.events_windows.series(
+            freq,
+            kind,
+            start=start,
+            end=end,
+            categories=categories.split(",") if categories else None,
+            cumulative=cumulative.lower() in ("1", "true", "yes"),
+            moving_average=int(moving_average) if moving_average else None,
+        )
+        return series_payload(series)
+
+    def cards(self, date: str | None = None, range: str = "ALL") -> list[dict]:
+        """Траты и кэшбэк по картам за период, заканчивающийся датой date (без даты - за всё время)"""
+        if range not in DATA_RANGES:
+            raise ValueError(f"Неизвестный период {range}, допустимые значения: {', '.join(DATA_RANGES)}")
+        if date is None:
+            return self.card_ledger.cards_info()
+        return self.card_ledger.cards_info_for_range(date, range)
+
+    def cashback(self, year: str, month: str) -> dict:
+        return dict(get_high_cashback_categories(self.cashback_matrix, int(year), int(month)))
+
+    def investment_bank(self, month: str, limit: str = "50") -> dict:
+        limit_value = int(limit)
+        if limit_value <= 0:
+            raise ValueError("Лимит округления должен быть больше нуля")
+        return {"month": month, "limit": limit_value, "amount": investment_bank(month, self.transactions, limit_value)}
+
+    def spending_by_category(self, category: str, date: str | None = None) -> dict:
+        return dict(get_spending_by_category(self.spending_windows, category, date))
+
+
+# Путь запроса -> метод WidgetService. Параметры строки запроса передаются в метод по именам
+ROUTES = {
+    "/health": "health",
+    "/main_web": "main_web",
+    "/main_events": "main_events",
+    "/main_events_multi": "main_events_multi",
+    "/series": "series",
+    "/cards": "cards",
+    "/cashback": "cashback",
+    "/investment_bank": "investment_bank",
+    "/spending_by_category": "spending_by_category",
+}
+
+
+class WidgetServer:
+    """HTTP-сервис на asyncio. Цикл событий только разбирает запросы и пишет ответы,
+    а подсчёты выполняются в пуле потоков, поэтому долгий запрос не задерживает остальные"""
+
+    def __init__(
+        self,
+        service: WidgetService,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        max_workers: int | None = None,
+    ) -> None:
+        self.service = service
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="widget")
+        self._server: asyncio.Server | None = None
+
+    async def start(self) -> asyncio.Server:
+        """Начинает принимать соединения. При port=0 занятый порт записывается в self.port"""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Сервис слушает %s:%s", self.host, self.port)
+        return self._server
+
+    async def serve_forever(self) -> None:
+        server = self._server if self._server is not None else await self.start()
+        async with server:
+            await server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def handle_request(self, method: str, target: str) -> tuple[int, Any]:
+        """Возвращает (код ответа, данные ответа) для метода и пути с параметрами"""
+        if method != "GET":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"Метод {method} не поддерживается"}
+        url = urlsplit(target)
+        handler_name = ROUTES.get(url.path.rstrip("/") or "/")
+        if handler_name is None:
+            return HTTPStatus.NOT_FOUND, {"error": f"Неизвестный путь {url.path}"}
+        handler: Callable = getattr(self.service, handler_name)
+        try:
+            arguments = inspect.signature(handler).bind(**dict(parse_qsl(url.query)))
+        except TypeError as ex:
+            return HTTPStatus.BAD_REQUEST, {"error": f"Неверные параметры запроса: {ex}"}
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.executor, partial(handler, *arguments.args, **arguments.kwargs))
+        except ValueError as ex:
+            logger.warning("Неверный запрос %s: %s", target, ex)
+            return HTTPStatus.BAD_REQUEST, {"error": str(ex)}
+        except Exception as ex:
+            logger.error("Ошибка обработки запроса %s: %s", target, ex)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Внутренняя ошибка сервиса"}
+        return HTTPStatus.OK, result
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> tuple[str, str, dict[str, str]] | None:
+        request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+        if not request_line:
+            return None
+        if len(request_line) > MAX_REQUEST_LINE:
+            raise ValueError("Слишком длинная строка запроса")
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3:
+            raise ValueError("Неверная строка запроса")
+        headers = {}
+        for _ in range(MAX_HEADERS):
+            line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise ValueError("Слишком много заголовков")
+        return parts[0], parts[1], headers
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Обрабатывает запросы одного соединения; соединение держится открытым между запросами (keep-alive)"""
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except (asyncio.TimeoutError, ConnectionError):
+                    break
+                except ValueError as ex:
+                    self._write_response(writer, HTTPStatus.BAD_REQUEST, {"error": str(ex)}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, headers = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                status, payload = await self.handle_request(method, target)
+                logger.info("%s %s -> %s", method, target, int(status))
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool) -> None:
+        body = dumps(payload, compact=True)
+        status = HTTPStatus(status)
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+
+
+async def serve(
+    file_name: str = "operations.xlsx",
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    max_workers: int | None = None,
+    rates_dir: Path | None = None,
+) -> None:
+    """Загружает операции, запрашивает курсы в фоне и запускает сервис.
+    rates_dir - папка с историей курсов ЦБ для перевода сумм в рубли"""
+    prefetch_market_data()
+    loop = asyncio.get_running_loop()
+    rates = RateHistory.from_cbr_archive(rates_dir) if rates_dir is not None else None
+    service = await loop.run_in_executor(None, WidgetService.from_file, file_name, rates)
+    server = WidgetServer(service, host, port, max_workers)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="HTTP-сервис виджета банка")
+    parser.add_argument("--file", default="operations.xlsx", help="файл с операциями в папке data/")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, help="число потоков для подсчётов")
+    parser.add_argument("--rates", type=Path, help="папка с историей курсов ЦБ (гггг/мм/дд/daily_json.js)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.file, args.host, args.port, args.workers, args.rates))
+    except KeyboardInterrupt:
+        logger.info("Сервис остановлен")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,190 @@
-import logging
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable
 
+import numpy as np
 import pandas as pd
 
-from src.utils import filter_transaction
+from src.dataset import OperationsDataset
+from src.logger import get_logger
+from src.profiling import profiled, stage
+from src.records import TransactionArray
+from src.sharding import aggregate_by_shards
+from src.utils import filter_transaction, get_datetime_column
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    filename="./logs/services.log",
-    encoding="utf-8",
-    filemode="w",
-    format="%(asctime)s %(levelname)s %(funcName)s %(lineno)d: %(message)s",
-    datefmt="%Y-%m-%d -%H:%M:%S",
-)
+logger = get_logger(__name__)
 
-logger = logging.getLogger()
+EXCLUDED_CASHBACK_CATEGORIES = ["Переводы", "Наличные"]
 
 
-def get_high_cashback_categories(data: pd.DataFrame, year: int, month: int) -> Any:
+def select_cashback_categories(category_spending: pd.Series) -> dict:
+    """Принимает траты по категориям за месяц и возвращает словарь с кэшбэком 1% по выгодным категориям"""
+    sorted_data = category_spending.sort_values(ascending=False)
+    cashback_data = (sorted_data / 100).astype(int)
+    result = cashback_data[(cashback_data > 0) & (~cashback_data.index.isin(EXCLUDED_CASHBACK_CATEGORIES))]
+    return dict(result.to_dict())
+
+
+class CashbackMatrix:
+    """Траты по категориям для каждого месяца в виде матрицы (месяц x категория).
+    Строится одним проходом по данным, кэшбэк за отдельный месяц берётся строкой матрицы"""
+
+    def __init__(self, months: np.ndarray, categories: np.ndarray, spending: np.ndarray) -> None:
+        self.months = months
+        self.categories = categories
+        self.spending = spending
+
+    def for_month(self, year: int, month: int) -> dict:
+        """Возвращает кэшбэк по категориям за месяц в том же виде, что и get_high_cashback_categories"""
+        target_month = np.datetime64(f"{year:04d}-{month:02d}", "M")
+        position = np.searchsorted(self.months, target_month)
+        if position == len(self.months) or self.months[position] != target_month:
+            return {}
+        row = self.spending[position]
+        return select_cashback_categories(pd.Series(row[row > 0], index=self.categories[row > 0]))
+
+    def to_dict(self) -> dict:
+        """Возвращает кэшбэк по категориям для всех месяцев {'YYYY-MM': {...}}"""
+        return {str(month): self.for_month(int(str(month)[:4]), int(str(month)[5:7])) for month in self.months}
+
+
+def _sum_by_month_and_category(spending: pd.DataFrame) -> pd.Series:
+    operation_dates = get_datetime_column(spending, "Дата операции", dayfirst=True)
+    months = operation_dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[M]")
+    return spending["Сумма платежа"].groupby([months, spending["Категория"].to_numpy()]).sum()
+
+
+@profiled()
+def get_cashback_matrix(data: pd.DataFrame | OperationsDataset, shards: int | None = None) -> CashbackMatrix:
+    """Считает траты по категориям сразу для всех месяцев одной группировкой.
+    shards - число частей (по хэшу категории) для группировки в пуле потоков"""
+    logger.info("Функция get_cashback_matrix начинает работу")
+    with stage("groupby", rows=len(data)):
+        grouped_data = (
+            aggregate_by_shards(
+                data,
+                "Категория",
+                _sum_by_month_and_category,
+                filter_transaction,
+                shards,
+                ["Дата операции", "Категория", "Статус", "Сумма платежа"],
+            )
+            .abs()
+            .unstack(fill_value=0)
+        )
+    logger.info("Функция get_cashback_matrix завершает работу")
+    return CashbackMatrix(
+        grouped_data.index.to_numpy(dtype="datetime64[M]"),
+        grouped_data.columns.to_numpy(dtype=object),
+        grouped_data.to_numpy(dtype=float),
+    )
+
+
+@profiled()
+def get_high_cashback_categories(
+    data: pd.DataFrame | OperationsDataset | CashbackMatrix, year: int, month: int
+) -> Any:
     """Функция позволяет проанализировать, какие категории были наиболее выгодными для выбора
     в качестве категорий повышенного кэшбэка."""
     """
         Входные параметры:
-        data — данные с транзакциями;
+        data — данные с транзакциями или заранее посчитанная CashbackMatrix;
         year — год, за который проводится анализ;
         month — месяц, за который проводится анализ.
         На выходе — JSON с анализом, сколько на каждой категории можно заработать кэшбэка в указанном месяце года.
     """
     logger.info("Функция get_high_cashback_categories начинает работу")
-    logger.info("Фильтруем DF по расходам")
-    filtered_data = filter_transaction(data)
-    df = filtered_data.copy()
-    df["Дата операции"] = pd.to_datetime(df["Дата операции"], dayfirst=True)
-    logger.info("Фильтруем DF по времени")
-    filtered_by_time = df[(df["Дата операции"].dt.year == year) & (df["Дата операции"].dt.month == month)]
-    logger.info("Фильтруем по категориям и суммируем")
-    grouped_data = filtered_by_time.groupby("Категория")["Сумма платежа"].sum().abs()
-    sorted_data = grouped_data.sort_values(ascending=False)
-    cashback_data = (sorted_data / 100).astype(int)
+    if isinstance(data, CashbackMatrix):
+        return data.for_month(year, month)
+    with stage("filter", rows=len(data)):
+        logger.info("Фильтруем DF по расходам")
+        filtered_data = filter_transaction(data)
+        operation_dates = get_datetime_column(filtered_data, "Дата операции", dayfirst=True)
+        logger.info("Фильтруем DF по времени")
+        filtered_by_time = filtered_data[(operation_dates.dt.year == year) & (operation_dates.dt.month == month)]
+    with stage("groupby", rows=len(filtered_by_time)):
+        logger.info("Фильтруем по категориям и суммируем")
+        grouped_data = filtered_by_time.groupby("Категория", observed=True)["Сумма платежа"].sum().abs()
     logger.info("Подсчитываем кэшбэк")
-    result = cashback_data[(cashback_data > 0) & (~cashback_data.index.isin(["Переводы", "Наличные"]))]
+    result = select_cashback_categories(grouped_data)
     logger.info("Функция get_high_cashback_categories завершает работу")
-    return result.to_dict()
+    return result
+
+
+def get_months_and_amounts(
+    transactions: list[dict] | pd.DataFrame | TransactionArray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Возвращает месяцы (datetime64[M]) и суммы транзакций в виде массивов NumPy.
+    TransactionArray уже хранит массивы, поэтому даты не разбираются заново"""
+    if isinstance(transactions, TransactionArray):
+        return transactions.months, transactions.amounts
+    if isinstance(transactions, pd.DataFrame):
+        dates, amounts = transactions["date"], transactions["amount"]
+    else:
+        dates = [transaction["date"] for transaction in transactions]
+        amounts = [transaction["amount"] for transaction in transactions]
+    months = pd.to_datetime(dates).to_numpy(dtype="datetime64[ns]").astype("datetime64[M]")
+    return months, np.asarray(amounts, dtype=float)
+
 
+def get_round_up_amounts(amounts: np.ndarray, limits: np.ndarray) -> np.ndarray:
+    """Возвращает матрицу (лимит x транзакция) сумм, которые ушли бы в копилку при округлении до лимита.
+    Транзакции без суммы (NaN) ничего не добавляют, как и при суммировании в pandas"""
+    remainder = np.abs(amounts)[np.newaxis, :] % limits[:, np.newaxis]
+    return np.where((remainder != 0) & ~np.isnan(remainder), limits[:, np.newaxis] - remainder, 0)
 
-def investment_bank(month: str, transactions: list[dict], limit: int) -> Any:
+
+@profiled()
+def investment_bank(month: str, transactions: list[dict] | pd.DataFrame | TransactionArray, limit: int) -> Any:
     """Возвращает сумму, которую удалось бы отложить в «Инвесткопилку»"""
     """
     month — месяц, для которого рассчитывается отложенная сумма (строка в формате 'YYYY-MM').
-    transactions — список словарей, содержащий информацию о транзакциях, в которых содержатся следующие поля:
+    transactions — список словарей (или DF, или TransactionArray), содержащий информацию о транзакциях,
+        в которых содержатся следующие поля:
         Дата операции — дата, когда произошла транзакция (строка в формате 'YYYY-MM-DD').
         Сумма операции — сумма транзакции в оригинальной валюте (число).
     limit — предел, до которого нужно округлять суммы операций (целое число).
     """
     logger.info("Функция investment_bank начинает работу")
-    target_month = datetime.strptime(month, "%Y-%m")
-    logger.info("Превращаем транзакции в DF")
-    df = pd.DataFrame(transactions)
-    df["date"] = pd.to_datetime(df["date"])
+    target_month = np.datetime64(datetime.strptime(month, "%Y-%m"), "M")
+    logger.info("Превращаем транзакции в массивы")
+    months, amounts = get_months_and_amounts(transactions)
     logger.info("Фильтруем по дате")
-    filtered_df = df[(df["date"].dt.month == target_month.month) & (df["date"].dt.year == target_month.year)]
+    month_amounts = amounts[months == target_month]
     logger.info("Подсчитываем кэшбэк")
-    remainder = abs(filtered_df["amount"]) % limit
-    result = remainder[remainder != 0].apply(lambda x: limit - x).sum()
+    result = get_round_up_amounts(month_amounts, np.array([limit])).sum()
     logger.info("Функция завершает работу")
     return int(result)
+
+
+@profiled()
+def investment_bank_batch(
+    transactions: list[dict] | pd.DataFrame | TransactionArray,
+    limits: Iterable[int] = (10, 50, 100),
+    chunk_size: int = 1_000_000,
+) -> pd.DataFrame:
+    """Возвращает суммы «Инвесткопилки» сразу для всех месяцев и нескольких лимитов.
+    Строки - месяцы в формате 'YYYY-MM', колонки - лимиты. Значение в ячейке совпадает
+    с investment_bank(месяц, transactions, лимит)"""
+    logger.info("Функция investment_bank_batch начинает работу")
+    limits_array = np.asarray(list(limits), dtype=float)
+    months, amounts = get_months_and_amounts(transactions)
+    known = ~np.isnat(months)
+    unique_months, month_index = np.unique(months[known], return_inverse=True)
+    amounts = amounts[known]
+
+    totals = np.zeros(len(limits_array) * len(unique_months))
+    offsets = np.arange(len(limits_array))[:, np.newaxis] * len(unique_months)
+    # Матрица лимит x транзакция считается частями, чтобы не расходовать память на всю историю сразу
+    step = max(1, chunk_size // max(len(limits_array), 1))
+    for start in range(0, len(amounts), step):
+        round_up = get_round_up_amounts(amounts[start : start + step], limits_array)
+        cells = offsets + month_index[np.newaxis, start : start + step]
+        totals += np.bincount(cells.ravel(), weights=round_up.ravel(), minlength=len(totals))
+
+    result = pd.DataFrame(
+        totals.reshape(len(limits_array), len(unique_months)).T.astype(np.int64),
+        index=pd.Index(unique_months.astype(str), name="month"),
+        columns=[int(limit) for limit in limits_array],
+    )
+    logger.info("Функция investment_bank_batch завершает работу")
+    return result
@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import OperationsDataset
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_SHARDS = os.cpu_count() or 1
+
+
+def get_shard_numbers(keys: pd.Series, shards: int) -> np.ndarray:
+    """Номер части для каждой строки по хэшу значения ключа (карты, категории). Пустой ключ - -1:
+    такие строки не входят в группировку, как и в groupby. Хэш считается по различным значениям,
+    а не по строкам"""
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        codes, values = keys.cat.codes.to_numpy(), keys.cat.categories
+    else:
+        codes, values = pd.factorize(keys)
+    lookup = np.append(pd.util.hash_array(np.asarray(values, dtype=object)) % shards, -1).astype(np.int32)
+    return np.asarray(lookup[codes])
+
+
+def aggregate_by_shards(
+    data: pd.DataFrame | OperationsDataset,
+    key: str,
+    aggregate: Callable[[pd.DataFrame], pd.Series],
+    filter_function: Callable[[pd.DataFrame | OperationsDataset], pd.DataFrame],
+    shards: int | None = None,
+    columns: list[str] | None = None,
+) -> pd.Series:
+    """Считает aggregate(filter_function(data)) - группировку по ключу key - по частям в пуле потоков.
+    Сначала потоки фильтруют подряд идущие блоки строк и раскладывают оставшиеся строки по частям по хэшу ключа,
+    затем каждая часть склеивает свои строки из всех блоков по порядку и группируется. Каждая группа целиком
+    попадает в одну часть, а порядок её строк сохраняется, поэтому суммы групп совпадают с группировкой
+    без разбиения до последнего бита, а объединение частей - это склейка и сортировка по ключу, как в groupby.
+    shards=None или 1 - обычный подсчёт в одном потоке. columns - колонки, нужные filter_function
+    и aggregate: блоки копируют только их"""
+    if not shards or shards <= 1:
+        return aggregate(filter_function(data))
+    block_filter: Callable[[pd.DataFrame], pd.DataFrame] | None
+    if isinstance(data, OperationsDataset):
+        # Расходы и поступления набора уже отфильтрованы и закэшированы: делим готовую часть
+        frame, block_filter = filter_function(data), None
+    else:
+        frame, block_filter = data, filter_function
+    logger.info("Группируем %s строк по колонке %s в %s частях", len(frame), key, shards)
+    bounds = np.linspace(0, len(frame), shards + 1).astype(np.int64)
+
+    def split_block(block: int) -> tuple[pd.DataFrame, np.ndarray]:
+        part = frame.iloc[bounds[block]:bounds[block + 1]]
+        if columns is not None:
+            part = part[columns]
+        if block_filter is not None:
+            part = block_filter(part)
+        return part, get_shard_numbers(part[key], shards)
+
+    def run_shard(shard: int) -> pd.Series:
+        pieces = [part[numbers == shard] for part, numbers in blocks]
+        return aggregate(pd.concat(pieces) if len(pieces) > 1 else pieces[0])
+
+    with ThreadPoolExecutor(max_workers=shards, thread_name_prefix="shard") as executor:
+        blocks = list(executor.map(split_block, range(shards)))
+        partials = [partial for partial in executor.map(run_shard, range(shards)) if not partial.empty]
+    if not partials:
+        return aggregate(blocks[0][0])
+    return pd.concat(partials).sort_index()
@@ -0,0 +1,131 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.cache import read_column_bundle, write_column_bundle
+from src.logger import get_logger
+from src.rollup import OperationsRollup
+from src.utils import DATA_DIR, normalize_operations
+
+logger = get_logger(__name__)
+
+STORE_DIR = DATA_DIR / "operations_store"
+KEY_COLUMNS = ["Дата операции", "Номер карты", "Сумма платежа", "Описание"]
+KEYS_FILE = "keys.npy"
+ROLLUP_DIR = "rollup"
+
+
+def transaction_keys(df: pd.DataFrame) -> np.ndarray:
+    """Возвращает стабильный 64-битный ключ каждой операции по дате, карте, сумме и описанию.
+    Одинаковые операции внутри одной выгрузки различаются порядковым номером повтора"""
+    operations = normalize_operations(df[[column for column in KEY_COLUMNS if column in df.columns]])
+    parts = pd.DataFrame(
+        {
+            "date": operations["Дата операции"].to_numpy(dtype="datetime64[ns]").view("i8"),
+            "card": operations["Номер карты"].astype(object).to_numpy(),
+            "amount": operations["Сумма платежа"].astype(float).to_numpy(),
+            "description": operations["Описание"].astype(object).to_numpy(),
+        }
+    )
+    base = pd.util.hash_pandas_object(parts, index=False).to_numpy()
+    repeat = pd.Series(base).groupby(base).cumcount().to_numpy(dtype=np.uint64)
+    return np.asarray(base ^ (repeat * np.uint64(0x9E3779B97F4A7C15)))
+
+
+def read_operations_export(file_path: Path, sep: str = ";", decimal: str = ",") -> pd.DataFrame:
+    """Читает выгрузку операций в формате XLSX или CSV"""
+    logger.info("Читаем выгрузку %s", file_path)
+    if file_path.suffix.lower() == ".csv":
+        text_columns = {column: str for column in ["Номер карты", "Статус", "Категория", "Описание"]}
+        return pd.read_csv(file_path, sep=sep, decimal=decimal, dtype=text_columns)
+    return pd.read_excel(file_path, engine="openpyxl")
+
+
+class OperationsStore:
+    """Хранилище операций, которое только дополняется. Каждая загрузка записывается отдельным сегментом,
+    уже сохранённые операции повторно не читаются и не переписываются"""
+
+    def __init__(self, path: Path = STORE_DIR) -> None:
+        self.path = path
+        # Сегмент считается записанным, только если у него есть meta.json (он пишется последним)
+        self._segments = sorted(segment.parent for segment in path.glob("segment_*/meta.json"))
+        keys = [np.load(segment / KEYS_FILE) for segment in self._segments]
+        self._keys = np.sort(np.concatenate(keys)) if keys else np.array([], dtype=np.uint64)
+        self._frame: pd.DataFrame | None = None
+        self._rollup: OperationsRollup | None = None
+        logger.info("Открыто хранилище %s: %s операций", path, len(self._keys))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Все операции хранилища. Сегменты читаются при первом обращении"""
+        if self._frame is None:
+            frames = [read_column_bundle(segment) for segment in self._segments]
+            self._frame = normalize_operations(pd.concat(frames, ignore_index=True)) if frames else pd.DataFrame()
+        return self._frame
+
+    @property
+    def rollup(self) -> OperationsRollup:
+        """Свёртка операций хранилища. Читается с диска или строится при первом обращении,
+        дальше обновляется при добавлении операций"""
+        if self._rollup is None:
+            rollup_dir = self.path / ROLLUP_DIR
+            if (rollup_dir / "meta.json").exists():
+                self._rollup = OperationsRollup(read_column_bundle(rollup_dir))
+            elif len(self):
+                self._rollup = OperationsRollup.from_frame(self.frame)
+                self._save_rollup()
+            else:
+                self._rollup = OperationsRollup()
+        return self._rollup
+
+    def _save_rollup(self) -> None:
+        if self._rollup is not None:
+            write_column_bundle(self._rollup.cells.reset_index(drop=True), self.path / ROLLUP_DIR)
+
+    def contains(self, keys: np.ndarray) -> np.ndarray:
+        """Для каждого ключа возвращает, есть ли уже такая операция в хранилище"""
+        positions = np.searchsorted(self._keys, keys)
+        positions[positions == len(self._keys)] = 0
+        return self._keys[positions] == keys if len(self._keys) else np.zeros(len(keys), dtype=bool)
+
+    def append(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Добавляет операции, которых ещё нет в хранилище, и возвращает только их"""
+        logger.info("Добавляем выгрузку из %s операций", len(df))
+        df = df.reset_index(drop=True)
+        keys = transaction_keys(df)
+        is_new = ~self.contains(keys)
+        new_rows = df[is_new]
+        if new_rows.empty:
+            logger.info("Новых операций нет")
+            return new_rows
+
+        segment = self.path / f"segment_{len(self._segments) + 1:06d}"
+        segment.mkdir(parents=True, exist_ok=True)
+        np.save(segment / KEYS_FILE, keys[is_new])
+        normalized = normalize_operations(new_rows)
+        write_column_bundle(normalized.reset_index(drop=True), segment)
+        self._segments.append(segment)
+        self._keys = np.sort(np.concatenate([self._keys, keys[is_new]]))
+
+        if self._frame is not None and len(self._frame):
+            self._frame = normalize_operations(pd.concat([self._frame, normalized]))
+        elif self._frame is not None:
+            self._frame = normalized
+        if self._rollup is not None or (self.path / ROLLUP_DIR / "meta.json").exists():
+            self.rollup.append(new_rows)
+            self._save_rollup()
+        logger.info("Добавлено %s новых операций", len(new_rows))
+        return new_rows
+
+
+def ingest_operations(file_path: Path, store_path: Path = STORE_DIR) -> int:
+    """Добавляет в хранилище новые операции из выгрузки (XLSX или CSV) и возвращает их количество"""
+    logger.info("Функция ingest_operations начинает работу")
+    store = OperationsStore(store_path)
+    new_rows = store.append(read_operations_export(Path(file_path)))
+    logger.info("Функция ingest_operations завершает работу")
+    return len(new_rows)
@@ -0,0 +1,59 @@
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import openpyxl
+import pandas as pd
+
+from src.logger import get_logger
+from src.rollup import OperationsRollup
+from src.utils import CATEGORICAL_COLUMNS
+
+logger = get_logger(__name__)
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def _iter_excel_chunks(file_path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) for name in header]
+        chunk: list[tuple] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield pd.DataFrame.from_records(chunk, columns=columns)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame.from_records(chunk, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_operations_chunks(
+    file_path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE, sep: str = ";", decimal: str = ","
+) -> Iterator[pd.DataFrame]:
+    """Читает выгрузку операций (XLSX или CSV) частями по chunk_size строк.
+    В памяти одновременно находится только одна часть, весь файл не загружается"""
+    file_path = Path(file_path)
+    logger.info("Читаем выгрузку %s частями по %s строк", file_path, chunk_size)
+    if file_path.suffix.lower() == ".csv":
+        text_columns = {column: str for column in CATEGORICAL_COLUMNS}
+        yield from pd.read_csv(file_path, sep=sep, decimal=decimal, dtype=text_columns, chunksize=chunk_size)
+    else:
+        yield from _iter_excel_chunks(file_path, chunk_size)
+
+
+def rollup_chunks(chunks: Iterable[pd.DataFrame]) -> OperationsRollup:
+    """Сворачивает поток частей DF в OperationsRollup. Каждая часть сворачивается и сразу сливается
+    с уже готовыми ячейками, поэтому память зависит от числа ячеек, а не от числа операций"""
+    logger.info("Функция rollup_chunks начинает работу")
+    rollup = OperationsRollup()
+    for number, chunk in enumerate(chunks, start=1):
+        rollup.append(chunk)
+        logger.debug("Часть %s: %s операций, в свёртке %s ячеек", number, len(chunk), len(rollup.cells))
+    logger.info("Функция rollup_chunks завершает работу: %s операций", rollup.operations_count)
+    return rollup
@@ -0,0 +1,131 @@
+import heapq
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import OperationsDataset
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+TOP_COLUMNS = ["Дата платежа", "Сумма платежа", "Категория", "Описание"]
+
+
+def format_payment_date(value: object) -> str | None:
+    """Дата платежа для вывода: datetime - в формате dd.mm.YYYY, строка - первые 11 символов"""
+    if pd.isna(value):
+        return None
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return str(pd.Timestamp(value).strftime("%d.%m.%Y"))
+    return str(value)[:11]
+
+
+class TopTransactions:
+    """Топ-N самых крупных расходов целиком или по группам (карте, категории).
+    Для каждой группы хранится куча не больше чем из n операций, поэтому DF с расходами не сортируется
+    и не копируется целиком. Части (куски выгрузки, результаты разных процессов) объединяются через merge"""
+
+    def __init__(self, n: int = 5, by: str | None = None) -> None:
+        if n < 1:
+            raise ValueError("n должно быть положительным")
+        self.n = n
+        self.by = by
+        self._heaps: dict[object, list[tuple]] = {}
+        self._seen = 0
+
+    def update(self, df: pd.DataFrame | OperationsDataset) -> "TopTransactions":
+        """Добавляет операции DF (или части выгрузки). Учитываются только выполненные расходы"""
+        spending = (df if isinstance(df, OperationsDataset) else OperationsDataset(df)).spending
+        amounts = spending["Сумма платежа"].to_numpy(dtype=float)
+        if self.by is None:
+            groups = {None: np.arange(len(amounts))}
+        else:
+            groups = spending.groupby(self.by, observed=True, sort=False).indices
+
+        selected = []
+        for group, positions in groups.items():
+            if len(positions) > self.n:
+                # Кандидаты за O(len) без сортировки: всё, что не больше n-й наименьшей суммы группы
+                threshold = np.partition(amounts[positions], self.n - 1)[self.n - 1]
+                positions = positions[amounts[positions] <= threshold]
+            selected.append((group, positions))
+
+        # Из DF берутся только отобранные строки
+        all_positions = np.concatenate([positions for _, positions in selected]) if selected else np.array([], int)
+        records = iter(zip(*(spending[column].iloc[all_positions].tolist() for column in TOP_COLUMNS)))
+        for group, positions in selected:
+            heap = self._heaps.setdefault(group, [])
+            for position, record in zip(positions.tolist(), records):
+                # В корне кучи - худшая из отобранных: наименьший расход, при равенстве - более поздняя
+                self._push(heap, (-record[1], -(self._seen + position), record))
+        self._seen += len(df)
+        return self
+
+    def _push(self, heap: list[tuple], item: tuple) -> None:
+        if len(heap) < self.n:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+
+    def merge(self, other: "TopTransactions") -> "TopTransactions":
+        """Объединяет с частичным результатом по следующей части данных"""
+        if other.by != self.by:
+            raise ValueError("Нельзя объединить топы с разной группировкой")
+        for group, items in other._heaps.items():
+            heap = self._heaps.setdefault(group, [])
+            for amount, seq, record in items:
+                self._push(heap, (amount, seq - self._seen, record))
+        self._seen += other._seen
+        return self
+
+    @staticmethod
+    def _to_dicts(heap: list[tuple]) -> list[dict]:
+        return [
+            {"date": format_payment_date(date), "amount": abs(amount), "category": category, "description": text}
+            for _, _, (date, amount, category, text) in sorted(heap, reverse=True)
+        ]
+
+    def result(self) -> list[dict]:
+        """Список операций по убыванию расхода (топ без группировки)"""
+        if self.by is not None:
+            raise ValueError("Топ с группировкой возвращает group_result")
+        return self._to_dicts(self._heaps.get(None, []))
+
+    def group_result(self) -> dict[str, list[dict]]:
+        """Словарь {группа: список операций по убыванию расхода} (топ с группировкой)"""
+        if self.by is None:
+            raise ValueError("Топ без группировки возвращает result")
+        groups = sorted(self._heaps.items(), key=lambda item: str(item[0]))
+        return {str(group): self._to_dicts(heap) for group, heap in groups if heap}
+
+
+def _collect_top(
+    df: pd.DataFrame | OperationsDataset | Iterable[pd.DataFrame], n: int, by: str | None
+) -> TopTransactions:
+    top = TopTransactions(n, by)
+    if isinstance(df, (pd.DataFrame, OperationsDataset)):
+        top.update(df)
+    else:
+        for chunk in df:
+            top.update(chunk)
+    return top
+
+
+def top_transactions(df: pd.DataFrame | OperationsDataset | Iterable[pd.DataFrame], n: int = 5) -> list[dict]:
+    """Возвращает n самых крупных расходов. Принимает DF, OperationsDataset или поток частей DF"""
+    logger.info("Функция top_transactions начинает работу: n=%s", n)
+    result = _collect_top(df, n, None).result()
+    logger.info("Функция top_transactions завершает работу")
+    return result
+
+
+def top_transactions_by(
+    df: pd.DataFrame | OperationsDataset | Iterable[pd.DataFrame], by: str, n: int = 5
+) -> dict[str, list[dict]]:
+    """Возвращает n самых крупных расходов по каждой группе by ("Номер карты" или "Категория").
+    Принимает DF, OperationsDataset или поток частей DF"""
+    logger.info("Функция top_transactions_by начинает работу: n=%s, by=%s", n, by)
+    result = _collect_top(df, n, by).group_result()
+    logger.info("Функция top_transactions_by завершает работу")
+    return result
@@ -1,23 +1,21 @@
 import json
-import logging
 import os
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Iterable, TypeAlias
 
 import pandas as pd
 import requests
 from dotenv import load_dotenv
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    filename="./logs/utils.log",
-    encoding="utf-8",
-    filemode="w",
-    format="%(asctime)s %(levelname)s %(funcName)s %(lineno)d: %(message)s",
-    datefmt="%Y-%m-%d -%H:%M:%S",
-)
+from src.cache import read_excel_cached
+from src.dataset import OperationsDataset, get_window_bounds, index_by_payment_date, is_sorted_i8
+from src.logger import get_logger
+from src.records import OperationRecord, records_from_frame
+from src.sharding import aggregate_by_shards
+from src.top import top_transactions
 
-logger = logging.getLogger()
+logger = get_logger(__name__)
 
 load_dotenv()
 
@@ -25,18 +23,31 @@ DATA_DIR = Path("./data")
 SETTINGS_PATH = Path("./user_settings.json")
 CBR_EXCHANGE_URL = "https://www.cbr-xml-daily.ru/daily_json.js"
 AV_API_URL = "https://www.alphavantage.co/query"
+DATE_COLUMNS = {"Дата операции": "%d.%m.%Y %H:%M:%S", "Дата платежа": "%d.%m.%Y"}
+CATEGORICAL_COLUMNS = ["Категория", "Статус", "Номер карты", "Описание"]
+# Колонки, которые копируются в части при группировке по ключу (фильтр расходов и поступлений и сумма)
+SHARD_COLUMNS = {key: [key, "Статус", "Сумма платежа"] for key in ("Номер карты", "Категория")}
 
+OperationsSource: TypeAlias = pd.DataFrame | OperationsDataset | Iterable[pd.DataFrame]
 
-def get_data_from_excel(file_name: str = "operations.xlsx") -> list[dict]:
-    """Читает XLSX-файл и возвращает список словарей"""
+
+def get_data_from_excel(
+    file_name: str = "operations.xlsx", use_cache: bool = True, rebuild_cache: bool = False, as_records: bool = False
+) -> list[dict] | list[OperationRecord]:
+    """Читает XLSX-файл и возвращает список словарей (as_records=True - список компактных OperationRecord)"""
     logger.info("Функция get_data_from_excel начинает работу")
     file_path = DATA_DIR / file_name
     try:
-        logger.info(f"Открываем файл {file_path}")
-        excel_data = pd.read_excel(file_path, engine="openpyxl")
+        logger.info("Открываем файл %s", file_path)
+        if use_cache:
+            excel_data = read_excel_cached(file_path, rebuild=rebuild_cache)
+        else:
+            excel_data = pd.read_excel(file_path, engine="openpyxl")
+        if as_records:
+            return records_from_frame(excel_data)
         return excel_data.to_dict(orient="records")
     except FileNotFoundError:
-        logger.error(f"Файл не найден: {file_path}")
+        logger.error("Файл не найден: %s", file_path)
         return []
 
 
@@ -67,7 +78,7 @@ def convert_date_to_datetime(date: str) -> datetime | None:
     try:
         result = datetime.strptime(date, "%Y-%m-%d %H:%M:%S")
     except ValueError as er:
-        logger.error(f"Ошибка {er}")
+        logger.error("Ошибка %s", er)
         return None
     else:
         logger.info("Функция convert_date_to_datetime завершает работу")
@@ -81,7 +92,7 @@ def get_exchange_rate() -> list[dict] | str:
 
     try:
         response = requests.get(CBR_EXCHANGE_URL).json()
-        logger.info(f"Открываем файл {SETTINGS_PATH}")
+        logger.info("Открываем файл %s", SETTINGS_PATH)
         with open(SETTINGS_PATH, "r") as file:
             user_settings_data = json.load(file)
 
@@ -93,7 +104,7 @@ def get_exchange_rate() -> list[dict] | str:
         logger.info("Функция get_exchange_rate завершает работу")
         return result
     except Exception as e:
-        logger.error(f"Ошибка обработки файла: {e}")
+        logger.error("Ошибка обработки файла: %s", e)
         return []
 
 
@@ -108,11 +119,11 @@ def get_stock_price() -> list[dict]:
         raise ValueError("API ключ не найден")
 
     try:
-        logger.info(f"Открываем файл {SETTINGS_PATH}")
+        logger.info("Открываем файл %s", SETTINGS_PATH)
         with open(SETTINGS_PATH, "r") as file:
             user_settings_data = json.load(file)
     except FileNotFoundError as ex:
-        logger.error(f"Файл не найден: {ex}")
+        logger.error("Файл не найден: %s", ex)
         return []
 
     result = []
@@ -126,79 +137,146 @@ def get_stock_price() -> list[dict]:
             data = response["Time Series (Daily)"][date_list[0]]["4. close"]
             result.append({"stock": stock, "price": float(data)})
     except requests.exceptions.RequestException as e:
-        logger.error(f"Ошибка: {e}")
+        logger.error("Ошибка: %s", e)
     except KeyError as e:
-        logger.error(f"Ключ не найден: {e}")
+        logger.error("Ключ не найден: %s", e)
 
     logger.info("Функция get_stock_price завершает работу")
     return result
 
 
-def filter_transaction(df: pd.DataFrame) -> pd.DataFrame:
-    """Фильтрует DF, оставляя только выполненные операции с расходами"""
+def normalize_operations(df: pd.DataFrame) -> pd.DataFrame:
+    """Приводит DF с операциями к рабочему виду: даты переводятся в datetime64,
+    а повторяющиеся текстовые колонки - в категории. Строки сортируются по дате платежа,
+    которая ставится в индекс. Вызывается один раз сразу после загрузки"""
+    logger.info("Функция normalize_operations начинает работу")
+    result = df.copy(deep=False)
+    for column, date_format in DATE_COLUMNS.items():
+        if column not in result.columns or pd.api.types.is_datetime64_any_dtype(result[column]):
+            continue
+        try:
+            result[column] = pd.to_datetime(result[column], format=date_format)
+        except ValueError:
+            logger.warning("Колонка %s не в формате выгрузки банка, определяем формат автоматически", column)
+            result[column] = get_datetime_column(result, column, dayfirst=column == "Дата операции")
+    for column in CATEGORICAL_COLUMNS:
+        if column in result.columns and not isinstance(result[column].dtype, pd.CategoricalDtype):
+            result[column] = result[column].astype("category")
+    if "Дата платежа" in result.columns:
+        result = index_by_payment_date(result)
+    logger.info("Функция normalize_operations завершает работу")
+    return result
+
+
+def get_datetime_column(df: pd.DataFrame, column: str, dayfirst: bool = False) -> pd.Series:
+    """Возвращает колонку с датами в формате datetime64, не разбирая её повторно, если DF уже нормализован"""
+    if pd.api.types.is_datetime64_any_dtype(df[column]):
+        return df[column]
+    logger.info("Переводим колонку %s в формат DateTime", column)
+    return pd.to_datetime(df[column], dayfirst=dayfirst)
+
+
+def filter_transaction(df: pd.DataFrame | OperationsDataset) -> pd.DataFrame:
+    """Фильтрует DF, оставляя только выполненные операции с расходами.
+    Для OperationsDataset возвращает уже вычисленную часть с расходами"""
     logger.info("Функция filter_transaction начинает работу")
+    if isinstance(df, OperationsDataset):
+        return df.spending
     result = df[(df["Сумма платежа"] < 0) & (df["Статус"] == "OK")]
     logger.info("Функция filter_transaction завершает работу")
     return result
 
 
-def get_cards_info(df: pd.DataFrame) -> list[dict]:
+def filter_income(df: pd.DataFrame | OperationsDataset) -> pd.DataFrame:
+    """Фильтрует DF, оставляя только выполненные операции с поступлениями"""
+    logger.info("Функция filter_income начинает работу")
+    if isinstance(df, OperationsDataset):
+        return df.income
+    result = df[(df["Сумма платежа"] > 0) & (df["Статус"] == "OK")]
+    logger.info("Функция filter_income завершает работу")
+    return result
+
+
+def as_operations(df: OperationsSource) -> pd.DataFrame | OperationsDataset:
+    """Возвращает DF или OperationsDataset как есть, а поток частей DF (см. stream.iter_operations_chunks)
+    сворачивает в OperationsRollup, не собирая все операции в памяти"""
+    if isinstance(df, (pd.DataFrame, OperationsDataset)):
+        return df
+    from src.stream import rollup_chunks
+
+    return rollup_chunks(df)
+
+
+def _sum_by_card(spending: pd.DataFrame) -> pd.Series:
+    return spending.groupby("Номер карты", observed=True)["Сумма платежа"].sum()
+
+
+def _sum_by_category(operations: pd.DataFrame) -> pd.Series:
+    return operations.groupby("Категория", observed=True)["Сумма платежа"].sum()
+
+
+def get_cards_info(df: OperationsSource, shards: int | None = None) -> list[dict]:
     """Принимает имя файла в папке ..data/ и возвращает список словарей с каждой картой в файле, суммой транзакций
-    и кэшбэком по этой карте"""
+    и кэшбэком по этой карте. CardLedger отвечает по накопленным суммам без прохода по операциям.
+    shards - число частей для группировки в пуле потоков (см. sharding.aggregate_by_shards)"""
     logger.info("Функция get_cards_info начинает работу")
+    from src.ledger import CardLedger
+
+    if isinstance(df, CardLedger):
+        result = df.cards_info()
+        logger.info("Функция get_cards_info завершает работу")
+        return result
     logger.info("Фильтруем полученный DF")
-    spending = filter_transaction(df)
-    sum_info = spending.groupby("Номер карты")["Сумма платежа"].sum()
+    sum_info = aggregate_by_shards(
+        as_operations(df), "Номер карты", _sum_by_card, filter_transaction, shards, SHARD_COLUMNS["Номер карты"]
+    )
 
-    result = []
-    for key, value in sum_info.items():
-        result.append({"last_digits": key[-4:], "total_spent": abs(value), "cashback": abs(round(value / 100, 2))})
+    last_digits = sum_info.index.astype(str).str[-4:]
+    total_spent = sum_info.abs().tolist()
+    cashback = (sum_info / 100).round(2).abs().tolist()
+    result = [
+        {"last_digits": digits, "total_spent": spent, "cashback": card_cashback}
+        for digits, spent, card_cashback in zip(last_digits, total_spent, cashback)
+    ]
 
     logger.info("Функция get_cards_info завершает работу")
     return result
 
 
-def get_top5_transaction_info(df: pd.DataFrame) -> list[dict]:
-    """Возвращает топ-5 транзакций по сумме платежа"""
+def get_top5_transaction_info(df: OperationsSource) -> list[dict]:
+    """Возвращает топ-5 транзакций по сумме платежа. Из равных сумм берутся идущие раньше в DF:
+    в выгрузке - первые строки файла, после normalize_operations - более ранние по дате платежа"""
     logger.info("Функция get_top5_transaction_info начинает работу")
-    logger.info("Фильтруем полученный DF")
-    only_spending = filter_transaction(df)
-    sorted_df = only_spending.nsmallest(5, "Сумма платежа")
-
-    result = []
-    for _, row in sorted_df.iterrows():
-        result.append(
-            {
-                "date": row["Дата платежа"][:11],
-                "amount": abs(row["Сумма платежа"]),
-                "category": row["Категория"],
-                "description": row["Описание"],
-            }
-        )
-
+    result = top_transactions(df, n=5)
     logger.info("Функция get_top5_transaction_info завершает работу")
     return result
 
 
-def get_df_data_from_file(file_name: str = "operations.xlsx") -> pd.DataFrame:
-    """Принимает имя файла в папке /data и возвращает DataFrame объект"""
+def get_df_data_from_file(
+    file_name: str = "operations.xlsx", use_cache: bool = True, rebuild_cache: bool = False
+) -> pd.DataFrame:
+    """Принимает имя файла в папке /data и возвращает DataFrame объект.
+    По умолчанию читает снимок рядом с файлом, rebuild_cache=True принудительно пересобирает его"""
     logger.info("Функция get_df_data_from_file начинает работу")
     try:
-        logger.info(f"Открываем файл {DATA_DIR / file_name}")
-        result = pd.read_excel(DATA_DIR / file_name, engine="openpyxl")
+        logger.info("Открываем файл %s", DATA_DIR / file_name)
+        if use_cache:
+            result = read_excel_cached(DATA_DIR / file_name, rebuild=rebuild_cache)
+        else:
+            result = pd.read_excel(DATA_DIR / file_name, engine="openpyxl")
     except FileNotFoundError as ex:
-        logger.warning(f"Файл не найден: {ex}")
+        logger.warning("Файл не найден: %s", ex)
         return pd.DataFrame()
     logger.info("Функция get_df_data_from_file завершает работу")
     return result
 
 
-def cash_and_transfers_count(df: pd.DataFrame) -> list[dict]:
+def cash_and_transfers_count(df: OperationsSource) -> list[dict]:
     """Считает расходы наличными и переводы"""
     logger.info("Функция cash_and_transfers_count начинает работу")
     logger.info("Фильтруем полученный DF")
 
-    spending = filter_transaction(df)
+    spending = filter_transaction(as_operations(df))
 
     cash_only = spending[spending["Категория"] == "Наличные"]
     transfers_only = spending[spending["Категория"] == "Переводы"]
@@ -210,12 +288,14 @@ def cash_and_transfers_count(df: pd.DataFrame) -> list[dict]:
     return result
 
 
-def most_spending_filter(df: pd.DataFrame) -> list[dict]:
-    """Принимает DF и возвращает список словарей с 7 самыми популярными категориями"""
+def most_spending_filter(df: OperationsSource, shards: int | None = None) -> list[dict]:
+    """Принимает DF и возвращает список словарей с 7 самыми популярными категориями.
+    shards - число частей для группировки в пуле потоков"""
     logger.info("Функция  начинает работу")
     logger.info("Фильтруем полученный DF")
-    spending = filter_transaction(df)
-    category_spending = spending.groupby("Категория")["Сумма платежа"].sum().abs()
+    category_spending = aggregate_by_shards(
+        as_operations(df), "Категория", _sum_by_category, filter_transaction, shards, SHARD_COLUMNS["Категория"]
+    ).abs()
     sorted_category = category_spending.sort_values(ascending=False)
     top7 = sorted_category.head(7)
 
@@ -230,13 +310,15 @@ def most_spending_filter(df: pd.DataFrame) -> list[dict]:
     return result
 
 
-def get_income_category(df: pd.DataFrame) -> list[dict]:
-    """Принимает DF и возвращает список словарей с суммами поступлений"""
+def get_income_category(df: OperationsSource, shards: int | None = None) -> list[dict]:
+    """Принимает DF и возвращает список словарей с суммами поступлений.
+    shards - число частей для группировки в пуле потоков"""
     logger.info("Функция  начинает работу")
     logger.info("Фильтруем полученный DF")
 
-    income_df = df[(df["Сумма платежа"] > 0) & (df["Статус"] == "OK")]
-    category_income = income_df.groupby("Категория")["Сумма платежа"].sum()
+    category_income = aggregate_by_shards(
+        as_operations(df), "Категория", _sum_by_category, filter_income, shards, SHARD_COLUMNS["Категория"]
+    )
     sorted_category = category_income.sort_values(ascending=False)
 
     result = [{"category": category, "amount": round(amount, 2)} for category, amount in sorted_category.items()]
@@ -245,26 +327,40 @@ def get_income_category(df: pd.DataFrame) -> list[dict]:
     return result
 
 
-def filter_data_by_range(data: pd.DataFrame, date: str, data_range: str = "M") -> pd.DataFrame:
-    """Фильтрует DF по указанной дате"""
+def get_range_start(current_date: datetime, data_range: str = "M") -> datetime | None:
+    """Возвращает начало периода, заканчивающегося current_date: W-неделя, M-месяц, Y-год, ALL (None)-всё время"""
+    if data_range == "W":
+        return current_date - timedelta(days=current_date.weekday())
+    if data_range == "M":
+        return current_date.replace(day=1)
+    if data_range == "Y":
+        return current_date.replace(month=1, day=1)
+    return None
+
+
+def filter_data_by_range(data: pd.DataFrame | OperationsDataset, date: str, data_range: str = "M") -> pd.DataFrame:
+    """Фильтрует DF по указанной дате. Даты платежа в результате остаются в формате datetime64.
+    Для OperationsDataset и DF, отсортированного по индексу дат платежа, окно ищется бинарным поиском"""
     logger.info("Функция filter_data_by_range начинает работу")
     current_date = datetime.strptime(date, "%Y-%m-%d")
-    data_copy = data.copy()
-    data_copy["Дата платежа"] = pd.to_datetime(data_copy["Дата платежа"])
     logger.info("Вычисляем дату начала периода")
-    if data_range == "W":
-        start_date = current_date - timedelta(days=current_date.weekday())
-    elif data_range == "M":
-        start_date = current_date.replace(day=1)
-    elif data_range == "Y":
-        start_date = current_date.replace(month=1, day=1)
+    start_date = get_range_start(current_date, data_range)
+
+    if isinstance(data, OperationsDataset):
+        result = data.slice_by_payment_date(start_date, current_date)
+    elif isinstance(data.index, pd.DatetimeIndex) and is_sorted_i8(data.index.asi8):
+        # Проверка по int64, а не is_monotonic_increasing: пустые даты платежа (NaT) идут в начале
+        lo, hi = get_window_bounds(data.index.asi8, start_date, current_date)
+        result = data.iloc[lo:hi]
     else:
-        result = data_copy[(data_copy["Дата платежа"] <= current_date)]
-        result["Дата платежа"] = result["Дата платежа"].dt.strftime("%d-%m-%Y")
-        return result
-
-    result = data_copy[(data_copy["Дата платежа"] >= start_date) & (data_copy["Дата платежа"] <= current_date)]
-    result["Дата платежа"] = result["Дата платежа"].dt.strftime("%d-%m-%Y")
+        payment_dates = get_datetime_column(data, "Дата платежа")
+        if start_date is None:
+            mask = payment_dates <= current_date
+        else:
+            mask = (payment_dates >= start_date) & (payment_dates <= current_date)
+        result = data[mask]
+        if result["Дата платежа"].dtype != payment_dates.dtype:
+            result = result.assign(**{"Дата платежа": payment_dates[mask]})
     logger.info("Функция filter_data_by_range завершает работу")
     return result
 
@@ -1,73 +1,114 @@
-import logging
-from typing import Literal
+import threading
+import time
+from typing import Iterable, Literal
 
 import pandas as pd
 
+from src.dataset import OperationsDataset
+from src.events import DATA_RANGES, EventsWindows, get_events_windows
+from src.logger import get_logger
+from src.market_data import MarketDataClient
+from src.profiling import profiled, stage
 from src.utils import (
     cash_and_transfers_count,
     filter_data_by_range,
     filter_transaction,
     get_cards_info,
-    get_exchange_rate,
     get_greetings_by_time,
     get_income_category,
-    get_stock_price,
     get_top5_transaction_info,
     most_spending_filter
 )
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    filename="./logs/views.log",
-    encoding="utf-8",
-    filemode="w",
-    format="%(asctime)s %(levelname)s %(funcName)s %(lineno)d: %(message)s",
-    datefmt="%Y-%m-%d -%H:%M:%S",
-)
-logger_web = logging.getLogger("main_web")
-logger_events = logging.getLogger("main_events")
+logger_web = get_logger(f"{__name__}.main_web", "views.log")
+logger_events = get_logger(f"{__name__}.main_events", "views.log")
+
+
+# Курсы валют и акций запрашиваются при первом обращении, а не при импорте модуля,
+# и переиспользуются main_web и main_events, пока не устареют
+MARKET_DATA_TTL = 15 * 60
+
+_market_lock = threading.Lock()
+_market_client: MarketDataClient | None = None
+_market_data: dict | None = None
+_market_data_time = 0.0
+
+
+def get_market_data(max_age: float = MARKET_DATA_TTL) -> dict:
+    """Возвращает курсы валют и цены акций. Данные запрашиваются при первом вызове
+    и повторно - только если они старше max_age секунд"""
+    global _market_client, _market_data, _market_data_time
+    with _market_lock:
+        if _market_data is None or time.monotonic() - _market_data_time > max_age:
+            logger_web.info("Получаем курсы валют и цены акций")
+            if _market_client is None:
+                _market_client = MarketDataClient(ttl=max_age)
+            _market_data = _market_client.get_market_data()
+            _market_data_time = time.monotonic()
+        return _market_data
 
-# logger.setLevel(logging.DEBUG)
-# file_handler = logging.FileHandler('./logs/views.log')
-# logger.addHandler(file_handler)
-# file_formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s %(funcName)s %(lineno)d: %(message)s')
-# file_handler.setFormatter(file_formatter)
 
-exchange_rate = get_exchange_rate()
-stock_price = get_stock_price()
+def set_market_data(market_data: dict) -> None:
+    """Подставляет уже полученные курсы, например переданные из главного процесса пакетной обработки"""
+    global _market_data, _market_data_time
+    with _market_lock:
+        _market_data = market_data
+        _market_data_time = time.monotonic()
 
 
-def main_web(date: str, data: pd.DataFrame) -> dict:
+def prefetch_market_data() -> threading.Thread:
+    """Запускает получение курсов в фоне, чтобы к вызову main_web/main_events они уже были готовы"""
+    thread = threading.Thread(target=get_market_data, name="market-data-prefetch", daemon=True)
+    thread.start()
+    return thread
+
+
+@profiled()
+def main_web(date: str, data: pd.DataFrame | OperationsDataset) -> dict:
     """Главная функция для веб-интерфейса."""
     logger_web.info("Функция начинает работу")
+    operations = data if isinstance(data, OperationsDataset) else OperationsDataset(data)
+    with stage("groupby", rows=len(operations)):
+        cards = get_cards_info(operations)
+        top_transactions = get_top5_transaction_info(operations)
+    with stage("market_data"):
+        market_data = get_market_data()
     result = {
         "greeting": get_greetings_by_time(),
-        "cards": get_cards_info(data),
-        "top_transactions": get_top5_transaction_info(data),
-        "currency_rates": exchange_rate,  # заменить
-        "stock_prices": stock_price,  # заменить
+        "cards": cards,
+        "top_transactions": top_transactions,
+        "currency_rates": market_data["currency_rates"],
+        "stock_prices": market_data["stock_prices"],
     }
     logger_web.info("Функция завершила работу")
     return result
 
 
-def main_events(date: str, data: pd.DataFrame, data_range: Literal["W", "M", "Y", "ALL"] = "M") -> dict:
+@profiled()
+def main_events(
+    date: str, data: pd.DataFrame | OperationsDataset, data_range: Literal["W", "M", "Y", "ALL"] = "M"
+) -> dict:
     """Главная функция для событий с возможностью фильтрации по периоду"""
     """W-неделя, M-месяц, Y-год, ALL-всё время"""
     logger_events.info("Начало работы функции")
     logger_events.info("Отфильтровываем DF")
-    df_by_time = filter_data_by_range(data, date, data_range)
-    spending = filter_transaction(df_by_time)
-    income = df_by_time[(df_by_time["Сумма платежа"] > 0) & (df_by_time["Статус"] != "FAILED")]
+    with stage("filter", rows=len(data)):
+        df_by_time = filter_data_by_range(data, date, data_range)
+        spending = filter_transaction(df_by_time)
+        operations = OperationsDataset(df_by_time, spending=spending)
+        income = df_by_time[(df_by_time["Сумма платежа"] > 0) & (df_by_time["Статус"] != "FAILED")]
 
     logger_events.info("Получаем информацию")
-    expenses_total_amount = str(int(abs(spending["Сумма платежа"].sum())))
-    main_spending = most_spending_filter(spending)
-    transfers_and_cash = cash_and_transfers_count(spending)
-    income_total_amount = str(int(abs(income["Сумма платежа"].sum())))
-    main_income = get_income_category(income)
+    with stage("groupby", rows=len(df_by_time)):
+        expenses_total_amount = str(int(abs(spending["Сумма платежа"].sum())))
+        main_spending = most_spending_filter(operations)
+        transfers_and_cash = cash_and_transfers_count(operations)
+        income_total_amount = str(int(abs(income["Сумма платежа"].sum())))
+        main_income = get_income_category(operations)
 
     logger_events.info("Сохраняем в словарь")
+    with stage("market_data"):
+        market_data = get_market_data()
     result = {
         "expenses": {
             "total_amount": expenses_total_amount,
@@ -75,9 +116,40 @@ def main_events(date: str, data: pd.DataFrame, data_range: Literal["W", "M", "Y"
             "transfers_and_cash": transfers_and_cash,
         },
         "income": {"total_amount": income_total_amount, "main": main_income},
-        "currency_rates": exchange_rate,  # заменить
-        "stock_prices": stock_price,  # заменить
+        "currency_rates": market_data["currency_rates"],
+        "stock_prices": market_data["stock_prices"],
     }
 
     logger_events.info("Функция завершила работу")
     return result
+
+
+@profiled()
+def main_events_multi(
+    dates: str | list[str],
+    data: pd.DataFrame | OperationsDataset | EventsWindows,
+    data_ranges: Iterable[str] = DATA_RANGES,
+) -> dict:
+    """main_events сразу для нескольких периодов и дат по одному проходу по данным.
+    Для одной даты возвращает {период: результат main_events}, для списка дат - {дата: {период: ...}}.
+    Суммы складываются в копейках, поэтому возможны расхождения с main_events в последней цифре
+    из-за ошибок округления float"""
+    logger_events.info("Функция main_events_multi начинает работу")
+    with stage("prepare"):
+        windows = data if isinstance(data, EventsWindows) else get_events_windows(data)
+    data_ranges = list(data_ranges)
+    with stage("market_data"):
+        market_data = get_market_data()
+
+    result = {}
+    for date in [dates] if isinstance(dates, str) else dates:
+        result[date] = {
+            data_range: {
+                **windows.summary(date, data_range),
+                "currency_rates": market_data["currency_rates"],
+                "stock_prices": market_data["stock_prices"],
+            }
+            for data_range in data_ranges
+        }
+    logger_events.info("Функция main_events_multi завершила работу")
+    return result[dates] if isinstance(dates, str) else result
@@ -17,6 +17,24 @@ def mock_df_data():
     )
 
 
+@pytest.fixture
+def operations_df():
+    """Фикстура с операциями в формате выгрузки банка"""
+    return pd.DataFrame(
+        {
+            "Дата операции": ["01.11.2021 10:00:00", "15.11.2021 11:00:00", "01.12.2021 12:00:00"],
+            "Дата платежа": ["01.11.2021", "15.11.2021", "01.12.2021"],
+            "Номер карты": ["*1234", "*5678", "*1234"],
+            "Статус": ["OK", "OK", "OK"],
+            "Сумма операции": [-1000.0, -2000.0, 3000.0],
+            "Сумма платежа": [-1000.0, -2000.0, 3000.0],
+            "Кэшбэк": [10.0, 20.0, None],
+            "Категория": ["Супермаркеты", "Транспорт", "Пополнения"],
+            "Описание": ["Магнит", "Такси", "Зарплата"],
+        }
+    )
+
+
 @pytest.fixture
 def mock_dict_data():
     """Фикстура с тестовыми данными Dict"""
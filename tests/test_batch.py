@@ -0,0 +1,161 @@
+import json
+import logging
+from datetime import date
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src import logger as logger_module
+from src.batch import build_user_widget, get_investment_transactions, read_batch_tasks, run_batch
+from src.logger import get_logger, prepare_worker_logging
+from src.main import build_widget
+from src.rates import RateHistory, get_archive_path
+from src.services import investment_bank
+from src.utils import normalize_operations
+
+MARKET_DATA = {"currency_rates": [{"currency": "USD", "rate": 80.5}], "stock_prices": []}
+
+
+@pytest.fixture
+def users_dir(tmp_path, operations_df):
+    """Папка с операциями трёх пользователей"""
+    source = tmp_path / "users"
+    source.mkdir()
+    operations_df.to_excel(source / "user_1.xlsx", index=False)
+    operations_df.head(2).to_excel(source / "user_2.xlsx", index=False)
+    operations_df.to_csv(source / "user_3.csv", sep=";", decimal=",", index=False)
+    (source / "notes.txt").write_text("не файл с операциями")
+    return source
+
+
+def test_read_batch_tasks_dir(users_dir):
+    assert [user_id for user_id, _ in read_batch_tasks(users_dir)] == ["user_1", "user_2", "user_3"]
+
+
+def test_read_batch_tasks_manifest(users_dir):
+    manifest = users_dir / "manifest.json"
+    manifest.write_text(json.dumps({"42": "user_2.xlsx"}))
+
+    assert read_batch_tasks(manifest) == [("42", users_dir / "user_2.xlsx")]
+
+
+@patch("src.views.get_market_data", return_value=MARKET_DATA)
+def test_build_user_widget(mock_market, users_dir, tmp_path):
+    assert build_user_widget(("user_1", users_dir / "user_1.xlsx", tmp_path, "2021-12-31 10:00:00")) == (
+        "user_1",
+        None,
+    )
+
+    result = json.loads((tmp_path / "user_1.json").read_text(encoding="utf-8"))
+    assert result["web_pages"]["main_web_data"]["cards"] == [
+        {"last_digits": "1234", "total_spent": 1000.0, "cashback": 10.0},
+        {"last_digits": "5678", "total_spent": 2000.0, "cashback": 20.0},
+    ]
+    assert result["reports"]["spending_by_category"] == {"Магнит": 1000.0}
+
+
+@patch("src.views.get_market_data", return_value=MARKET_DATA)
+def test_build_widget_uses_current_date(mock_market, operations_df):
+    df = normalize_operations(operations_df)
+
+    result = build_widget(df, "2021-11-30 10:00:00", get_investment_transactions(df))
+
+    assert result["web_pages"]["main_events_data"]["expenses"]["total_amount"] == "3000"
+    assert result["services"]["high_cashback_categories"] == {"Транспорт": 20, "Супермаркеты": 10}
+    assert result["services"]["investment_bank"] == investment_bank("2021-11", get_investment_transactions(df), 20)
+    assert result["reports"]["spending_by_category"] == {"Магнит": 1000.0}
+
+    december = build_widget(df, "2021-12-31 10:00:00", get_investment_transactions(df))
+    assert december["web_pages"]["main_events_data"]["income"]["total_amount"] == "3000"
+    assert december["services"]["high_cashback_categories"] == {}
+
+
+@patch("src.views.get_market_data", return_value=MARKET_DATA)
+def test_build_widget_report_dates(mock_market, operations_df):
+    df = normalize_operations(operations_df)
+    report_dates = {"events": "2021-11-30", "cashback": "2021-11", "spending": "30-11-2021"}
+
+    result = build_widget(df, "2021-12-31 10:00:00", get_investment_transactions(df), report_dates=report_dates)
+
+    assert result["web_pages"]["main_events_data"]["expenses"]["total_amount"] == "3000"
+    assert result["services"]["high_cashback_categories"] == {"Транспорт": 20, "Супермаркеты": 10}
+    assert result["services"]["investment_bank"] == investment_bank("2021-12", get_investment_transactions(df), 20)
+    assert result["reports"]["spending_by_category"] == {"Магнит": 1000.0}
+
+
+def test_build_user_widget_error(tmp_path):
+    user_id, error = build_user_widget(("user_x", tmp_path / "no_file.xlsx", tmp_path, "2021-12-31 10:00:00"))
+    assert user_id == "user_x"
+    assert error
+
+
+def test_run_batch(users_dir, tmp_path):
+    output_dir = tmp_path / "widgets"
+    result = run_batch(users_dir, output_dir, "2021-12-31 10:00:00", workers=2, market_data=MARKET_DATA)
+
+    assert result == {"user_1": None, "user_2": None, "user_3": None}
+    widgets = {path.stem: json.loads(path.read_text(encoding="utf-8")) for path in output_dir.glob("*.json")}
+    assert widgets["user_1"]["web_pages"]["main_web_data"]["currency_rates"] == MARKET_DATA["currency_rates"]
+    cards = {user_id: widget["web_pages"]["main_web_data"]["cards"] for user_id, widget in widgets.items()}
+    assert cards["user_1"] == cards["user_3"]
+    assert len(cards["user_2"]) == 2
+
+
+def test_run_batch_with_rates(operations_df, tmp_path):
+    rates_dir = tmp_path / "rates"
+    path = get_archive_path(rates_dir, date(2021, 11, 1))
+    path.parent.mkdir(parents=True)
+    path.write_text(
+        json.dumps({"Date": "2021-11-01T11:30:00+03:00", "Valute": {"USD": {"Nominal": 1, "Value": 70.0}}}),
+        encoding="utf-8",
+    )
+    source = tmp_path / "users"
+    source.mkdir()
+    operations_df.assign(**{"Валюта операции": "USD", "Валюта платежа": "USD"}).to_excel(
+        source / "user_1.xlsx", index=False
+    )
+
+    output_dir = tmp_path / "widgets"
+    run_batch(source, output_dir, "2021-12-31 10:00:00", workers=1, market_data=MARKET_DATA, rates_dir=rates_dir)
+
+    widget = json.loads((output_dir / "user_1.json").read_text(encoding="utf-8"))
+    assert widget["web_pages"]["main_web_data"]["cards"] == [
+        {"last_digits": "1234", "total_spent": 70000.0, "cashback": 700.0},
+        {"last_digits": "5678", "total_spent": 140000.0, "cashback": 1400.0},
+    ]
+
+
+@patch("src.views.get_market_data", return_value=MARKET_DATA)
+def test_build_widget_with_rates(mock_market, operations_df):
+    df = normalize_operations(operations_df.assign(**{"Валюта операции": "USD", "Валюта платежа": "USD"}))
+    history = RateHistory(pd.DataFrame({"date": ["2021-11-01"], "currency": ["USD"], "rate": [70.0]}))
+
+    result = build_widget(df, "2021-12-31 10:00:00", get_investment_transactions(df), history)
+
+    assert result["reports"]["spending_by_category"] == {"Магнит": 70000.0}
+
+
+def test_worker_logging_appends(monkeypatch):
+    handler = logger_module._get_file_handler("test_worker_logging.log")
+    assert handler.mode == "w"
+
+    prepare_worker_logging()
+    assert handler.mode == "a"
+
+    monkeypatch.setattr(logger_module.multiprocessing, "parent_process", lambda: object())
+    assert logger_module._get_file_mode() == "a"
+    logger_module._handlers.pop("test_worker_logging.log")
+
+
+def test_run_batch_workers_append_to_logs(users_dir, tmp_path, monkeypatch):
+    # Лог main ещё не открыт в родителе: его открывают процессы пула
+    monkeypatch.setattr(logger_module, "LOGS_DIR", tmp_path / "logs")
+    monkeypatch.setattr(logger_module, "_handlers", {})
+    monkeypatch.setattr(logging.getLogger("src.main"), "handlers", [])
+    get_logger("src.main", "main.log")
+
+    run_batch(users_dir, tmp_path / "widgets", "2021-12-31 10:00:00", workers=2, market_data=MARKET_DATA)
+
+    log = (tmp_path / "logs" / "main.log").read_text(encoding="utf-8")
+    assert log.count("Функция build_widget начинает работу") == 3
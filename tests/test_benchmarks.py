@@ -0,0 +1,52 @@
+import json
+
+import pandas as pd
+
+from benchmarks.generator import EXPORT_COLUMNS, generate_operations
+from benchmarks.run import compare_results, main, run_benchmarks
+from src.utils import normalize_operations
+
+
+def test_generate_operations():
+    df = generate_operations(1000, seed=1)
+
+    assert list(df.columns) == EXPORT_COLUMNS
+    assert len(df) == 1000
+    assert df.equals(generate_operations(1000, seed=1))
+    assert not df.equals(generate_operations(1000, seed=2))
+    assert set(df["Статус"].cat.categories) == {"OK", "FAILED"}
+    assert (df["Сумма платежа"] < 0).any() and (df["Сумма платежа"] > 0).any()
+
+
+def test_generate_operations_as_export():
+    df = generate_operations(100, as_export=True)
+    normalized = normalize_operations(df)
+
+    assert df["Дата платежа"].str.match(r"\d{2}\.\d{2}\.\d{4}$").all()
+    assert pd.api.types.is_datetime64_any_dtype(normalized["Дата операции"])
+
+
+def test_run_benchmarks():
+    report = run_benchmarks({"tiny": 500}, repeat=1, only=["get_cards_info", "main"])
+
+    assert [result["function"] for result in report["results"]] == ["get_cards_info", "main"]
+    assert all(result["wall_min"] > 0 and result["peak_memory"] > 0 for result in report["results"])
+
+
+def test_compare_results():
+    baseline = {"results": [{"size": "10k", "function": "main", "wall_min": 1.0}]}
+    current = {"results": [{"size": "10k", "function": "main", "wall_min": 1.5}]}
+
+    assert compare_results(baseline, current, threshold=2) == []
+    assert compare_results(baseline, current)[0]["ratio"] == 1.5
+
+
+def test_main_gates_regressions(tmp_path, monkeypatch):
+    monkeypatch.setattr("benchmarks.run.SIZES", {"10k": 300})
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"results": [{"size": "10k", "function": "get_cards_info", "wall_min": 1e-9}]}))
+    arguments = ["--sizes", "10k", "--repeat", "1", "--only", "get_cards_info", "--output", str(tmp_path / "out.json")]
+
+    assert main(arguments) == 0
+    assert json.loads((tmp_path / "out.json").read_text(encoding="utf-8"))["results"][0]["rows"] == 300
+    assert main(arguments + ["--compare", str(baseline)]) == 1
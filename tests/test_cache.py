@@ -0,0 +1,79 @@
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cache import get_cache_dir, read_column_bundle, read_excel_cached, write_column_bundle
+
+
+@pytest.fixture
+def excel_file(tmp_path, mock_df_data):
+    """Фикстура с небольшим XLSX-файлом"""
+    file_path = tmp_path / "operations.xlsx"
+    mock_df_data.to_excel(file_path, index=False)
+    return file_path
+
+
+def test_write_and_read_column_bundle(tmp_path):
+    """Снимок сохраняет числа, строки с пропусками и даты"""
+    df = pd.DataFrame(
+        {
+            "Сумма платежа": [-1000.5, 20.0, np.nan],
+            "Номер карты": ["*7197", np.nan, "*4556"],
+            "Дата": pd.to_datetime(["2021-12-31", "2021-12-30", "2021-12-29"]),
+        }
+    )
+    write_column_bundle(df, tmp_path / "bundle")
+
+    pd.testing.assert_frame_equal(read_column_bundle(tmp_path / "bundle"), df)
+
+
+def test_read_excel_cached_uses_snapshot(excel_file):
+    """Повторное чтение не разбирает XLSX"""
+    first = read_excel_cached(excel_file)
+    assert (get_cache_dir(excel_file) / "meta.json").exists()
+
+    with patch("src.cache.pd.read_excel") as mock_read:
+        second = read_excel_cached(excel_file)
+        mock_read.assert_not_called()
+
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_read_excel_cached_rebuild(excel_file):
+    """rebuild=True пересобирает снимок"""
+    read_excel_cached(excel_file)
+
+    with patch("src.cache.pd.read_excel", return_value=pd.DataFrame({"a": [1]})) as mock_read:
+        result = read_excel_cached(excel_file, rebuild=True)
+        mock_read.assert_called_once()
+
+    assert result.to_dict(orient="list") == {"a": [1]}
+
+
+def test_read_excel_cached_same_content_new_mtime(excel_file):
+    """Изменилось только время модификации - снимок остаётся действительным"""
+    read_excel_cached(excel_file)
+    stat = os.stat(excel_file)
+    os.utime(excel_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    with patch("src.cache.pd.read_excel") as mock_read:
+        read_excel_cached(excel_file)
+        mock_read.assert_not_called()
+
+
+def test_read_excel_cached_changed_file(excel_file, mock_df_data):
+    """После изменения файла снимок пересобирается"""
+    read_excel_cached(excel_file)
+    mock_df_data.head(2).to_excel(excel_file, index=False)
+
+    result = read_excel_cached(excel_file)
+
+    assert len(result) == 2
+
+
+def test_read_excel_cached_file_not_found(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_excel_cached(tmp_path / "no_file.xlsx")
@@ -0,0 +1,96 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.dataset import OperationsDataset, index_by_payment_date
+from src.services import get_high_cashback_categories
+from src.utils import (
+    cash_and_transfers_count,
+    filter_income,
+    filter_transaction,
+    get_cards_info,
+    get_income_category,
+    get_top5_transaction_info,
+    most_spending_filter
+)
+
+
+def test_operations_dataset_masks(mock_df_data):
+    operations = OperationsDataset(mock_df_data)
+
+    assert operations.spending_mask.tolist() == [True, True, False, False]
+    assert operations.income_mask.tolist() == [False, False, True, False]
+    assert operations.spending["Описание"].tolist() == ["Магнит", "Такси"]
+    assert operations.income["Описание"].tolist() == ["Яндекс-Драйв"]
+    assert len(operations) == 4
+
+
+def test_operations_dataset_computes_masks_once(mock_df_data):
+    operations = OperationsDataset(mock_df_data)
+    spending = filter_transaction(operations)
+
+    with patch("src.dataset.OperationsDataset.spending_mask") as mock_mask:
+        get_cards_info(operations)
+        most_spending_filter(operations)
+        cash_and_transfers_count(operations)
+        assert filter_transaction(operations) is spending
+        assert not mock_mask.mock_calls
+
+
+def test_operations_dataset_prepared_spending(mock_df_data):
+    """Заранее отфильтрованные расходы не пересчитываются"""
+    spending = mock_df_data.head(1)
+    operations = OperationsDataset(mock_df_data, spending=spending)
+
+    assert filter_transaction(operations) is spending
+
+
+def test_filter_income(mock_df_data):
+    assert filter_income(mock_df_data)["Описание"].tolist() == ["Яндекс-Драйв"]
+
+
+@pytest.mark.parametrize(
+    "func",
+    [get_cards_info, get_top5_transaction_info, most_spending_filter, get_income_category, cash_and_transfers_count],
+)
+def test_functions_accept_dataset(func, mock_df_data):
+    assert func(OperationsDataset(mock_df_data)) == func(mock_df_data)
+
+
+def test_get_high_cashback_categories_dataset():
+    df = pd.DataFrame(
+        {
+            "Дата операции": ["01-01-2023", "15-01-2023"],
+            "Категория": ["Госуслуги", "Супермаркеты"],
+            "Сумма платежа": [-1000, -2000],
+            "Статус": ["OK", "OK"],
+        }
+    )
+    assert get_high_cashback_categories(OperationsDataset(df), 2023, 1) == {"Супермаркеты": 20, "Госуслуги": 10}
+
+
+def test_slice_by_payment_date_sorted_with_empty_dates():
+    df = index_by_payment_date(
+        pd.DataFrame(
+            {
+                "Дата платежа": pd.to_datetime(["2023-03-01", None, "2023-01-01", "2023-02-15"]),
+                "Сумма платежа": [-1, -2, -3, -4],
+            }
+        )
+    )
+    operations = OperationsDataset(df)
+
+    assert operations.slice_by_payment_date(None, datetime(2023, 2, 28))["Сумма платежа"].tolist() == [-3, -4]
+    assert operations.slice_by_payment_date(datetime(2023, 2, 1), datetime(2023, 3, 1))["Сумма платежа"].tolist() == [
+        -4,
+        -1,
+    ]
+
+
+def test_slice_by_payment_date_unsorted_keeps_order(mock_df_data):
+    result = OperationsDataset(mock_df_data).slice_by_payment_date(datetime(2023, 1, 1), datetime(2023, 1, 31))
+
+    assert result["Описание"].tolist() == ["Магнит", "Олег"]
+    assert pd.api.types.is_datetime64_any_dtype(result["Дата платежа"])
@@ -0,0 +1,180 @@
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.events import get_events_windows, get_operations_series, series_payload
+from src.utils import normalize_operations
+from src.views import main_events, main_events_multi
+
+MARKET_DATA = {"currency_rates": [], "stock_prices": []}
+
+
+@pytest.fixture
+def operations_df():
+    """Фикстура с операциями за несколько месяцев, включая операцию без даты платежа и неуспешную операцию"""
+    categories = ["Супермаркеты", "Наличные", "Переводы", "Фастфуд", "Аптеки", "Связь", "Транспорт", "ЖКХ", "Кино"]
+    rows = []
+    for number, day in enumerate(pd.date_range("2021-01-01", "2021-12-31", freq="9D")):
+        category = categories[number % len(categories)]
+        rows.append((day, category, -(number * 37.13 % 900 + 10), "OK"))
+        if number % 4 == 0:
+            rows.append((day, "Пополнения" if number % 8 else "Бонусы", number * 101.5 + 1, "OK"))
+    rows += [
+        (pd.Timestamp("2021-12-30"), "Супермаркеты", -500.0, "FAILED"),
+        (pd.NaT, "Фастфуд", -300.0, "OK"),
+        (pd.Timestamp("2021-12-31"), None, -70.0, "OK"),
+    ]
+    return normalize_operations(
+        pd.DataFrame(
+            {
+                "Дата операции": [day.strftime("%d.%m.%Y 12:00:00") if pd.notna(day) else None for day, *_ in rows],
+                "Дата платежа": [day.strftime("%d.%m.%Y") if pd.notna(day) else None for day, *_ in rows],
+                "Категория": [category for _, category, _, _ in rows],
+                "Сумма платежа": [amount for _, _, amount, _ in rows],
+                "Статус": [status for *_, status in rows],
+                "Номер карты": "*1234",
+                "Описание": "Магазин",
+            }
+        )
+    )
+
+
+@pytest.mark.parametrize("date", ["2020-12-31", "2021-01-01", "2021-03-15", "2021-07-04", "2021-12-31", "2022-02-01"])
+@pytest.mark.parametrize("data_range", ["W", "M", "Y", "ALL"])
+def test_events_windows_match_main_events(operations_df, date, data_range):
+    with patch("src.views.get_market_data", return_value=MARKET_DATA):
+        expected = main_events(date, operations_df, data_range)
+    expected.pop("currency_rates")
+    expected.pop("stock_prices")
+
+    assert get_events_windows(operations_df).summary(date, data_range) == expected
+
+
+def test_events_windows_payment_time_bounds():
+    df = pd.DataFrame(
+        {
+            "Дата платежа": pd.to_datetime(["2021-12-01 00:00:00", "2021-12-31 00:00:00", "2021-12-31 10:00:00"]),
+            "Категория": ["Фастфуд", "Фастфуд", "Фастфуд"],
+            "Сумма платежа": [-100.0, -200.0, -400.0],
+            "Статус": ["OK", "OK", "OK"],
+        }
+    )
+    summary = get_events_windows(df).summary("2021-12-31", "M")
+
+    # Операция 31.12 в 10:00 позже конца периода (31.12 00:00), как в filter_data_by_range
+    assert summary["expenses"]["total_amount"] == "300"
+    assert get_events_windows(df).summary("2022-01-01", "Y")["expenses"]["total_amount"] == "0"
+
+
+@patch("src.views.get_market_data", return_value=MARKET_DATA)
+def test_main_events_multi(mock_market, operations_df):
+    result = main_events_multi("2021-12-31", operations_df)
+
+    assert list(result) == ["W", "M", "Y", "ALL"]
+    assert result["M"]["currency_rates"] == []
+    windows = get_events_windows(operations_df)
+    assert main_events_multi("2021-12-31", windows, ["W", "M", "Y", "ALL"]) == result
+
+    by_date = main_events_multi(["2021-06-30", "2021-12-31"], windows, ["M"])
+    assert list(by_date) == ["2021-06-30", "2021-12-31"]
+    assert by_date["2021-12-31"]["M"] == result["M"]
+    assert by_date["2021-06-30"]["M"]["expenses"] == windows.summary("2021-06-30", "M")["expenses"]
+    mock_market.assert_called()
+
+
+@pytest.fixture
+def series_df():
+    """Фикстура с операциями для рядов: полночь и середина дня, категория без операций в части периодов"""
+    return pd.DataFrame(
+        {
+            "Дата платежа": pd.to_datetime(
+                [
+                    "2021-01-04 00:00:00",
+                    "2021-01-10 12:00:00",
+                    "2021-01-11 00:00:00",
+                    "2021-02-01 00:00:00",
+                    "2021-03-31 00:00:00",
+                    "2021-03-31 00:00:00",
+                    "2021-03-15 00:00:00",
+                ]
+            ),
+            "Категория": ["Фастфуд", "Фастфуд", "Такси", "Фастфуд", "Такси", "Пополнения", "Фастфуд"],
+            "Сумма платежа": [-100.0, -50.5, -300.0, -200.0, -400.0, 1000.0, -999.0],
+            "Статус": ["OK", "OK", "OK", "OK", "OK", "OK", "FAILED"],
+        }
+    )
+
+
+def test_series_monthly(series_df):
+    series = get_events_windows(series_df).series("M")
+
+    assert series.index.strftime("%Y-%m-%d").tolist() == ["2021-01-01", "2021-02-01", "2021-03-01"]
+    assert series.columns.tolist() == ["Такси", "Фастфуд"]
+    assert series["Фастфуд"].tolist() == [150.5, 200.0, 0.0]
+    assert series["Такси"].tolist() == [300.0, 0.0, 400.0]
+
+
+def test_series_weekly_and_daily_bounds(series_df):
+    windows = get_events_windows(series_df)
+
+    weekly = windows.series("W", start="2021-01-04", end="2021-01-17")
+    # Неделя с понедельника: операция в воскресенье 10.01 в 12:00 - в первой неделе
+    assert weekly.index.strftime("%Y-%m-%d").tolist() == ["2021-01-04", "2021-01-11"]
+    assert weekly["Фастфуд"].tolist() == [150.5, 0.0]
+    assert weekly["Такси"].tolist() == [0.0, 300.0]
+
+    daily = windows.series("D", start="2021-01-09", end="2021-01-11")
+    assert daily["Фастфуд"].tolist() == [0.0, 50.5, 0.0]
+
+
+def test_series_income_and_categories(series_df):
+    windows = get_events_windows(series_df)
+
+    income = windows.series("M", "income")
+    assert income.columns.tolist() == ["Пополнения"]
+    assert income["Пополнения"].tolist() == [0.0, 0.0, 1000.0]
+
+    selected = windows.series("Y", categories=["Такси", "Кино"])
+    assert selected.to_dict(orient="list") == {"Такси": [700.0], "Кино": [0.0]}
+
+
+def test_series_transforms(series_df):
+    windows = get_events_windows(series_df)
+
+    cumulative = windows.series("M", categories=["Фастфуд"], cumulative=True)
+    assert cumulative["Фастфуд"].tolist() == [150.5, 350.5, 350.5]
+
+    average = windows.series("M", categories=["Фастфуд"], moving_average=2)
+    assert average["Фастфуд"].tolist() == [150.5, 175.25, 100.0]
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"freq": "Q"},
+        {"kind": "transfers"},
+        {"cumulative": True, "moving_average": 3},
+        {"moving_average": 0},
+    ],
+)
+def test_series_errors(series_df, options):
+    with pytest.raises(ValueError):
+        get_operations_series(series_df, **options)
+
+
+def test_series_matches_groupby(operations_df):
+    series = get_operations_series(operations_df, "W")
+    spending = operations_df[(operations_df["Сумма платежа"] < 0) & (operations_df["Статус"] == "OK")]
+    spending = spending[spending["Дата платежа"].notna()]
+    weeks = spending["Дата платежа"].dt.to_period("W-SUN").dt.start_time
+    expected = spending.groupby([weeks, "Категория"], observed=True)["Сумма платежа"].sum().abs().unstack()
+
+    expected = expected.reindex(index=series.index, columns=series.columns, fill_value=0).fillna(0)
+    pd.testing.assert_frame_equal(series, expected, check_names=False, check_freq=False)
+
+
+def test_series_payload(series_df):
+    payload = series_payload(get_events_windows(series_df).series("M", categories=["Такси"]))
+
+    assert payload == {"dates": ["2021-01-01", "2021-02-01", "2021-03-01"], "series": {"Такси": [300.0, 0.0, 400.0]}}
@@ -0,0 +1,101 @@
+import pandas as pd
+import pytest
+
+from src.ledger import CardLedger
+from src.utils import filter_data_by_range, get_cards_info, normalize_operations
+
+
+@pytest.fixture
+def raw_operations_df():
+    """Фикстура с операциями по двум картам, включая операцию без даты платежа и неуспешную операцию"""
+    return pd.DataFrame(
+        {
+            "Дата операции": [
+                "30.10.2021 10:00:00",
+                "01.11.2021 10:00:00",
+                "15.11.2021 11:00:00",
+                "20.11.2021 12:00:00",
+                "01.12.2021 12:00:00",
+                "02.12.2021 12:00:00",
+                "03.12.2021 12:00:00",
+            ],
+            "Дата платежа": [
+                "31.10.2021",
+                "01.11.2021",
+                "15.11.2021",
+                None,
+                "01.12.2021",
+                "02.12.2021",
+                "03.12.2021",
+            ],
+            "Номер карты": ["*1234", "*1234", "*5678", "*5678", "*1234", "*1234", None],
+            "Статус": ["OK", "OK", "OK", "OK", "OK", "FAILED", "OK"],
+            "Сумма платежа": [-100.5, -1017.0, -2000.0, -300.0, 3000.0, -50.0, -70.0],
+            "Кэшбэк": [1.0, 10.0, 20.0, None, None, None, None],
+            "Категория": ["Фастфуд", "Супермаркеты", "Транспорт", "Такси", "Пополнения", "Фастфуд", "Фастфуд"],
+            "Описание": ["Теремок", "Магнит", "Метро", "Такси", "Зарплата", "Теремок", "Теремок"],
+        }
+    )
+
+
+@pytest.fixture
+def operations_df(raw_operations_df):
+    return normalize_operations(raw_operations_df)
+
+
+def test_card_ledger_all_time_matches_get_cards_info(operations_df):
+    ledger = CardLedger.from_frame(operations_df)
+
+    assert ledger.cards_info() == get_cards_info(operations_df)
+    assert get_cards_info(ledger) == get_cards_info(operations_df)
+
+
+@pytest.mark.parametrize("date", ["2021-10-31", "2021-11-14", "2021-11-30", "2021-12-31", "2022-01-01"])
+@pytest.mark.parametrize("data_range", ["W", "M", "Y", "ALL"])
+def test_card_ledger_ranges_match_filter(operations_df, date, data_range):
+    ledger = CardLedger.from_frame(operations_df)
+
+    expected = get_cards_info(filter_data_by_range(operations_df, date, data_range))
+    assert ledger.cards_info_for_range(date, data_range) == expected
+
+
+@pytest.mark.parametrize("date", ["2021-01-31", "2021-03-31", "2021-11-30", "2021-12-31"])
+def test_card_ledger_raw_dates_match_filter(raw_operations_df, date):
+    # Даты платежа строками, в которых день не больше 12: журнал и filter_data_by_range разбирают их одинаково
+    raw_df = raw_operations_df.iloc[[1, 4, 5, 6]]
+    ledger = CardLedger.from_frame(raw_df)
+
+    expected = get_cards_info(filter_data_by_range(raw_df, date, "M"))
+    assert ledger.cards_info_for_range(date, "M") == expected
+
+
+def test_card_ledger_totals(operations_df):
+    totals = CardLedger.from_frame(operations_df).totals("2021-11-01", "2021-11-30")
+
+    assert totals.index.tolist() == ["*1234", "*5678"]
+    assert totals["spent"].tolist() == [1017.0, 2000.0]
+    assert totals["cashback"].tolist() == [10.0, 20.0]
+    assert totals["count"].tolist() == [1, 1]
+
+
+def test_card_ledger_append(operations_df):
+    ledger = CardLedger()
+    assert ledger.cards_info() == []
+
+    # Части в обратном порядке: новые карты и дни раньше уже добавленных
+    for part in [operations_df.iloc[4:], operations_df.iloc[2:4], operations_df.iloc[:2]]:
+        ledger.append(part)
+
+    full = CardLedger.from_frame(operations_df)
+    assert ledger.cards.tolist() == full.cards.tolist()
+    assert ledger.first_day == full.first_day
+    assert (ledger.cumulative == full.cumulative).all()
+    assert ledger.cards_info("2021-11-01", "2021-11-30") == full.cards_info("2021-11-01", "2021-11-30")
+
+
+def test_card_ledger_outside_data(operations_df):
+    ledger = CardLedger.from_frame(operations_df)
+
+    assert ledger.cards_info("2020-01-01", "2020-12-31") == []
+    assert ledger.cards_info("2022-01-01", "2022-12-31") == []
+    assert ledger.cards_info("2021-12-01", "2021-11-01") == []
@@ -0,0 +1,153 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from src.market_data import MarketDataClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Заглушка ЦБ и Alpha Vantage"""
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        self.server.requests.append(url.path)
+        if self.server.failures > 0:
+            self.server.failures -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        if url.path == "/daily_json.js":
+            body = {"Valute": {"USD": {"Value": 80.5}, "EUR": {"Value": 90.1}}}
+        else:
+            symbol = parse_qs(url.query)["symbol"][0]
+            series = {"2025-05-15": {"4. close": "1.0"}, "2025-05-16": {"4. close": f"{len(symbol)}"}}
+            body = {"Time Series (Daily)": series}
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """Фикстура с локальным HTTP-сервером"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.requests = []
+    server.failures = 0
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(stub_server, tmp_path):
+    settings_path = tmp_path / "user_settings.json"
+    settings_path.write_text(json.dumps({"user_currencies": ["USD", "EUR"], "user_stocks": ["AAPL", "MSFT", "GOOGL"]}))
+    base_url = f"http://127.0.0.1:{stub_server.server_address[1]}"
+    client = MarketDataClient(
+        api_key="test",
+        settings_path=settings_path,
+        cache_path=tmp_path / "market_cache.json",
+        backoff=0.01,
+        cbr_url=f"{base_url}/daily_json.js",
+        av_url=f"{base_url}/query",
+    )
+    yield client
+    client.close()
+
+
+def test_get_exchange_rates(client):
+    assert client.get_exchange_rates() == [{"currency": "USD", "rate": 80.5}, {"currency": "EUR", "rate": 90.1}]
+
+
+def test_get_stock_prices(client, stub_server):
+    result = client.get_stock_prices()
+
+    assert result == [
+        {"stock": "AAPL", "price": 4.0},
+        {"stock": "MSFT", "price": 4.0},
+        {"stock": "GOOGL", "price": 5.0},
+    ]
+    assert stub_server.requests.count("/query") == 3
+
+
+def test_cache_within_ttl(client, stub_server):
+    client.get_market_data()
+    requests_count = len(stub_server.requests)
+
+    assert client.get_market_data()["stock_prices"]
+    assert len(stub_server.requests) == requests_count
+
+
+def test_disk_cache_between_clients(client, stub_server):
+    client.get_market_data()
+    requests_count = len(stub_server.requests)
+
+    other = MarketDataClient(
+        api_key="test",
+        settings_path=client.settings_path,
+        cache_path=client.cache_path,
+        cbr_url=client.cbr_url,
+        av_url=client.av_url,
+    )
+    assert other.get_exchange_rates()[0]["rate"] == 80.5
+    assert len(other.get_stock_prices()) == 3
+    assert len(stub_server.requests) == requests_count
+
+
+def test_expired_cache(client, stub_server):
+    client.ttl = 0
+    client.get_exchange_rates()
+    client.get_exchange_rates()
+
+    assert stub_server.requests.count("/daily_json.js") == 2
+
+
+def test_retry_after_server_error(client, stub_server):
+    stub_server.failures = 2
+
+    assert client.get_exchange_rates()[0] == {"currency": "USD", "rate": 80.5}
+    assert stub_server.requests.count("/daily_json.js") == 3
+
+
+def test_server_unavailable(client, stub_server):
+    stub_server.failures = 100
+
+    assert client.get_exchange_rates() == []
+    assert client.get_stock_prices() == []
+
+
+def test_get_stock_prices_without_key(client):
+    client.api_key = ""
+    with pytest.raises(ValueError):
+        client.get_stock_prices()
+
+    assert client.get_market_data()["stock_prices"] == []
+
+
+def test_concurrent_disk_cache_saves(client):
+    def save(number):
+        client._store(f"key{number}", number)
+        client._save_disk_cache()
+
+    threads = [threading.Thread(target=save, args=(number,)) for number in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(client.cache_path, "r", encoding="utf-8") as file:
+        saved = json.load(file)
+    assert {saved[f"key{number}"]["value"] for number in range(20)} == set(range(20))
+    assert list(client.cache_path.parent.glob("*.tmp")) == []
@@ -0,0 +1,78 @@
+import json
+import logging
+
+import pytest
+
+from src import profiling
+from src.logger import get_logger
+from src.profiling import PROFILER, disable_profiling, dump_profile, enable_profiling, get_profile, profiled, stage
+
+
+@pytest.fixture
+def profiler():
+    """Фикстура, включающая профилирование на время теста"""
+    enabled = PROFILER.enabled
+    enable_profiling()
+    yield PROFILER
+    PROFILER.enabled = enabled
+    PROFILER.reset()
+
+
+def test_disabled_stage_records_nothing():
+    disable_profiling()
+    PROFILER.reset()
+    with stage("load", rows=10) as load_stage:
+        load_stage.rows = 20
+
+    assert load_stage is profiling._NULL_STAGE
+    assert get_profile()["stages"] == []
+
+
+def test_nested_stages(profiler):
+    @profiled("build")
+    def build() -> None:
+        for _ in range(2):
+            with stage("groupby", rows=5):
+                pass
+
+    build()
+    with stage("serialize") as serialize_stage:
+        serialize_stage.rows = 3
+
+    stages = {stats["stage"]: stats for stats in get_profile()["stages"]}
+    assert list(stages) == ["build/groupby", "build", "serialize"]
+    assert stages["build/groupby"]["calls"] == 2
+    assert stages["build/groupby"]["rows"] == 10
+    assert stages["build"]["rows"] is None
+    assert stages["serialize"]["rows"] == 3
+    assert stages["build"]["wall"] >= stages["build/groupby"]["wall"]
+
+
+def test_stage_recorded_on_error(profiler):
+    with pytest.raises(ValueError):
+        with stage("filter"):
+            raise ValueError
+
+    with stage("groupby"):
+        pass
+    assert [stats["stage"] for stats in get_profile()["stages"]] == ["filter", "groupby"]
+
+
+def test_dump_profile(profiler, tmp_path):
+    with stage("load", rows=1):
+        pass
+
+    path = dump_profile(tmp_path / "profile.json")
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["stages"][0]["stage"] == "load"
+    assert {"started", "pid", "total_wall"} <= set(data)
+
+
+def test_get_logger_separate_files():
+    utils_logger = get_logger("src.utils")
+    views_logger = get_logger("src.views.main_web", "views.log")
+
+    assert not utils_logger.propagate
+    assert utils_logger.handlers[0] is not views_logger.handlers[0]
+    assert get_logger("src.views.main_events", "views.log").handlers[0] is views_logger.handlers[0]
+    assert utils_logger.handlers[0] not in logging.getLogger().handlers
@@ -0,0 +1,198 @@
+import json
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.rates import (
+    RateHistory,
+    convert_operations_currency,
+    fetch_cbr_archive,
+    get_archive_path,
+    parse_cbr_daily,
+)
+from src.utils import get_cards_info, normalize_operations
+
+
+def cbr_response(day, valutes):
+    """Ответ ЦБ в формате daily_json.js; valutes - {код: (номинал, курс)}"""
+    return {
+        "Date": f"{day}T11:30:00+03:00",
+        "PreviousDate": f"{day}T11:30:00+03:00",
+        "Timestamp": f"{day}T20:00:00+03:00",
+        "Valute": {
+            code: {"CharCode": code, "Nominal": nominal, "Name": code, "Value": value, "Previous": value}
+            for code, (nominal, value) in valutes.items()
+        },
+    }
+
+
+CBR_DAYS = {
+    "2021-12-01": {"USD": (1, 70.0), "CNY": (10, 110.0)},
+    "2021-12-03": {"USD": (1, 71.0), "CNY": (10, 112.0)},
+    "2021-12-06": {"USD": (1, 72.0), "CNY": (10, 115.0)},
+}
+
+
+@pytest.fixture
+def cbr_archive(tmp_path):
+    """Папка с ответами ЦБ в раскладке архива ЦБ"""
+    directory = tmp_path / "rates"
+    for day, valutes in CBR_DAYS.items():
+        path = get_archive_path(directory, date.fromisoformat(day))
+        path.parent.mkdir(parents=True)
+        path.write_text(json.dumps(cbr_response(day, valutes)), encoding="utf-8")
+    return directory
+
+
+@pytest.fixture
+def history(cbr_archive):
+    return RateHistory.from_cbr_archive(cbr_archive)
+
+
+def test_parse_cbr_daily_uses_nominal():
+    rates = parse_cbr_daily(cbr_response("2021-12-01", {"USD": (1, 70.0), "CNY": (10, 110.0)}))
+
+    assert rates["date"].tolist() == [pd.Timestamp("2021-12-01")] * 2
+    assert dict(zip(rates["currency"], rates["rate"])) == {"USD": 70.0, "CNY": 11.0}
+
+
+def test_get_rates_as_of(history):
+    rates = history.get_rates(
+        ["USD", "USD", "cny", "USD", "RUB", None, "EUR", "USD"],
+        pd.to_datetime(
+            [
+                "2021-12-01 10:00",
+                "2021-12-04 23:59",
+                "2021-12-05 00:00",
+                "2021-11-30 00:00",
+                "2020-01-01 00:00",
+                "2021-12-02 00:00",
+                "2021-12-02 00:00",
+                None,
+            ]
+        ),
+    )
+
+    np.testing.assert_allclose(rates, [70.0, 71.0, 11.2, np.nan, 1.0, np.nan, np.nan, np.nan])
+    assert history.currencies == ["CNY", "USD"]
+    assert len(history) == 6
+
+
+def test_get_rates_cache(history):
+    dates = pd.to_datetime(["2021-12-01 00:00", "2021-12-01 18:00", "2021-12-02 00:00", "2021-12-02 00:00"])
+
+    history.get_rates(["USD", "USD", "USD", "CNY"], dates)
+    assert history.cache_info() == {"pairs": 3, "hits": 0, "misses": 3}
+
+    history.get_rates(["USD", "CNY"], dates[2:])
+    assert history.cache_info() == {"pairs": 3, "hits": 2, "misses": 3}
+
+    history.add_cbr_response(cbr_response("2021-12-02", {"USD": (1, 75.0)}))
+    assert history.cache_info()["pairs"] == 0
+    assert history.get_rates(["USD"], dates[2:3]).tolist() == [75.0]
+
+
+def test_convert_to_other_base(history):
+    converted = history.convert([700.0, 110.0], ["RUB", "CNY"], pd.to_datetime(["2021-12-01", "2021-12-01"]), "USD")
+
+    np.testing.assert_allclose(converted, [10.0, 110.0 * 11.0 / 70.0])
+
+
+def test_save_and_load(history, tmp_path):
+    path = tmp_path / "rates.csv"
+    history.save(path)
+
+    loaded = RateHistory.load(path)
+
+    pd.testing.assert_frame_equal(loaded.rates, history.rates)
+
+
+def test_add_requires_rate_columns():
+    with pytest.raises(ValueError):
+        RateHistory(pd.DataFrame({"date": ["2021-12-01"], "rate": [70.0]}))
+
+
+def test_convert_operations_currency(history):
+    df = normalize_operations(
+        pd.DataFrame(
+            {
+                "Дата операции": [
+                    "01.12.2021 10:00:00",
+                    "04.12.2021 11:00:00",
+                    "05.12.2021 12:00:00",
+                    "06.12.2021 13:00:00",
+                ],
+                "Дата платежа": ["01.12.2021", "04.12.2021", "05.12.2021", "06.12.2021"],
+                "Номер карты": ["*1234", "*1234", "*5678", "*5678"],
+                "Статус": ["OK", "OK", "OK", "OK"],
+                "Сумма операции": [-100.0, -10.0, -5.0, -1.0],
+                "Валюта операции": ["RUB", "USD", "CNY", "TRY"],
+                "Сумма платежа": [-100.0, -710.0, -5.0, -6.0],
+                "Валюта платежа": ["RUB", "RUB", "CNY", "RUB"],
+                "Категория": ["Супермаркеты", "Одежда", "Такси", "Такси"],
+            }
+        )
+    )
+
+    result = convert_operations_currency(df, history)
+
+    assert result["Сумма платежа"].tolist() == [-100.0, -710.0, -56.0, -6.0]
+    assert result["Валюта платежа"].tolist() == ["RUB"] * 4
+    # Для лиры в истории нет курсов: сумма операции остаётся в своей валюте
+    assert result["Сумма операции"].tolist() == [-100.0, -710.0, -56.0, -1.0]
+    assert result["Валюта операции"].tolist() == ["RUB", "RUB", "RUB", "TRY"]
+    assert get_cards_info(result) == [
+        {"last_digits": "1234", "total_spent": 810.0, "cashback": 8.1},
+        {"last_digits": "5678", "total_spent": 62.0, "cashback": 0.62},
+    ]
+    assert df["Сумма платежа"].tolist() == [-100.0, -710.0, -5.0, -6.0]
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    """Заглушка архива ЦБ: отдаёт файлы из папки, для остальных дней - 404"""
+
+    def do_GET(self) -> None:
+        self.server.requests.append(self.path)
+        path = self.server.directory / self.path.removeprefix("/archive/")
+        if not path.is_file():
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = path.read_bytes()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/javascript")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def archive_server(cbr_archive):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ArchiveHandler)
+    server.directory = cbr_archive
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_cbr_archive(archive_server, tmp_path):
+    url = f"http://127.0.0.1:{archive_server.server_address[1]}/archive/{{date:%Y/%m/%d}}/daily_json.js"
+    directory = tmp_path / "mirror"
+    days = pd.date_range("2021-12-01", "2021-12-03")
+
+    assert fetch_cbr_archive(days, directory, url) == 2
+    assert fetch_cbr_archive(days, directory, url) == 0
+    assert len(archive_server.requests) == 4
+
+    history = RateHistory.from_cbr_archive(directory)
+    assert history.get_rates(["USD"], pd.to_datetime(["2021-12-02"])).tolist() == [70.0]
@@ -0,0 +1,78 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.records import (
+    OPERATION_FIELDS,
+    OperationRecord,
+    TransactionArray,
+    records_from_dicts,
+    records_from_frame,
+    records_to_dicts,
+    records_to_frame
+)
+
+
+def test_operation_record_fields():
+    record = OperationRecord("01.11.2021 10:00:00", card="*1234", amount=-10.5)
+
+    assert record.operation_date == "01.11.2021 10:00:00"
+    assert record.card == "*1234"
+    assert record.amount == -10.5
+    assert record.category is None
+    assert not hasattr(record, "__dict__")
+    assert sys.getsizeof(record) < sys.getsizeof(record.to_dict())
+
+
+def test_operation_record_errors():
+    with pytest.raises(TypeError):
+        OperationRecord(*range(len(OPERATION_FIELDS) + 1))
+    with pytest.raises(TypeError):
+        OperationRecord(color="red")
+
+
+def test_records_dicts_round_trip(mock_dict_data):
+    records = records_from_dicts(mock_dict_data)
+
+    assert records[0].category == "Супермаркеты"
+    assert records[3].status == "FAILED"
+    assert [
+        {column: value for column, value in row.items() if column in mock_dict_data[0]}
+        for row in records_to_dicts(records)
+    ] == mock_dict_data
+    assert records == records_from_dicts(mock_dict_data)
+
+
+def test_records_frame_round_trip(operations_df):
+    records = records_from_frame(operations_df)
+
+    assert records[1] == OperationRecord.from_dict(operations_df.iloc[1].to_dict())
+    pd.testing.assert_frame_equal(records_to_frame(records)[operations_df.columns], operations_df)
+
+
+def test_transaction_array_converters(operations_df):
+    from_frame = TransactionArray.from_frame(operations_df)
+    from_records = TransactionArray.from_records(records_from_frame(operations_df))
+
+    assert len(from_frame) == 3
+    assert from_frame.nbytes == 48
+    np.testing.assert_array_equal(from_frame.dates, from_records.dates)
+    np.testing.assert_array_equal(from_frame.amounts, from_records.amounts)
+    assert [str(month) for month in from_frame.months] == ["2021-11", "2021-11", "2021-12"]
+    assert from_frame[1].to_dicts() == [{"date": pd.Timestamp("2021-11-15 11:00:00"), "amount": -2000.0}]
+
+
+def test_transaction_array_dicts_round_trip():
+    transactions = [{"date": "2025-05-14", "amount": -68}, {"date": "2025-04-13", "amount": 3300}]
+    array = TransactionArray.from_dicts(transactions)
+
+    assert array.dates.dtype == np.dtype("datetime64[ns]")
+    assert TransactionArray.from_dicts(array.to_dicts()).to_dicts() == array.to_dicts()
+    pd.testing.assert_frame_equal(TransactionArray.from_frame(array.to_frame()).to_frame(), array.to_frame())
+
+
+def test_transaction_array_length_mismatch():
+    with pytest.raises(ValueError):
+        TransactionArray(np.array(["2025-05-14"], dtype="datetime64[ns]"), np.array([1.0, 2.0]))
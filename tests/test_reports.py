@@ -1,10 +1,13 @@
+import json
 from datetime import datetime
 from unittest.mock import MagicMock, patch
 
 import pandas as pd
 import pytest
 
-from src.reports import get_spending_by_category, report_to_selected_file
+from src.cache import get_frame_fingerprint
+from src.dataset import OperationsDataset
+from src.reports import cached_report, get_spending_by_category, get_spending_windows, report_to_selected_file
 
 
 @pytest.fixture
@@ -68,3 +71,129 @@ def test_get_spending_by_category_empty_input():
     result = get_spending_by_category(empty_df, "Категория")
 
     assert result == {}
+
+
+@pytest.mark.parametrize(
+    "category, date",
+    [
+        ("Супермаркеты", "17-04-2021"),
+        ("Супермаркеты", "15-03-2021"),
+        ("Такси", "01-02-2023"),
+        ("Каршеринг", "15-03-2023"),
+    ],
+)
+def test_get_spending_by_category_from_windows(category, date, sample_transactions):
+    windows = get_spending_windows(sample_transactions)
+
+    assert get_spending_by_category(windows, category, date) == get_spending_by_category(
+        sample_transactions, category, date
+    )
+
+
+def test_spending_windows_midnight_bounds():
+    """Граница окна - начало дня: операции за день конца окна входят, только если совершены в 00:00:00"""
+    df = pd.DataFrame(
+        {
+            "Дата операции": ["01.03.2021 00:00:00", "01.03.2021 10:00:00", "01.12.2020 00:00:00"],
+            "Описание": ["Магнит", "Магнит", "Магнит"],
+            "Категория": ["Супермаркеты", "Супермаркеты", "Супермаркеты"],
+            "Сумма платежа": [-100, -200, -400],
+            "Статус": ["OK", "OK", "OK"],
+        }
+    )
+    windows = get_spending_windows(df)
+
+    assert get_spending_by_category(windows, "Супермаркеты", "01-03-2021") == {"Магнит": 500}
+    assert get_spending_by_category(df, "Супермаркеты", "01-03-2021") == {"Магнит": 500}
+
+
+def test_spending_windows_trend(sample_transactions):
+    windows = get_spending_windows(sample_transactions, by="Категория")
+    trend = windows.trend(days=30, start="2021-01-01", end="2021-03-31")
+
+    assert trend.shape == (90, 3)
+    assert trend.loc["2021-03-16", "Супермаркеты"] == -3100
+    assert trend.loc["2021-03-16", "Супермаркеты"] == windows.window("2021-03-16", 30)["Супермаркеты"]
+    assert windows.trend(days=30, freq="M", start="2021-01-01", end="2021-03-31").index.day.tolist() == [31, 28, 31]
+
+
+def test_spending_windows_wrong_grouping(sample_transactions):
+    with pytest.raises(ValueError):
+        get_spending_by_category(get_spending_windows(sample_transactions, by="Категория"), "Супермаркеты")
+
+
+@pytest.fixture
+def counted_report(tmp_path):
+    """Фикстура с отчётом, который считает свои вызовы"""
+    calls = []
+
+    def spending_report(transactions, category, date=None):
+        calls.append((category, date))
+        return get_spending_by_category(transactions, category, date)
+
+    return cached_report("spending.json", maxsize=2, reports_dir=tmp_path)(spending_report), calls
+
+
+def test_cached_report_memory(counted_report, sample_transactions, tmp_path):
+    report, calls = counted_report
+    expected = get_spending_by_category(sample_transactions, "Супермаркеты", "17-04-2021")
+
+    assert report(sample_transactions, "Супермаркеты", "17-04-2021") == expected
+    assert report(sample_transactions, category="Супермаркеты", date="17-04-2021") == expected
+    assert len(calls) == 1
+    assert json.loads((tmp_path / "spending.json").read_text(encoding="utf-8")) == expected
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_cached_report_changed_data(counted_report, sample_transactions):
+    report, calls = counted_report
+    report(sample_transactions, "Супермаркеты", "17-04-2021")
+    changed = sample_transactions.copy()
+    changed.loc[4, "Сумма платежа"] = -900
+
+    assert report(changed, "Супермаркеты", "17-04-2021") == {"Копеечка": 1200, "Магнит": 2000}
+    assert report(sample_transactions, "Супермаркеты", "15-03-2021") is not None
+    assert len(calls) == 3
+
+
+def test_cached_report_from_disk(counted_report, sample_transactions):
+    report, calls = counted_report
+    report(sample_transactions, "Супермаркеты", "17-04-2021")
+    report.cache_clear()
+
+    assert report(sample_transactions, "Супермаркеты", "17-04-2021") == {"Копеечка": 1100, "Магнит": 2000}
+    assert len(calls) == 1
+
+
+def test_cached_report_dataset_fingerprint(counted_report, sample_transactions):
+    report, calls = counted_report
+    operations = OperationsDataset(sample_transactions)
+    report(operations, "Супермаркеты", "17-04-2021")
+
+    with patch("src.dataset.get_frame_fingerprint") as mock_fingerprint:
+        report(operations, "Супермаркеты", "17-04-2021")
+    mock_fingerprint.assert_not_called()
+    assert len(calls) == 1
+
+
+def test_cached_report_without_date(counted_report, sample_transactions, tmp_path):
+    report, calls = counted_report
+    report(sample_transactions, "Супермаркеты", "17-04-2021")
+
+    with patch("src.reports.datetime") as mock_datetime:
+        mock_datetime.now.return_value = datetime(2021, 4, 17)
+        mock_datetime.strptime = datetime.strptime
+        assert report(sample_transactions, "Супермаркеты") == {"Копеечка": 1100, "Магнит": 2000}
+        mock_datetime.now.return_value = datetime(2022, 1, 1)
+        assert report(sample_transactions, "Супермаркеты") == {}
+
+    assert len(calls) == 3
+    assert json.loads((tmp_path / "spending.json").read_text(encoding="utf-8")) == {}
+    assert not (tmp_path / "spending.json.fingerprint").exists()
+
+
+def test_frame_fingerprint(sample_transactions):
+    fingerprint = get_frame_fingerprint(sample_transactions)
+
+    assert get_frame_fingerprint(sample_transactions.astype({"Категория": "category"})) == fingerprint
+    assert get_frame_fingerprint(sample_transactions.iloc[::-1]) != fingerprint
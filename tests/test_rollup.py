@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.rollup import COUNT_COLUMN, OperationsRollup
+from src.services import get_high_cashback_categories
+from src.utils import cash_and_transfers_count, get_cards_info, get_income_category, most_spending_filter
+from src.views import main_events
+
+
+@pytest.fixture
+def operations_df(mock_df_data):
+    """Фикстура с операциями, в которых есть повторяющиеся ячейки"""
+    df = pd.concat([mock_df_data, mock_df_data], ignore_index=True)
+    df["Дата операции"] = pd.to_datetime(df["Дата платежа"]).dt.strftime("%d.%m.%Y 12:00:00")
+    return df
+
+
+def test_rollup_cells(operations_df):
+    rollup = OperationsRollup.from_frame(operations_df)
+
+    assert len(rollup.cells) == 4
+    assert rollup.operations_count == 8
+    assert sorted(rollup.cells["Сумма платежа"].tolist()) == [-4000, -2000, -1000, 6000]
+    assert rollup.cells[COUNT_COLUMN].tolist() == [2, 2, 2, 2]
+
+
+@pytest.mark.parametrize("func", [get_cards_info, most_spending_filter, get_income_category, cash_and_transfers_count])
+def test_functions_answer_from_rollup(func, operations_df):
+    assert func(OperationsRollup.from_frame(operations_df)) == func(operations_df)
+
+
+@pytest.mark.parametrize("data_range", ["W", "M", "Y", "ALL"])
+@patch("src.views.get_market_data", return_value={"currency_rates": [], "stock_prices": []})
+def test_main_events_from_rollup(mock_market, data_range, operations_df):
+    rollup = OperationsRollup.from_frame(operations_df)
+    assert main_events("2023-02-17", rollup, data_range) == main_events("2023-02-17", operations_df, data_range)
+
+
+def test_get_high_cashback_categories_from_rollup(operations_df):
+    rollup = OperationsRollup.from_frame(operations_df)
+    assert get_high_cashback_categories(rollup, 2023, 1) == get_high_cashback_categories(operations_df, 2023, 1)
+
+
+def test_rollup_append(operations_df):
+    rollup = OperationsRollup.from_frame(operations_df.head(3))
+    assert get_cards_info(rollup) == get_cards_info(operations_df.head(3))
+
+    rollup.append(operations_df.iloc[3:])
+
+    assert rollup.operations_count == 8
+    assert len(rollup.cells) == 4
+    assert get_cards_info(rollup) == get_cards_info(operations_df)
+
+
+def test_rollup_empty_append(operations_df):
+    rollup = OperationsRollup()
+    rollup.append(operations_df.head(0))
+    rollup.append(operations_df)
+
+    assert most_spending_filter(rollup) == most_spending_filter(operations_df)
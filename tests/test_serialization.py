@@ -0,0 +1,85 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import serialization
+from src.serialization import dump_json, dumps
+
+BACKENDS = [False, pytest.param(True, marks=pytest.mark.skipif(serialization.orjson is None, reason="нет orjson"))]
+
+
+@pytest.fixture
+def payload():
+    """Фикстура с данными, которые не сериализует стандартный json"""
+    return {
+        "cards": [{"last_digits": "7197", "total_spent": np.float64(1000.5), "cashback": np.int64(10)}],
+        "amounts": np.array([1, 2, 3]),
+        "date": pd.Timestamp("2021-12-31 16:44:00"),
+        "day": datetime(2021, 12, 31),
+        "missing": pd.NaT,
+        "ok": np.bool_(True),
+        "category": pd.Series({"Супермаркеты": 100.0}),
+    }
+
+
+@pytest.mark.parametrize("use_orjson", BACKENDS)
+def test_dumps_numpy_and_dates(use_orjson, payload):
+    result = json.loads(dumps(payload, use_orjson=use_orjson))
+
+    assert result == {
+        "cards": [{"last_digits": "7197", "total_spent": 1000.5, "cashback": 10}],
+        "amounts": [1, 2, 3],
+        "date": "2021-12-31T16:44:00",
+        "day": "2021-12-31T00:00:00",
+        "missing": None,
+        "ok": True,
+        "category": {"Супермаркеты": 100.0},
+    }
+
+
+@pytest.mark.parametrize("use_orjson", BACKENDS)
+def test_dumps_compact(use_orjson):
+    data = {"category": "Переводы", "amounts": [1, 2]}
+
+    assert dumps(data, compact=True, use_orjson=use_orjson) == '{"category":"Переводы","amounts":[1,2]}'.encode()
+    assert json.loads(dumps(data, use_orjson=use_orjson)) == data
+    assert b"\n" in dumps(data, use_orjson=use_orjson)
+
+
+def test_dumps_same_as_json():
+    data = {"web_pages": {"cards": [{"last_digits": "7197", "total_spent": 10.5}]}, "reports": {"Магнит": 20}}
+
+    assert dumps(data, use_orjson=False).decode() == json.dumps(data, ensure_ascii=False, indent=4)
+
+
+@pytest.mark.parametrize("use_orjson", BACKENDS)
+def test_dumps_indent_same_for_backends(use_orjson):
+    data = {"total": float("nan"), "amounts": np.array([1.5, np.nan])}
+
+    assert dumps(data, use_orjson=use_orjson) == dumps(data, use_orjson=False)
+    assert dumps(data, use_orjson=use_orjson).decode().startswith('{\n    "total": NaN')
+
+
+@pytest.mark.parametrize("use_orjson", BACKENDS)
+def test_dumps_compact_nan(use_orjson):
+    """В компактном режиме orjson записывает NaN как null, стандартный json - как NaN"""
+    expected = b'{"total":null}' if use_orjson else b'{"total":NaN}'
+
+    assert dumps({"total": float("nan")}, compact=True, use_orjson=use_orjson) == expected
+
+
+def test_dumps_unknown_type():
+    with pytest.raises(TypeError):
+        dumps({"value": object()}, use_orjson=False)
+
+
+@pytest.mark.parametrize("atomic", [False, True])
+def test_dump_json(atomic, tmp_path, payload):
+    path = tmp_path / "widget.json"
+    dump_json(payload, path, compact=True, atomic=atomic)
+
+    assert json.loads(path.read_text(encoding="utf-8"))["cards"][0]["cashback"] == 10
+    assert list(tmp_path.iterdir()) == [path]
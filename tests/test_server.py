@@ -0,0 +1,180 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from src import views
+from src.server import WidgetServer, WidgetService
+from src.services import investment_bank
+from src.utils import normalize_operations
+
+MARKET_DATA = {"currency_rates": [{"currency": "USD", "rate": 80.5}], "stock_prices": []}
+
+
+@pytest.fixture
+def service(operations_df):
+    """Сервис с операциями в формате выгрузки банка"""
+    views.set_market_data(MARKET_DATA)
+    return WidgetService(normalize_operations(operations_df))
+
+
+def request(server, method, target):
+    return asyncio.run(server.handle_request(method, target))
+
+
+def test_service_answers_from_warm_data(service):
+    assert service.main_events("2021-11-30", "M")["expenses"]["total_amount"] == "3000"
+    assert service.main_events("2021-12-31", "ALL")["income"]["total_amount"] == "3000"
+    assert service.cashback("2021", "11") == {"Транспорт": 20, "Супермаркеты": 10}
+    assert service.investment_bank("2021-11", "50") == {
+        "month": "2021-11",
+        "limit": 50,
+        "amount": investment_bank("2021-11", service.transactions, 50),
+    }
+    assert service.spending_by_category("Супермаркеты", "30-11-2021") == {"Магнит": 1000.0}
+
+
+def test_handle_request_routes(service):
+    server = WidgetServer(service)
+
+    status, payload = request(server, "GET", "/main_web")
+    assert status == 200
+    assert payload["currency_rates"] == MARKET_DATA["currency_rates"]
+    assert [card["last_digits"] for card in payload["cards"]] == ["1234", "5678"]
+
+    status, payload = request(server, "GET", "/main_events?date=2021-12-31&range=Y")
+    assert status == 200
+    assert payload["expenses"]["total_amount"] == "3000"
+
+    status, payload = request(server, "GET", "/main_events_multi?date=2021-11-30,2021-12-31&ranges=M,ALL")
+    assert status == 200
+    assert list(payload) == ["2021-11-30", "2021-12-31"]
+    assert payload["2021-12-31"]["ALL"]["expenses"]["total_amount"] == "3000"
+    assert payload["2021-11-30"]["M"]["expenses"] == service.main_events("2021-11-30", "M")["expenses"]
+
+    status, payload = request(server, "GET", "/series?freq=M&categories=Транспорт,Супермаркеты&cumulative=1")
+    assert status == 200
+    assert payload == {
+        "dates": ["2021-11-01", "2021-12-01"],
+        "series": {"Транспорт": [2000.0, 2000.0], "Супермаркеты": [1000.0, 1000.0]},
+    }
+
+    status, payload = request(server, "GET", "/cards?date=2021-11-30&range=M")
+    assert status == 200
+    assert payload == [
+        {"last_digits": "1234", "total_spent": 1000.0, "cashback": 10.0},
+        {"last_digits": "5678", "total_spent": 2000.0, "cashback": 20.0},
+    ]
+
+    status, payload = request(server, "GET", "/spending_by_category/?category=Транспорт&date=30-11-2021")
+    assert (status, payload) == (200, {"Такси": 2000.0})
+
+
+@pytest.mark.parametrize(
+    "method, target, expected_status",
+    [
+        ("GET", "/unknown", 404),
+        ("POST", "/main_web", 405),
+        ("GET", "/main_events?date=2021-12-31&range=Q", 400),
+        ("GET", "/main_events?date=31.12.2021", 400),
+        ("GET", "/main_events_multi?date=2021-12-31&ranges=M,Q", 400),
+        ("GET", "/series?freq=Q", 400),
+        ("GET", "/series?moving_average=three", 400),
+        ("GET", "/cashback?year=2021", 400),
+        ("GET", "/cashback?year=2021&month=11&card=1234", 400),
+        ("GET", "/investment_bank?month=2021-11&limit=0", 400),
+    ],
+)
+def test_handle_request_errors(service, method, target, expected_status):
+    status, payload = request(WidgetServer(service), method, target)
+
+    assert status == expected_status
+    assert "error" in payload
+
+
+def test_handle_request_internal_error(service, monkeypatch):
+    def broken(**kwargs):
+        raise RuntimeError("сбой")
+
+    monkeypatch.setattr(service, "health", broken)
+
+    assert request(WidgetServer(service), "GET", "/health") == (500, {"error": "Внутренняя ошибка сервиса"})
+
+
+async def http_get(reader, writer, target, close=False):
+    connection = "close" if close else "keep-alive"
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\nConnection: {connection}\r\n\r\n".encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    headers = {}
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode().partition(":")
+        headers[name.lower()] = value.strip()
+    body = await reader.readexactly(int(headers["content-length"]))
+    return int(status_line.split()[1]), headers, json.loads(body)
+
+
+def test_server_keep_alive(service):
+    async def scenario():
+        server = WidgetServer(service, port=0)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            first = await http_get(reader, writer, "/health")
+            second = await http_get(reader, writer, "/cashback?year=2021&month=11", close=True)
+            assert await reader.read() == b""
+            writer.close()
+        finally:
+            await server.close()
+        return first, second
+
+    (status, headers, payload), (second_status, second_headers, second_payload) = asyncio.run(scenario())
+
+    assert status == 200
+    assert headers["content-type"] == "application/json; charset=utf-8"
+    assert headers["connection"] == "keep-alive"
+    assert payload["operations"] == 3
+    assert (second_status, second_headers["connection"]) == (200, "close")
+    assert second_payload == {"Транспорт": 20, "Супермаркеты": 10}
+
+
+def test_server_bad_request_line(service):
+    async def scenario():
+        server = WidgetServer(service, port=0)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"GARBAGE\r\n\r\n")
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        finally:
+            await server.close()
+        return response
+
+    assert asyncio.run(scenario()).startswith(b"HTTP/1.1 400 Bad Request\r\n")
+
+
+def test_slow_request_does_not_block_loop(service, monkeypatch):
+    def slow_main_events(date, range="M"):
+        time.sleep(0.5)
+        return {}
+
+    monkeypatch.setattr(service, "main_events", slow_main_events)
+
+    async def scenario():
+        server = WidgetServer(service, max_workers=2)
+        slow = asyncio.create_task(server.handle_request("GET", "/main_events?date=2021-12-31"))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        status, _ = await server.handle_request("GET", "/health")
+        elapsed = time.perf_counter() - start
+        await slow
+        await server.close()
+        return status, elapsed
+
+    status, elapsed = asyncio.run(scenario())
+
+    assert status == 200
+    assert elapsed < 0.4
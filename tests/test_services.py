@@ -1,7 +1,13 @@
 import pandas as pd
 import pytest
 
-from src.services import get_high_cashback_categories, investment_bank
+from src.records import TransactionArray
+from src.services import (
+    get_cashback_matrix,
+    get_high_cashback_categories,
+    investment_bank,
+    investment_bank_batch
+)
 
 
 @pytest.fixture
@@ -49,6 +55,34 @@ def test_get_high_cashback_categories_empty_result(sample_transactions):
     assert result == {}
 
 
+def test_get_cashback_matrix(sample_transactions):
+    matrix = get_cashback_matrix(sample_transactions)
+
+    assert [str(month) for month in matrix.months] == ["2022-01", "2023-01", "2023-02"]
+    assert matrix.spending.shape == (3, 3)
+    assert matrix.for_month(2023, 1) == get_high_cashback_categories(sample_transactions, 2023, 1)
+    assert matrix.for_month(2022, 1) == {"Такси": 5}
+    assert matrix.for_month(2023, 4) == {}
+    assert matrix.to_dict()["2023-02"] == {"Супермаркеты": 3}
+
+
+def test_get_high_cashback_categories_from_matrix(sample_transactions):
+    matrix = get_cashback_matrix(sample_transactions)
+    assert get_high_cashback_categories(matrix, 2023, 1) == {"Супермаркеты": 28, "Госуслуги": 10}
+
+
+def test_get_cashback_matrix_excluded_categories():
+    df = pd.DataFrame(
+        {
+            "Дата операции": ["01-01-2023", "02-01-2023", "03-01-2023"],
+            "Категория": ["Переводы", "Наличные", "Аптеки"],
+            "Сумма платежа": [-5000, -5000, -99],
+            "Статус": ["OK", "OK", "OK"],
+        }
+    )
+    assert get_cashback_matrix(df).for_month(2023, 1) == {}
+
+
 def test_investment_bank(sample_investment_data):
     """Тест работоспособности"""
     result = investment_bank("2025-05", sample_investment_data, 50)
@@ -68,9 +102,54 @@ def test_investment_bank_empty_month(sample_investment_data):
     assert result == 0
 
 
+def test_investment_bank_batch(sample_investment_data):
+    result = investment_bank_batch(sample_investment_data, limits=[10, 50, 100])
+
+    assert result.index.tolist() == ["2024-05", "2025-04", "2025-05"]
+    assert result.columns.tolist() == [10, 50, 100]
+    for month in result.index:
+        for limit in result.columns:
+            assert result.loc[month, limit] == investment_bank(month, sample_investment_data, limit)
+
+
+def test_investment_bank_batch_dataframe(sample_investment_data):
+    result = investment_bank_batch(pd.DataFrame(sample_investment_data), limits=[50], chunk_size=1)
+    assert result.loc["2025-05", 50] == 38
+
+
+def test_investment_bank_nan_amount(sample_investment_data):
+    """Транзакции без суммы пропускаются, как при суммировании в pandas"""
+    transactions = sample_investment_data + [
+        {"date": "2025-05-20", "amount": float("nan")},
+        {"date": "2024-06-01", "amount": None},
+    ]
+
+    assert investment_bank("2025-05", transactions, 50) == 38
+    assert investment_bank("2024-06", transactions, 50) == 0
+    result = investment_bank_batch(transactions, limits=[10, 50])
+    assert result.loc["2025-05", 50] == 38
+    assert result.loc["2024-06"].tolist() == [0, 0]
+
+
+def test_investment_bank_batch_empty():
+    result = investment_bank_batch([], limits=[10, 50])
+    assert result.empty
+    assert result.columns.tolist() == [10, 50]
+
+
 a = [
     {"date": "2025-05-14", "amount": -68},
     {"date": "2025-05-14", "amount": -44},
     {"date": "2025-04-13", "amount": -33},
     {"date": "2024-05-22", "amount": 112},
 ]
+
+
+def test_investment_bank_transaction_array(sample_investment_data):
+    transactions = TransactionArray.from_dicts(sample_investment_data)
+
+    assert investment_bank("2025-05", transactions, 50) == investment_bank("2025-05", sample_investment_data, 50)
+    pd.testing.assert_frame_equal(
+        investment_bank_batch(transactions, limits=[10, 50]),
+        investment_bank_batch(sample_investment_data, limits=[10, 50]),
+    )
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.generator import generate_operations
+from src.dataset import OperationsDataset
+from src.rollup import OperationsRollup
+from src.services import get_cashback_matrix
+from src.sharding import aggregate_by_shards, get_shard_numbers
+from src.utils import filter_transaction, get_cards_info, get_income_category, most_spending_filter
+
+
+@pytest.fixture(scope="module")
+def operations():
+    return generate_operations(20_000, seed=5)
+
+
+def test_get_shard_numbers():
+    keys = pd.Series(["*1234", "*5678", None, "*1234", "*9999"])
+
+    numbers = get_shard_numbers(keys, 3)
+
+    assert numbers[2] == -1
+    assert numbers[0] == numbers[3]
+    assert ((numbers[[0, 1, 3, 4]] >= 0) & (numbers[[0, 1, 3, 4]] < 3)).all()
+    # Номер зависит от значения, а не от порядка строк или типа колонки
+    assert get_shard_numbers(keys[::-1].astype("category"), 3).tolist() == numbers[::-1].tolist()
+
+
+@pytest.mark.parametrize("function", [get_cards_info, most_spending_filter, get_income_category])
+@pytest.mark.parametrize("shards", [2, 3, 8])
+def test_sharded_results_identical(operations, function, shards):
+    expected = function(operations)
+
+    assert function(operations, shards=shards) == expected
+    assert function(OperationsDataset(operations), shards=shards) == expected
+    assert function(OperationsRollup.from_frame(operations), shards=shards) == function(
+        OperationsRollup.from_frame(operations)
+    )
+
+
+def test_sharded_sums_bit_identical(operations):
+    def sum_by_card(spending):
+        return spending.groupby("Номер карты", observed=True)["Сумма платежа"].sum()
+
+    expected = sum_by_card(filter_transaction(operations))
+    result = aggregate_by_shards(operations, "Номер карты", sum_by_card, filter_transaction, 4)
+
+    pd.testing.assert_series_equal(result, expected)
+
+
+def test_sharded_cashback_matrix(operations):
+    expected = get_cashback_matrix(operations)
+    result = get_cashback_matrix(operations, shards=4)
+
+    np.testing.assert_array_equal(result.months, expected.months)
+    np.testing.assert_array_equal(result.categories, expected.categories)
+    np.testing.assert_array_equal(result.spending, expected.spending)
+
+
+def test_sharded_without_matching_rows(operations):
+    failed = operations.assign(Статус="FAILED")
+
+    assert get_cards_info(failed, shards=4) == get_cards_info(failed) == []
+    assert most_spending_filter(operations.iloc[:0], shards=4) == []
@@ -0,0 +1,64 @@
+import pandas as pd
+
+from src.store import OperationsStore, ingest_operations, read_operations_export, transaction_keys
+from src.utils import get_cards_info
+
+
+def test_transaction_keys_stable(operations_df):
+    keys = transaction_keys(operations_df)
+
+    assert len(set(keys)) == 3
+    assert (transaction_keys(operations_df.iloc[::-1])[::-1] == keys).all()
+    assert (transaction_keys(operations_df.astype({"Категория": "category"})) == keys).all()
+
+
+def test_transaction_keys_repeated_operations(operations_df):
+    """Две одинаковые операции в одной выгрузке - разные ключи"""
+    df = pd.concat([operations_df.head(1), operations_df.head(1)])
+    assert len(set(transaction_keys(df))) == 2
+
+
+def test_store_append_only_new(tmp_path, operations_df):
+    store = OperationsStore(tmp_path)
+
+    assert len(store.append(operations_df.head(2))) == 2
+    assert len(store.append(operations_df)) == 1
+    assert len(store.append(operations_df)) == 0
+    assert len(store) == 3
+    assert len(list(tmp_path.glob("segment_*"))) == 2
+
+
+def test_store_reopen(tmp_path, operations_df):
+    OperationsStore(tmp_path).append(operations_df)
+    store = OperationsStore(tmp_path)
+
+    assert len(store.append(operations_df)) == 0
+    assert get_cards_info(store.frame) == get_cards_info(operations_df)
+
+
+def test_store_updates_rollup(tmp_path, operations_df):
+    store = OperationsStore(tmp_path)
+    store.append(operations_df.head(2))
+    assert store.rollup.operations_count == 2
+
+    store.append(operations_df)
+    assert get_cards_info(store.rollup) == get_cards_info(operations_df)
+
+    reopened = OperationsStore(tmp_path)
+    reopened.append(operations_df.head(0))
+    assert reopened.rollup.operations_count == 3
+
+
+def test_ingest_operations_csv(tmp_path, operations_df):
+    file_path = tmp_path / "export.csv"
+    operations_df.to_csv(file_path, sep=";", decimal=",", index=False)
+
+    assert ingest_operations(file_path, tmp_path / "store") == 3
+    assert ingest_operations(file_path, tmp_path / "store") == 0
+
+
+def test_read_operations_export_xlsx(tmp_path, operations_df):
+    file_path = tmp_path / "export.xlsx"
+    operations_df.to_excel(file_path, index=False)
+
+    assert len(read_operations_export(file_path)) == 3
@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+from src.stream import iter_operations_chunks, rollup_chunks
+from src.utils import cash_and_transfers_count, get_cards_info, get_income_category, most_spending_filter
+
+
+@pytest.fixture
+def export_df(operations_df):
+    """Выгрузка из трёх повторов операций"""
+    return pd.concat([operations_df] * 3, ignore_index=True)
+
+
+@pytest.fixture(params=["xlsx", "csv"])
+def export_file(request, tmp_path, export_df):
+    """Фикстура с выгрузкой операций в XLSX и CSV"""
+    file_path = tmp_path / f"operations.{request.param}"
+    if request.param == "csv":
+        export_df.to_csv(file_path, sep=";", decimal=",", index=False)
+    else:
+        export_df.to_excel(file_path, index=False)
+    return file_path
+
+
+def test_iter_operations_chunks(export_file, export_df):
+    chunks = list(iter_operations_chunks(export_file, chunk_size=5))
+
+    assert [len(chunk) for chunk in chunks] == [5, 4]
+    assert list(chunks[0].columns) == list(export_df.columns)
+    assert pd.concat(chunks)["Сумма платежа"].tolist() == export_df["Сумма платежа"].tolist()
+
+
+def test_iter_operations_chunks_empty(tmp_path):
+    file_path = tmp_path / "empty.xlsx"
+    pd.DataFrame(columns=["Сумма платежа"]).to_excel(file_path, index=False)
+
+    assert list(iter_operations_chunks(file_path)) == []
+
+
+def test_rollup_chunks(export_file):
+    rollup = rollup_chunks(iter_operations_chunks(export_file, chunk_size=5))
+
+    assert rollup.operations_count == 9
+    assert len(rollup.cells) == 3
+
+
+@pytest.mark.parametrize("func", [get_cards_info, most_spending_filter, get_income_category, cash_and_transfers_count])
+def test_functions_consume_chunks(func, export_file, export_df):
+    assert func(iter_operations_chunks(export_file, chunk_size=5)) == func(export_df)
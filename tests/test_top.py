@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from src.top import TopTransactions, top_transactions, top_transactions_by
+from src.utils import normalize_operations
+
+
+@pytest.fixture
+def operations_df(mock_df_data):
+    """Фикстура с повторяющимися суммами расходов"""
+    df = pd.concat([mock_df_data] * 3, ignore_index=True)
+    df["Описание"] = [f"Операция {i}" for i in range(len(df))]
+    return df
+
+
+def test_top_transactions(operations_df):
+    result = top_transactions(operations_df, n=3)
+
+    assert [row["amount"] for row in result] == [2000, 2000, 2000]
+    assert [row["description"] for row in result] == ["Операция 1", "Операция 5", "Операция 9"]
+
+
+@pytest.mark.parametrize("n", [1, 4, 6, 20])
+def test_top_transactions_same_as_nsmallest(n, operations_df):
+    expected = operations_df[(operations_df["Сумма платежа"] < 0) & (operations_df["Статус"] == "OK")]
+    expected = expected.nsmallest(n, "Сумма платежа")
+
+    result = top_transactions(operations_df, n=n)
+    assert [row["description"] for row in result] == expected["Описание"].tolist()
+
+
+def test_top_transactions_by_card(operations_df):
+    result = top_transactions_by(normalize_operations(operations_df), "Номер карты", n=2)
+
+    assert list(result) == ["1234", "5678"]
+    assert [row["amount"] for row in result["1234"]] == [1000, 1000]
+    assert [row["date"] for row in result["5678"]] == ["15.02.2023", "15.02.2023"]
+
+
+def test_top_transactions_chunks_and_merge(operations_df):
+    expected = top_transactions_by(operations_df, "Категория", n=4)
+    chunks = [operations_df.iloc[:5], operations_df.iloc[5:]]
+
+    assert top_transactions_by(iter(chunks), "Категория", n=4) == expected
+    first, second = (TopTransactions(4, "Категория").update(chunk) for chunk in chunks)
+    assert first.merge(second).group_result() == expected
+
+
+def test_top_transactions_invalid():
+    with pytest.raises(ValueError):
+        TopTransactions(0)
+    with pytest.raises(ValueError):
+        TopTransactions(5).merge(TopTransactions(5, by="Категория"))
+    with pytest.raises(ValueError):
+        TopTransactions(5, by="Категория").result()
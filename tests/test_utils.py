@@ -5,6 +5,8 @@ import pandas as pd
 import pytest
 import requests
 
+from src.dataset import OperationsDataset, get_window_bounds
+from src.records import records_from_dicts
 from src.utils import (
     cash_and_transfers_count,
     convert_date_to_datetime,
@@ -18,14 +20,15 @@ from src.utils import (
     get_income_category,
     get_stock_price,
     get_top5_transaction_info,
-    most_spending_filter
+    most_spending_filter,
+    normalize_operations
 )
 
 
 @patch("src.utils.pd.read_excel")
 def test_get_data_from_excel(mock_read, mock_df_data, mock_dict_data):
     mock_read.return_value = mock_df_data
-    assert get_data_from_excel() == mock_dict_data
+    assert get_data_from_excel(use_cache=False) == mock_dict_data
     mock_read.assert_called()
 
 
@@ -198,7 +201,7 @@ def test_get_top5_transaction_info(mock_df_data):
 @patch("src.utils.pd.read_excel")
 def test_get_df_data_from_file(mock_read):
     mock_read.return_value = {"test1": "test11"}
-    result = get_df_data_from_file()
+    result = get_df_data_from_file(use_cache=False)
     assert result == {"test1": "test11"}
 
 
@@ -246,7 +249,7 @@ def test_get_income_category(mock_df_data):
                     "OK",
                 ],
                 "Категория": ["Транспорт"],
-                "Дата платежа": ["15-02-2023"],
+                "Дата платежа": [pd.Timestamp("2023-02-15")],
                 "Номер карты": ["5678"],
                 "Описание": ["Такси"],
             },
@@ -260,7 +263,7 @@ def test_get_income_category(mock_df_data):
                     "OK",
                 ],
                 "Категория": ["Транспорт"],
-                "Дата платежа": ["15-02-2023"],
+                "Дата платежа": [pd.Timestamp("2023-02-15")],
                 "Номер карты": ["5678"],
                 "Описание": ["Такси"],
             },
@@ -272,7 +275,12 @@ def test_get_income_category(mock_df_data):
                 "Сумма платежа": [-1000, -2000, 3000, -500],
                 "Статус": ["OK", "OK", "OK", "FAILED"],
                 "Категория": ["Супермаркеты", "Транспорт", "Каршеринг", "Переводы"],
-                "Дата платежа": ["01-01-2023", "15-02-2023", "01-03-2023", "20-01-2023"],
+                "Дата платежа": [
+                    pd.Timestamp("2023-01-01"),
+                    pd.Timestamp("2023-02-15"),
+                    pd.Timestamp("2023-03-01"),
+                    pd.Timestamp("2023-01-20"),
+                ],
                 "Номер карты": ["1234", "5678", "1234", "5678"],
                 "Описание": ["Магнит", "Такси", "Яндекс-Драйв", "Олег"],
             },
@@ -284,7 +292,12 @@ def test_get_income_category(mock_df_data):
                 "Сумма платежа": [-1000, -2000, 3000, -500],
                 "Статус": ["OK", "OK", "OK", "FAILED"],
                 "Категория": ["Супермаркеты", "Транспорт", "Каршеринг", "Переводы"],
-                "Дата платежа": ["01-01-2023", "15-02-2023", "01-03-2023", "20-01-2023"],
+                "Дата платежа": [
+                    pd.Timestamp("2023-01-01"),
+                    pd.Timestamp("2023-02-15"),
+                    pd.Timestamp("2023-03-01"),
+                    pd.Timestamp("2023-01-20"),
+                ],
                 "Номер карты": ["1234", "5678", "1234", "5678"],
                 "Описание": ["Магнит", "Такси", "Яндекс-Драйв", "Олег"],
             },
@@ -294,3 +307,67 @@ def test_get_income_category(mock_df_data):
 def test_filter_data_by_range(date, data_range, expected, mock_df_data):
     result = filter_data_by_range(mock_df_data, date, data_range).to_dict(orient="list")
     assert result == expected
+
+
+def test_normalize_operations(mock_df_data):
+    result = normalize_operations(mock_df_data)
+
+    assert pd.api.types.is_datetime64_any_dtype(result["Дата платежа"])
+    assert isinstance(result["Категория"].dtype, pd.CategoricalDtype)
+    assert isinstance(result["Номер карты"].dtype, pd.CategoricalDtype)
+    assert mock_df_data["Дата платежа"].tolist()[0] == "2023-01-01"
+
+
+@pytest.mark.parametrize(
+    "func",
+    [get_cards_info, most_spending_filter, get_income_category, cash_and_transfers_count],
+)
+def test_functions_accept_normalized_df(func, mock_df_data):
+    assert func(normalize_operations(mock_df_data)) == func(mock_df_data)
+
+
+def test_get_top5_transaction_info_normalized(mock_df_data):
+    result = get_top5_transaction_info(normalize_operations(mock_df_data))
+    assert [row["date"] for row in result] == ["15.02.2023", "01.01.2023"]
+
+
+def test_get_top5_transaction_info_ties(mock_df_data):
+    # Выгрузка идёт от новых операций к старым, normalize_operations сортирует по дате платежа
+    latest = mock_df_data.iloc[:1].assign(**{"Сумма платежа": -2000, "Дата платежа": "2023-03-10"})
+    df = pd.concat([latest, mock_df_data], ignore_index=True)
+
+    assert [row["date"] for row in get_top5_transaction_info(df)[:2]] == ["2023-03-10", "2023-02-15"]
+    result = get_top5_transaction_info(normalize_operations(df))
+    assert [row["date"] for row in result[:2]] == ["15.02.2023", "10.03.2023"]
+
+
+def test_filter_data_by_range_normalized(mock_df_data):
+    result = filter_data_by_range(normalize_operations(mock_df_data), "2023-02-17", "M")
+    assert result["Дата платежа"].tolist() == [pd.Timestamp("2023-02-15")]
+
+
+@pytest.mark.parametrize("date, data_range", [("2023-02-17", "W"), ("2023-01-25", "M"), ("2023-12-31", "Y")])
+def test_filter_data_by_range_sorted_index(date, data_range, mock_df_data):
+    """Отсортированный по дате платежа DF и OperationsDataset дают тот же результат.
+    Операция без даты платежа (после normalize_operations она первая) не мешает бинарному поиску"""
+    undated = {**mock_df_data.iloc[0].to_dict(), "Дата платежа": None, "Описание": "Без даты"}
+    mock_df_data = pd.concat([mock_df_data, pd.DataFrame([undated])], ignore_index=True)
+    expected = filter_data_by_range(mock_df_data, date, data_range)
+    normalized = normalize_operations(mock_df_data)
+
+    with patch("src.utils.get_window_bounds", wraps=get_window_bounds) as window_bounds:
+        by_index = filter_data_by_range(normalized, date, data_range)
+    window_bounds.assert_called_once()
+    by_dataset = filter_data_by_range(OperationsDataset(mock_df_data), date, data_range)
+
+    assert sorted(by_index["Описание"].tolist()) == sorted(expected["Описание"].tolist())
+    assert by_dataset.to_dict(orient="list") == expected.to_dict(orient="list")
+
+
+@patch("src.utils.pd.read_excel")
+def test_get_data_from_excel_as_records(mock_read, mock_df_data, mock_dict_data):
+    mock_read.return_value = mock_df_data
+    records = get_data_from_excel(use_cache=False, as_records=True)
+
+    assert [record.card for record in records] == ["1234", "5678", "1234", "5678"]
+    assert records == records_from_dicts(mock_dict_data)
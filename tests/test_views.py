@@ -1,19 +1,20 @@
 from unittest.mock import patch
 
 import pandas as pd
+import pytest
 
 from src import views
 from src.views import main_events, main_web
 
 
-@patch.object(views, "stock_price", ["Курс акций (мок успешен)"])
-@patch.object(views, "exchange_rate", ["Курс валюты (мок успешен)"])
-@patch("src.views.get_stock_price")
-@patch("src.views.get_exchange_rate")
+MARKET_DATA = {"currency_rates": ["Курс валюты (мок успешен)"], "stock_prices": ["Курс акций (мок успешен)"]}
+
+
+@patch("src.views.get_market_data", return_value=MARKET_DATA)
 @patch("src.views.get_top5_transaction_info")
 @patch("src.views.get_cards_info")
 @patch("src.views.get_greetings_by_time")
-def test_main_web(mock_greeting, mock_cards, mock_top5, mock_exchange, mock_stock):
+def test_main_web(mock_greeting, mock_cards, mock_top5, mock_market):
     """Тест работоспособности"""
     expected = {
         "greeting": "Доброй ночи (мок успешен)",
@@ -25,20 +26,15 @@ def test_main_web(mock_greeting, mock_cards, mock_top5, mock_exchange, mock_stoc
     mock_greeting.return_value = "Доброй ночи (мок успешен)"
     mock_cards.return_value = ["Карты и суммы расходов (мок успешен)"]
     mock_top5.return_value = ["Топ 5 транзакций (мок успешен)"]
-    mock_exchange.return_value = ["Курс валюты (мок успешен)"]
-    mock_stock.return_value = ["Курс акций (мок успешен)"]
 
     assert main_web("YY-mm", "df") == expected
 
 
-@patch.object(views, "stock_price", ["Курс акций (мок успешен)"])
-@patch.object(views, "exchange_rate", ["Курс валюты (мок успешен)"])
-@patch("src.views.get_stock_price")
-@patch("src.views.get_exchange_rate")
+@patch("src.views.get_market_data", return_value=MARKET_DATA)
 @patch("src.views.most_spending_filter")
 @patch("src.views.filter_transaction")
 @patch("src.views.filter_data_by_range")
-def test_main_events(mock_range, mock_transactions, mock_spending, mock_exchange, mock_stock, mock_df_data):
+def test_main_events(mock_range, mock_transactions, mock_spending, mock_market, mock_df_data):
     mock_range.return_value = mock_df_data
     mock_transactions.return_value = pd.DataFrame(
         {
@@ -69,8 +65,6 @@ def test_main_events(mock_range, mock_transactions, mock_spending, mock_exchange
         }
     )
     mock_spending.return_value = [{"category": "Транспорт", "amount": 2000}, {"category": "Наличные", "amount": 1000}]
-    mock_exchange.return_value = ["Курс валюты (мок успешен)"]
-    mock_stock.return_value = ["Курс акций (мок успешен)"]
 
     main_test = [{"category": "Транспорт", "amount": 2000}, {"category": "Наличные", "amount": 1000}]
     transfers_and_cash = [
@@ -88,3 +82,43 @@ def test_main_events(mock_range, mock_transactions, mock_spending, mock_exchange
         "stock_prices": ["Курс акций (мок успешен)"],  # заменить
     }
     assert main_events("YYYY", "df") == expected
+
+
+@pytest.fixture
+def reset_market_data():
+    """Сбрасывает закэшированные курсы модуля views"""
+    views._market_data = None
+    views._market_client = None
+    yield
+    views._market_data = None
+    views._market_client = None
+
+
+@patch("src.views.MarketDataClient")
+def test_get_market_data_lazy(mock_client, reset_market_data):
+    mock_client.return_value.get_market_data.return_value = MARKET_DATA
+
+    assert views._market_data is None
+    assert views.get_market_data() == MARKET_DATA
+    assert views.get_market_data() == MARKET_DATA
+    mock_client.return_value.get_market_data.assert_called_once()
+
+
+@patch("src.views.MarketDataClient")
+def test_get_market_data_refresh(mock_client, reset_market_data):
+    mock_client.return_value.get_market_data.return_value = MARKET_DATA
+
+    views.get_market_data(max_age=0)
+    views.get_market_data(max_age=-1)
+
+    assert mock_client.return_value.get_market_data.call_count == 2
+
+
+@patch("src.views.MarketDataClient")
+def test_prefetch_market_data(mock_client, reset_market_data):
+    mock_client.return_value.get_market_data.return_value = MARKET_DATA
+
+    views.prefetch_market_data().join()
+
+    assert views.get_market_data() == MARKET_DATA
+    mock_client.return_value.get_market_data.assert_called_once()